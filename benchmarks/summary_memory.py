@@ -0,0 +1,107 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import date, datetime
+
+# Eseguibile dalla cartella del progetto: python benchmarks/summary_memory.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.summaries import DocumentSummary
+
+# ======================================================================
+# --- MEMORIA DEI RIEPILOGHI: DICT CONTRO __slots__ ---
+# Genera N intestazioni di documenti finti e misura (tracemalloc):
+#   - "dict":  riepilogo dict dell'indice + dict per documento della
+#              ricerca (nome file, nome cliente, datetime, percorso)
+#   - "slots": un DocumentSummary per documento, condiviso da tutti
+# e il tempo di ordinamento per data cerimonia.
+# ======================================================================
+
+CUSTOMERS = [f"Cliente {n}" for n in range(5000)]
+OPERATORS = ["Ketty", "Valentina"]
+CEREMONIES = ["Battesimo", "Comunione", "Cresima", "Matrimonio", "Laurea"]
+
+class _Stat:
+    def __init__(self, mtime, size):
+        self.st_mtime = mtime
+        self.st_size = size
+
+def fake_documents(count, seed=1):
+    """(percorso, intestazione, stat) di 'count' documenti verosimili."""
+    rnd = random.Random(seed)
+    start = date(2015, 1, 1).toordinal()
+    docs = []
+    for n in range(count):
+        # Testi ricostruiti ogni volta, come dopo la lettura di un file (niente condivisione gratuita)
+        name = "".join(rnd.choice(CUSTOMERS))
+        day = date.fromordinal(start + rnd.randrange(4000)).isoformat()
+        header = {
+            "revisione": rnd.randrange(1, 5),
+            "nome_cliente": name,
+            "telefono_cliente": f"3{rnd.randrange(10**8, 10**9)}",
+            "data_ordine": day, "data_cerimonia": day, "data_consegna": day,
+            "operatore": "".join(rnd.choice(OPERATORS)),
+            "tipo_cerimonia": "".join(rnd.choice(CEREMONIES)),
+            "tipo_confetti": "".join("Mandorla, Cioccolato"),
+            "totale": f"{rnd.randrange(10000) / 100:.2f}", "acconti": "0.00", "saldo": "0.00",
+        }
+        path = f"C:/Dati/orders/Ordine_{name.replace(' ', '_')}_{day}_{n}.json"
+        docs.append((path, header, _Stat(1.7e9 + n, 2000 + n % 500)))
+    return docs
+
+def build_dicts(docs):
+    """Struttura precedente: dict per l'indice e dict con datetime per la ricerca."""
+    entries, search = {}, []
+    for path, header, stat in docs:
+        summary = {"mtime": stat.st_mtime, "size": stat.st_size, "tipo": "ordine"}
+        summary.update(header)
+        entries[path] = summary
+        search.append({
+            "filename": os.path.basename(path),
+            "customer_name": summary["nome_cliente"],
+            "ceremony_date": datetime.fromisoformat(summary["data_cerimonia"]),
+            "full_path": path,
+        })
+    return entries, search
+
+def build_slots(docs):
+    entries = {path: DocumentSummary.from_header(header, "ordine", stat) for path, header, stat in docs}
+    search = list(entries.items())
+    return entries, search
+
+def measure(build, docs):
+    tracemalloc.start()
+    result = build(docs)
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python benchmarks/summary_memory.py")
+    parser.add_argument("--documenti", type=int, default=100000, help="Numero di documenti simulati")
+    args = parser.parse_args(argv)
+
+    docs = fake_documents(args.documenti)
+    print(f"Documenti simulati: {args.documenti}")
+
+    (_entries, search), dict_bytes = measure(build_dicts, docs)
+    start = time.perf_counter()
+    search.sort(key=lambda x: x["ceremony_date"])
+    dict_sort = (time.perf_counter() - start) * 1000
+    del _entries, search
+
+    (_entries, search), slot_bytes = measure(build_slots, docs)
+    start = time.perf_counter()
+    search.sort(key=lambda order: order[1].data_cerimonia)
+    slot_sort = (time.perf_counter() - start) * 1000
+
+    mb = 1024 * 1024
+    print(f"dict : {dict_bytes / mb:8.1f} MB   ordinamento {dict_sort:6.1f} ms")
+    print(f"slots: {slot_bytes / mb:8.1f} MB   ordinamento {slot_sort:6.1f} ms")
+    print(f"Memoria risparmiata: {(1 - slot_bytes / dict_bytes) * 100:.0f}%")
+
+if __name__ == "__main__":
+    main()
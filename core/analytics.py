@@ -0,0 +1,419 @@
+import time
+import traceback
+from array import array
+from datetime import date
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+from core.order_index import get_order_index
+from core.data_io import get_data_io, load_lines_async, describe_error, SCAN_TIMEOUT
+from core.cold_archive import get_cold_archive
+from core.totals import parse_amount, line_total
+
+# ======================================================================
+# --- MOTORE REPORT (ARCHIVIO A COLONNE) ---
+# Gli ordini dell'indice e quelli degli archivi annuali (core/cold_archive.py)
+# vengono trasformati in colonne compatte
+# (array di interi/float) con le categorie codificate come numeri.
+# Accanto alle colonne si tengono i totali già sommati per giorno:
+#   data -> raggruppamento -> chiave -> [importo, quantità, ordini]
+# Un report somma solo i giorni del periodo (bisect sull'elenco ordinato
+# dei giorni): il costo dipende da giorni e gruppi, non dal numero di
+# ordini e righe articolo, e nessun file viene aperto.
+#
+# Le colonne si costruiscono una volta, in un thread a parte; dopo,
+# ogni modifica dell'indice aggiorna solo i documenti cambiati: i loro
+# contributi vengono tolti dai totali (ricavandoli dalle colonne) e
+# quelli nuovi aggiunti. La riga vecchia resta spenta nelle colonne.
+# Gli archivi annuali si rileggono (solo se cambiati) a ogni apertura
+# della pagina report e si confrontano con quelli già nelle colonne.
+# ======================================================================
+
+# Raggruppamenti disponibili: chiave -> etichetta
+GROUPS = {
+    "mese": "Mese",
+    "tipo_cerimonia": "Tipo Cerimonia",
+    "operatore": "Operatore",
+    "ditta": "Ditta",
+    "tipo_confetti": "Tipo Confetti",
+}
+
+# Valori calcolabili: chiave -> etichetta
+MEASURES = {
+    "fatturato": "Fatturato (€)",
+    "ordini": "Numero Ordini",
+    "quantita": "Quantità Articoli",
+}
+
+# Date su cui filtrare/raggruppare
+DATE_FIELDS = {
+    "data_ordine": "Data Ordine",
+    "data_cerimonia": "Data Cerimonia",
+}
+
+def _cents(amount):
+    return int(amount * 100)
+
+class _Dictionary:
+    """Codifica testo -> intero (e ritorno) per una colonna di categorie."""
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def encode(self, label):
+        label = label or "N.D."
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+# Righe spente oltre le quali conviene ricostruire le colonne da capo (e almeno metà del totale)
+COMPACT_MIN_DEAD = 1000
+
+class ColumnStore:
+    """
+    Colonne degli ordini.
+    Livello documento (una posizione per ordine): date, categorie, totale, quantità.
+    Livello riga (una posizione per articolo): ordine di appartenenza, ditta, quantità, importo.
+    Livello confetti (una posizione per tipo scelto): ordine di appartenenza, tipo.
+    Le righe e i confetti di un ordine sono contigui: iniziano a doc_lines/doc_confs.
+    Un documento tolto o sostituito resta nelle colonne ma spento (alive = 0).
+
+    totals[campo data][raggruppamento][giorno][chiave] = [importo (cent.), quantità, ordini]
+    days[campo data] = giorni con almeno un ordine, in ordine crescente
+    """
+    def __init__(self):
+        self.dicts = {name: _Dictionary() for name in ("tipo_cerimonia", "operatore", "ditta", "tipo_confetti")}
+        self.rows = {}  # percorso -> posizione del documento
+        self.alive = bytearray()
+        self.dead = 0
+        self.totals = {field: {group: {} for group in GROUPS} for field in DATE_FIELDS}
+        self.days = {field: [] for field in DATE_FIELDS}
+
+        # Colonne documento
+        self.doc_dates = {field: array('l') for field in DATE_FIELDS}  # ordinali (0 = N.D.)
+        self.doc_months = {field: array('l') for field in DATE_FIELDS} # AAAAMM (0 = N.D.)
+        self.doc_cat = {name: array('l') for name in ("tipo_cerimonia", "operatore")}
+        self.doc_total = array('q') # centesimi: somme esatte, niente errori dei float
+        self.doc_qty = array('d')
+        self.doc_lines = array('l') # prima riga articolo dell'ordine
+        self.doc_confs = array('l') # primo tipo confetti dell'ordine
+
+        # Colonne righe articolo
+        self.line_doc = array('l')
+        self.line_ditta = array('l')
+        self.line_qty = array('d')
+        self.line_amount = array('q') # centesimi
+
+        # Colonne tipo confetti (campo a scelta multipla)
+        self.conf_doc = array('l')
+        self.conf_type = array('l')
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, path, summary):
+        row = len(self.doc_total)
+        self.rows[path] = row
+        self.alive.append(1)
+        for field in DATE_FIELDS:
+            # Le date del riepilogo sono già ordinali (0 = N.D.)
+            ordinal = getattr(summary, field)
+            self.doc_dates[field].append(ordinal)
+            d = date.fromordinal(ordinal) if ordinal else None
+            self.doc_months[field].append(d.year * 100 + d.month if d else 0)
+        for name in self.doc_cat:
+            self.doc_cat[name].append(self.dicts[name].encode(getattr(summary, name)))
+        self.doc_total.append(summary.totale) # già in centesimi
+        self.doc_lines.append(len(self.line_doc))
+        self.doc_confs.append(len(self.conf_doc))
+
+        doc_qty = 0.0
+        for ditta, _codice, _descr, qty, price in summary.righe or ():
+            q = float(parse_amount(qty))
+            doc_qty += q
+            self.line_doc.append(row)
+            self.line_ditta.append(self.dicts["ditta"].encode(ditta.strip().upper()))
+            self.line_qty.append(q)
+            self.line_amount.append(_cents(line_total(qty, price)))
+        self.doc_qty.append(doc_qty)
+
+        for flavour in summary.tipo_confetti.split(","):
+            flavour = flavour.strip()
+            if flavour:
+                self.conf_doc.append(row)
+                self.conf_type.append(self.dicts["tipo_confetti"].encode(flavour))
+        self._add_totals(row, 1)
+
+    def remove(self, path):
+        row = self.rows.pop(path, None)
+        if row is not None:
+            self._add_totals(row, -1)
+            self.alive[row] = 0
+            self.dead += 1
+
+    def update(self, updates):
+        """Applica {percorso: riepilogo (None = tolto)}: solo i totali di quei documenti cambiano."""
+        for path, summary in updates.items():
+            self.remove(path)
+            if summary is not None:
+                self.append(path, summary)
+
+    def worn_out(self):
+        """True se le righe spente sono tante da valere una ricostruzione."""
+        return self.dead >= COMPACT_MIN_DEAD and self.dead * 2 > len(self.alive)
+
+    # --- Totali per giorno ---
+
+    def _contributions(self, row):
+        """(raggruppamento, chiave, importo, quantità) con cui l'ordine entra nei totali."""
+        total, qty = self.doc_total[row], self.doc_qty[row]
+        result = [(name, self.doc_cat[name][row], total, qty) for name in self.doc_cat]
+
+        # Ditta: importo e quantità delle sole righe di quella ditta, l'ordine conta una volta
+        last = row + 1 == len(self.doc_lines)
+        end = len(self.line_doc) if last else self.doc_lines[row + 1]
+        by_ditta = {}
+        for i in range(self.doc_lines[row], end):
+            amounts = by_ditta.setdefault(self.line_ditta[i], [0, 0.0])
+            amounts[0] += self.line_amount[i]
+            amounts[1] += self.line_qty[i]
+        result.extend(("ditta", key, amount, q) for key, (amount, q) in by_ditta.items())
+
+        # Un ordine con più tipi di confetti conta (per intero) in ciascun tipo
+        end = len(self.conf_doc) if last else self.doc_confs[row + 1]
+        result.extend(("tipo_confetti", self.conf_type[i], total, qty) for i in range(self.doc_confs[row], end))
+        return result
+
+    def _add_totals(self, row, sign):
+        """Aggiunge (sign=1) o toglie (sign=-1) l'ordine dai totali per giorno."""
+        contributions = self._contributions(row)
+        for field in DATE_FIELDS:
+            ordinal = self.doc_dates[field][row]
+            if not ordinal:
+                continue # Senza data non entra in nessun periodo
+            totals = self.totals[field]
+            # Il raggruppamento per mese comprende tutti gli ordini: i suoi giorni sono l'elenco dei giorni
+            new_day = ordinal not in totals["mese"]
+            month = ("mese", self.doc_months[field][row], self.doc_total[row], self.doc_qty[row])
+            for group, key, amount, qty in [month] + contributions:
+                day = totals[group].setdefault(ordinal, {})
+                values = day.get(key)
+                if values is None:
+                    values = day[key] = [0, 0.0, 0]
+                values[0] += sign * amount
+                values[1] += sign * qty
+                values[2] += sign
+                if not values[2]:
+                    del day[key]
+                    if not day:
+                        del totals[group][ordinal]
+            if new_day:
+                insort(self.days[field], ordinal)
+            elif ordinal not in totals["mese"]:
+                days = self.days[field]
+                del days[bisect_left(days, ordinal)]
+
+    def period_totals(self, date_field, group, lo, hi):
+        """{chiave: [importo, quantità, ordini]} degli ordini con la data tra lo e hi (ordinali, inclusi)."""
+        days = self.days[date_field]
+        by_day = self.totals[date_field][group]
+        result = {}
+        for ordinal in days[bisect_left(days, lo):bisect_right(days, hi)]:
+            for key, (amount, qty, count) in by_day.get(ordinal, {}).items():
+                values = result.get(key)
+                if values is None:
+                    result[key] = [amount, qty, count]
+                else:
+                    values[0] += amount
+                    values[1] += qty
+                    values[2] += count
+        return result
+
+def _measure(measure, values):
+    """Valore da mostrare per [importo in centesimi, quantità, ordini]."""
+    amount, qty, count = values
+    if measure == "fatturato":
+        return amount / 100 # Calcolato in centesimi: torna in euro solo alla fine
+    if measure == "quantita":
+        return round(qty, 6) # Somme e sottrazioni di float: si tolgono i residui di arrotondamento
+    return count
+
+class ReportEngine(QObject):
+    """
+    Report su fatturato e volumi degli ordini.
+    Le colonne si costruiscono in background alla prima richiesta; poi seguono
+    l'indice documento per documento (modifiche e righe articolo lette in ritardo).
+
+    Segnali:
+      - updated(): colonne pronte o cambiate, il report va ricalcolato.
+    """
+    updated = Signal()
+    _built = Signal(int, object) # generazione, colonne (emesso dal thread di costruzione)
+
+    def __init__(self, index):
+        super().__init__()
+        self.index = index
+        self.store = None
+        self.building = False
+        self.generation = 0 # Cresce a ogni sostituzione dell'indice: costruzioni vecchie scartate
+        self.pending = {}   # Modifiche arrivate durante la costruzione
+        self.cold = {}      # Ordini degli archivi annuali nelle colonne: percorso -> riepilogo
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
+        self._built.connect(self._install)
+        index.add_listener(self.on_index_changed)
+        index.add_lines_listener(self.on_lines_loaded)
+
+    def on_index_changed(self, changed, removed, reset):
+        if reset:
+            # Indice sostituito (es. cambio cartella dati): colonne da rifare alla prossima richiesta
+            self.store = None
+            self.building = False
+            self.pending.clear()
+            self.cold = {}
+            self.generation += 1
+            self.updated.emit()
+            return
+        updates = {path: summary for path, summary in changed.items() if summary.tipo == "ordine"}
+        updates.update(dict.fromkeys(removed))
+        self._update(updates)
+        # Documenti nuovi o cambiati letti dalla sola intestazione: le righe seguono in background
+        missing = [path for path, summary in updates.items() if summary is not None and summary.righe is None]
+        if missing and (self.store is not None or self.building):
+            load_lines_async(missing)
+
+    def on_lines_loaded(self, loaded):
+        self._update({path: summary for path, summary in loaded.items() if summary.tipo == "ordine"})
+
+    def _update(self, updates):
+        if not updates:
+            return
+        if self.building:
+            self.pending.update(updates)
+            return
+        if self.store is None:
+            return
+        self.store.update(updates)
+        if self.store.worn_out():
+            self.store = None # Ricostruita (in background) alla prossima richiesta
+        self.updated.emit()
+
+    def columns(self):
+        """
+        Colonne pronte, oppure None: in quel caso la costruzione parte in background
+        e 'updated' avvisa quando è finita.
+        """
+        if self.store is None and not self.building:
+            self.building = True
+            generation = self.generation
+            # Prima gli archivi annuali (con le righe), poi la costruzione vera e propria
+            self._read_archives(lambda cold: self._start_build(generation, cold),
+                                lambda error: self._start_build(generation, []))
+        return self.store
+
+    def _read_archives(self, on_done, on_error):
+        def failed(error):
+            print(f"Attenzione: Impossibile leggere gli archivi annuali per i report: {describe_error(error)}")
+            on_error(error)
+        # Come per la scansione: ogni blocco letto fa ripartire il tempo massimo
+        get_data_io().submit(get_cold_archive().documents_with_lines, self.index.data_dir,
+                             on_done=on_done, on_error=failed, timeout=SCAN_TIMEOUT,
+                             on_progress=lambda done, total: None)
+
+    def _start_build(self, generation, cold):
+        if generation != self.generation:
+            return # Indice sostituito nel frattempo
+        self.cold = dict(cold)
+        docs = self.index.documents("ordine")
+        self.executor.submit(self._build, generation, docs + cold)
+        # Righe articolo mancanti: arrivano in background e aggiornano i loro documenti
+        load_lines_async([path for path, _summary in docs])
+
+    def refresh_archives(self):
+        """
+        Riallinea le colonne agli archivi annuali (es. un anno chiuso da questa o
+        da un'altra postazione). Se le colonne non ci sono ancora non serve:
+        la costruzione legge già gli archivi.
+        """
+        if self.store is None or self.building:
+            return
+        generation = self.generation
+
+        def apply(cold):
+            if generation != self.generation:
+                return
+            cold = dict(cold)
+            # I riepiloghi restano gli stessi oggetti finché l'archivio non cambia
+            updates = {path: summary for path, summary in cold.items() if self.cold.get(path) is not summary}
+            updates.update(dict.fromkeys(set(self.cold) - set(cold)))
+            self.cold = cold
+            self._update(updates)
+        self._read_archives(apply, lambda error: None)
+
+    def _build(self, generation, docs):
+        """(Thread di costruzione) Colonne dai riepiloghi, senza toccare l'indice."""
+        try:
+            store = ColumnStore()
+            for path, summary in docs:
+                store.append(path, summary)
+        except Exception:
+            traceback.print_exc()
+            store = None
+        self._built.emit(generation, store)
+
+    def _install(self, generation, store):
+        if generation != self.generation:
+            return # Indice sostituito nel frattempo
+        self.building = False
+        pending, self.pending = self.pending, {}
+        if store is None:
+            return # Errore già stampato: si riprova alla prossima richiesta
+        self.store = store
+        store.update(pending)
+        self.updated.emit()
+
+    def run(self, group, measure, date_field="data_ordine", date_from=None, date_to=None):
+        """
+        Calcola il report. date_from/date_to sono oggetti date (inclusi) o None.
+        Ritorna (righe, statistiche): righe = [(gruppo, valore, n_ordini)] ordinate
+        per gruppo; statistiche = {"ordini": n, "totale": valore del periodo, "ms": tempo di calcolo}.
+        Ritorna None se le colonne sono ancora in costruzione (vedi columns()).
+        """
+        if group not in GROUPS:
+            raise ValueError(f"Raggruppamento sconosciuto: {group}")
+        start = time.perf_counter()
+        store = self.columns()
+        if store is None:
+            return None
+        lo = date_from.toordinal() if date_from else 1
+        hi = date_to.toordinal() if date_to else date.max.toordinal()
+
+        totals = store.period_totals(date_field, group, lo, hi)
+        if group == "mese":
+            labels = {k: f"{k % 100:02d}/{k // 100}" for k in totals}
+        else:
+            labels = dict(enumerate(store.dicts[group].labels))
+
+        rows = {k: (_measure(measure, values), values[2]) for k, values in totals.items()}
+        result = [(labels[k], value, count) for k, (value, count) in sorted(rows.items())]
+        if group != "mese":
+            result.sort(key=lambda r: r[0].lower())
+
+        # Totale del periodo dai mesi: con ditta o tipo confetti un ordine compare in più gruppi
+        months = totals if group == "mese" else store.period_totals(date_field, "mese", lo, hi)
+        overall = [sum(values[i] for values in months.values()) for i in range(3)]
+        stats = {"ordini": overall[2], "totale": _measure(measure, overall),
+                 "ms": (time.perf_counter() - start) * 1000}
+        return result, stats
+
+_engine = None
+
+def get_report_engine():
+    """Motore report unico (collegato all'indice dei documenti)."""
+    global _engine
+    if _engine is None:
+        _engine = ReportEngine(get_order_index())
+    return _engine
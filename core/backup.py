@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import hashlib
+import zipfile
+import threading
+from datetime import datetime
+
+from PySide6.QtCore import QObject, QTimer
+
+from core.settings import get_settings
+
+# ======================================================================
+# --- BACKUP INCREMENTALE CON DEDUPLICA ---
+# Ogni backup è una "istantanea": un piccolo file JSON che elenca i
+# documenti di orders/ e quotes/ (e del loro archivio) con l'impronta
+# (sha256) del contenuto.
+# Il contenuto vero sta in pacchetti zip compressi, e ogni versione di un
+# documento viene salvata UNA volta sola: un backup che trova 3 ordini
+# modificati aggiunge solo quei 3 file.
+#
+# Struttura della cartella di backup:
+#   istantanee/20261019-153012.json   -> elenco file + impronte
+#   pacchetti/20261019-153012.zip     -> solo i contenuti nuovi di quel backup
+# I pacchetti non vengono mai riscritti: un backup interrotto non può
+# rovinare quelli precedenti.
+# ======================================================================
+
+BACKUP_FOLDER = "backup"            # Cartella di default (dentro la cartella dati)
+SNAPSHOTS_FOLDER = "istantanee"
+PACKS_FOLDER = "pacchetti"
+BACKED_UP_FOLDERS = ("orders", "quotes", "archivio/orders", "archivio/quotes", "archivio/annate")
+# Documenti JSON e archivi annuali (vedi core/cold_archive.py)
+BACKED_UP_EXTENSIONS = (".json", ".pack")
+MANIFEST_VERSION = 1
+
+# Intervalli selezionabili dalle impostazioni (ore; 0 = backup automatico disattivato)
+BACKUP_INTERVALS = [(0, "Disattivato"), (1, "Ogni ora"), (4, "Ogni 4 ore"), (24, "Ogni giorno")]
+
+# Ogni quanto lo scheduler controlla se è ora di fare un backup
+CHECK_INTERVAL_MS = 5 * 60 * 1000
+
+# Ogni quanti file il backup dà un segno di vita a chi lo aspetta (timeout dell'I/O)
+PROGRESS_STEP = 100
+
+# Backup automatici e manuali non devono mai sovrapporsi
+_lock = threading.Lock()
+
+class BackupEngine:
+    """Crea e ripristina le istantanee della cartella dati."""
+
+    def __init__(self, data_dir, backup_dir):
+        self.data_dir = data_dir
+        self.backup_dir = backup_dir
+        self.snapshots_dir = os.path.join(backup_dir, SNAPSHOTS_FOLDER)
+        self.packs_dir = os.path.join(backup_dir, PACKS_FOLDER)
+
+    # --- Istantanee ---
+
+    def snapshots(self):
+        """Identificativi delle istantanee, dalla più vecchia alla più recente."""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.snapshots_dir) if name.endswith(".json"))
+
+    def load_snapshot(self, snapshot_id):
+        with open(os.path.join(self.snapshots_dir, snapshot_id + ".json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def last_snapshot_time(self):
+        """Data/ora dell'ultimo backup (None se non ce ne sono)."""
+        snapshots = self.snapshots()
+        if not snapshots:
+            return None
+        return datetime.strptime(snapshots[-1][:15], "%Y%m%d-%H%M%S")
+
+    def _object_locations(self):
+        """Mappa impronta -> pacchetto che la contiene (ricavata dalle istantanee)."""
+        locations = {}
+        for snapshot_id in self.snapshots():
+            manifest = self.load_snapshot(snapshot_id)
+            for digest in manifest.get("oggetti", []):
+                locations.setdefault(digest, manifest["pacchetto"])
+        return locations
+
+    def _current_files(self):
+        """Genera (percorso relativo, percorso completo, stat) dei documenti da salvare."""
+        for folder in BACKED_UP_FOLDERS:
+            full_folder = os.path.join(self.data_dir, folder)
+            if not os.path.isdir(full_folder):
+                continue
+            with os.scandir(full_folder) as entries:
+                for entry in entries:
+                    if entry.name.endswith(BACKED_UP_EXTENSIONS) and entry.is_file():
+                        yield f"{folder}/{entry.name}", entry.path, entry.stat()
+
+    def create_snapshot(self, progress=None):
+        """
+        Esegue un backup incrementale.
+        I file con stessa data di modifica e dimensione dell'ultimo backup non
+        vengono nemmeno riletti. Ritorna (id istantanea, file nuovi salvati),
+        oppure (None, 0) se dall'ultimo backup non è cambiato nulla.
+        progress(0, 0) ogni PROGRESS_STEP file: solo un segno di vita (il totale non è noto).
+        """
+        with _lock:
+            snapshots = self.snapshots()
+            previous = self.load_snapshot(snapshots[-1])["file"] if snapshots else {}
+            locations = self._object_locations()
+
+            snapshot_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+            suffix = 1
+            while snapshot_id in snapshots:
+                snapshot_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}"
+                suffix += 1
+
+            # 1. Prima i contenuti nuovi (pacchetto), 2. poi l'istantanea che li cita.
+            # Il contenuto viene compresso dagli stessi byte da cui si calcola l'impronta.
+            files = {}
+            new_objects = []
+            pack_name = snapshot_id + ".zip"
+            pack = None
+            try:
+                for count, (rel_path, full_path, stat) in enumerate(self._current_files(), start=1):
+                    if progress and count % PROGRESS_STEP == 0:
+                        progress(0, 0)
+                    old = previous.get(rel_path)
+                    if old and old[1] == stat.st_mtime and old[2] == stat.st_size:
+                        files[rel_path] = old
+                        continue
+                    try:
+                        with open(full_path, 'rb') as f:
+                            content = f.read()
+                    except OSError as e:
+                        print(f"Backup: impossibile leggere {rel_path} ({e})")
+                        continue
+                    digest = hashlib.sha256(content).hexdigest()
+                    files[rel_path] = [digest, stat.st_mtime, stat.st_size]
+                    if digest in locations:
+                        continue
+                    if pack is None:
+                        os.makedirs(self.packs_dir, exist_ok=True)
+                        pack = zipfile.ZipFile(os.path.join(self.packs_dir, pack_name), 'w', zipfile.ZIP_DEFLATED)
+                    pack.writestr(digest, content)
+                    locations[digest] = pack_name
+                    new_objects.append(digest)
+            finally:
+                if pack is not None:
+                    pack.close()
+
+            if {k: v[0] for k, v in files.items()} == {k: v[0] for k, v in previous.items()}:
+                return None, 0
+
+            manifest = {
+                "versione": MANIFEST_VERSION,
+                "creato": datetime.now().isoformat(timespec="seconds"),
+                "pacchetto": pack_name if new_objects else None,
+                "oggetti": sorted(new_objects),
+                "file": files,
+            }
+            os.makedirs(self.snapshots_dir, exist_ok=True)
+            tmp_path = os.path.join(self.snapshots_dir, snapshot_id + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, os.path.join(self.snapshots_dir, snapshot_id + ".json"))
+            return snapshot_id, len(new_objects)
+
+    # --- Ripristino ---
+
+    def _read_object(self, digest, locations, packs):
+        """Contenuto di un documento salvato. 'packs' tiene aperti i pacchetti già usati."""
+        pack_name = locations[digest]
+        if pack_name not in packs:
+            packs[pack_name] = zipfile.ZipFile(os.path.join(self.packs_dir, pack_name))
+        return packs[pack_name].read(digest)
+
+    def _target(self, rel_path):
+        return os.path.join(self.data_dir, *rel_path.split("/"))
+
+    def _write_file(self, rel_path, content):
+        target = self._target(rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = target + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, target)
+        return target
+
+    def restore_document(self, snapshot_id, rel_path):
+        """
+        Ripristina un singolo documento com'era nell'istantanea. Ritorna il percorso scritto.
+        Come per le operazioni su più documenti (core/bulk.py): non si tocca un documento
+        in modifica su un'altra postazione e la modifica finisce nel registro.
+        """
+        # Import ritardati: lo scheduler parte all'avvio, il ripristino serve di rado
+        from core.bulk import check_free
+        from core.leases import release
+        from core.change_feed import record_changes
+        with _lock:
+            digest = self.load_snapshot(snapshot_id)["file"][rel_path][0]
+            check_free([self._target(rel_path)])
+            packs = {}
+            try:
+                path = self._write_file(rel_path, self._read_object(digest, self._object_locations(), packs))
+            finally:
+                for pack in packs.values():
+                    pack.close()
+            release(path)
+            record_changes(saved=[path], data_dir=self.data_dir)
+            return path
+
+    def restore_snapshot(self, snapshot_id, progress=None):
+        """
+        Riporta orders/, quotes/ e archivio allo stato dell'istantanea: i documenti vengono
+        riscritti e quelli creati dopo vengono rimossi. Prima viene fatto un backup
+        dello stato attuale, così anche il ripristino si può annullare.
+        Segue le regole di core/bulk.py: se anche un solo documento da riscrivere o
+        togliere è in modifica su un'altra postazione non si tocca nulla (DocumentsInUse);
+        un errore su un documento non ferma gli altri; alla fine una sola riga di
+        registro modifiche per tutti. progress(fatti, totale) per la barra di avanzamento.
+        Ritorna (file ripristinati, file rimossi, [(percorso relativo, errore)]).
+        """
+        from core.bulk import check_free
+        from core.leases import release
+        from core.change_feed import record_changes
+        self.create_snapshot(progress)
+        with _lock:
+            files = self.load_snapshot(snapshot_id)["file"]
+            locations = self._object_locations()
+            current = {rel_path: full_path for rel_path, full_path, _stat in self._current_files()}
+            to_remove = [(rel_path, full_path) for rel_path, full_path in current.items() if rel_path not in files]
+            done, total = 0, len(files) + len(to_remove)
+
+            def step():
+                nonlocal done
+                done += 1
+                if progress:
+                    progress(done, total)
+
+            # 1. Cosa cambia: solo i documenti con un contenuto diverso (o mancanti)
+            to_write = []
+            for rel_path, (digest, _mtime, _size) in files.items():
+                full_path = current.get(rel_path)
+                if full_path:
+                    with open(full_path, 'rb') as f:
+                        if hashlib.sha256(f.read()).hexdigest() == digest:
+                            step()
+                            continue
+                to_write.append((rel_path, digest))
+                total += 1
+                step()
+            check_free([self._target(rel_path) for rel_path, _digest in to_write] +
+                       [full_path for _rel_path, full_path in to_remove])
+
+            # 2. Riscritture ed eliminazioni, un documento alla volta
+            saved, removed, errors = [], [], []
+            packs = {}
+            try:
+                for rel_path, digest in to_write:
+                    try:
+                        path = self._write_file(rel_path, self._read_object(digest, locations, packs))
+                        release(path)
+                        saved.append(path)
+                    except (OSError, KeyError, zipfile.BadZipFile) as e:
+                        errors.append((rel_path, str(e)))
+                    step()
+            finally:
+                for pack in packs.values():
+                    pack.close()
+
+            for rel_path, full_path in to_remove:
+                try:
+                    os.remove(full_path)
+                    release(full_path)
+                    removed.append(full_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    errors.append((rel_path, str(e)))
+                step()
+            record_changes(saved=saved, removed=removed, data_dir=self.data_dir)
+            return len(saved), len(removed), errors
+
+def get_backup_dir(settings=None):
+    """Cartella di backup configurata (default: 'backup' dentro la cartella dati)."""
+    settings = settings or get_settings()
+    return settings.get("backup_path", "").strip() or os.path.join(settings.data_dir, BACKUP_FOLDER)
+
+def get_backup_engine():
+    """Motore di backup sulle cartelle attualmente configurate."""
+    settings = get_settings()
+    return BackupEngine(settings.data_dir, get_backup_dir(settings))
+
+# --- Backup automatico ---
+
+class BackupScheduler(QObject):
+    """Controlla periodicamente se è ora di un backup e lo esegue in un thread separato."""
+
+    def __init__(self):
+        super().__init__()
+        self.settings = get_settings()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.check)
+        self.timer.start(CHECK_INTERVAL_MS)
+
+    def interval_hours(self):
+        return int(self.settings.get("backup_interval_hours", 0) or 0)
+
+    def is_due(self, engine):
+        hours = self.interval_hours()
+        if hours <= 0:
+            return False
+        last = engine.last_snapshot_time()
+        return last is None or (datetime.now() - last).total_seconds() >= hours * 3600
+
+    def check(self):
+        """
+        Il controllo tocca la cartella di backup (spesso in rete): gira nel thread di I/O
+        (core/data_io.py), e se è ora il backup parte in un thread a sé.
+        """
+        if _lock.locked() or self.interval_hours() <= 0:
+            return
+        from core.data_io import get_data_io
+        # Cartella irraggiungibile o lenta: si riprova al prossimo controllo
+        get_data_io().submit(self._due_engine, on_done=self._start, on_error=lambda e: None)
+
+    def _due_engine(self):
+        """(Thread di I/O) Il motore di backup se è ora di un backup, altrimenti None."""
+        engine = get_backup_engine()
+        return engine if self.is_due(engine) else None
+
+    def _start(self, engine):
+        if engine is not None and not _lock.locked():
+            threading.Thread(target=self._run, args=(engine,), daemon=True).start()
+
+    def _run(self, engine):
+        start = time.perf_counter()
+        try:
+            snapshot_id, new_files = engine.create_snapshot()
+        except Exception as e:
+            print(f"ATTENZIONE: Backup automatico fallito: {e}")
+            return
+        if snapshot_id:
+            print(f"[Backup] Istantanea {snapshot_id}: {new_files} file nuovi in {time.perf_counter() - start:.1f}s")
+
+_scheduler = None
+
+def start_backup_scheduler():
+    """Avvia il backup automatico (il primo controllo avviene subito, poi ogni pochi minuti)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BackupScheduler()
+        _scheduler.check()
+    return _scheduler
@@ -0,0 +1,171 @@
+import os
+import re
+from datetime import datetime
+
+from core.documents import write_document
+from core.change_feed import record_changes
+from core.leases import holder_of, release
+from core.history import record_revision, discard_history
+
+# ======================================================================
+# --- OPERAZIONI SU PIÙ DOCUMENTI ---
+# Eliminazione, conferma dei preventivi e archiviazione di una selezione
+# di documenti, in un unico lavoro in background (vedi core/data_io.py):
+#   1. controllo iniziale: se anche un solo documento è aperto in modifica
+#      su un'altra postazione non si tocca nulla;
+#   2. un documento alla volta, con avanzamento per la barra di progresso;
+#   3. alla fine un solo aggiornamento dell'indice e una sola riga di
+#      registro modifiche per tutti, invece di una rilettura per documento.
+# Non è una transazione: superato il controllo iniziale, ogni documento fa
+# storia a sé. Un errore su un documento non ferma gli altri e non annulla
+# quelli già fatti, quindi il risultato può essere parziale: i documenti non
+# riusciti sono in BulkResult.errors e la pagina li elenca. Dentro un
+# documento invece sì: se la conferma di un preventivo non riesce a
+# eliminarlo, l'ordine appena scritto viene tolto (niente doppioni riprovando).
+# ======================================================================
+
+# Sottocartella della cartella dati con i documenti archiviati (fuori da liste e report)
+ARCHIVE_FOLDER = "archivio"
+# Controllo iniziale: un avanzamento ogni tanti documenti (tiene vivo il timeout dell'I/O)
+CHECK_PROGRESS_STEP = 50
+
+class DocumentsInUse(PermissionError):
+    """Alcuni documenti della selezione sono aperti in modifica su altre postazioni."""
+    def __init__(self, in_use):
+        self.in_use = in_use # [(percorso, nome postazione)]
+        names = "\n".join(f"• {os.path.basename(path)} (in modifica da {holder})" for path, holder in in_use[:10])
+        more = f"\n… e altri {len(in_use) - 10}" if len(in_use) > 10 else ""
+        super().__init__(f"Operazione annullata, nessun documento è stato modificato:\n{names}{more}")
+
+class BulkResult:
+    """Esito di un'operazione: cosa aggiornare nell'indice e cosa non è riuscito."""
+    __slots__ = ("changed", "removed", "errors")
+
+    def __init__(self):
+        self.changed = {} # percorso -> riepilogo (documenti nuovi)
+        self.removed = [] # percorsi tolti dalle liste
+        self.errors = []  # [(percorso, messaggio)]
+
+def unique_path(folder, base_filename):
+    """Percorso libero nella cartella: base.json, poi base_1.json, base_2.json..."""
+    path = os.path.join(folder, f"{base_filename}.json")
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(folder, f"{base_filename}_{counter}.json")
+        counter += 1
+    return path
+
+def check_free(paths, progress=None):
+    """
+    Solleva DocumentsInUse se qualche documento è in modifica su altre postazioni.
+    progress(0, totale), se indicato, ogni CHECK_PROGRESS_STEP documenti: su una selezione
+    grande in rete il controllo da solo può superare il tempo massimo dell'I/O.
+    """
+    in_use = []
+    for done, path in enumerate(paths, start=1):
+        holder = holder_of(path)
+        if holder:
+            in_use.append((path, holder))
+        if progress and done % CHECK_PROGRESS_STEP == 0:
+            progress(0, len(paths))
+    if in_use:
+        raise DocumentsInUse(in_use)
+
+def _run(paths, step, progress):
+    """
+    Esegue step(percorso, risultato) su ogni documento, raccogliendo errori e avanzamento.
+    Tutto o niente solo per i documenti in uso altrove (DocumentsInUse prima di iniziare);
+    per il resto il risultato può essere parziale e nulla viene annullato.
+    """
+    check_free(paths, progress)
+    result = BulkResult()
+    total = len(paths)
+    for done, path in enumerate(paths, start=1):
+        try:
+            step(path, result)
+        except FileNotFoundError:
+            result.removed.append(path) # Già sparito: basta toglierlo dalle liste
+        except (OSError, ValueError, KeyError) as e:
+            result.errors.append((path, str(e)))
+        # Un nostro lease rimasto sul documento non è un errore dell'operazione
+        try:
+            release(path)
+        except OSError as e:
+            print(f"Attenzione: Impossibile liberare {os.path.basename(path)}: {e}")
+        if progress:
+            progress(done, total)
+    record_changes(saved=list(result.changed), removed=result.removed)
+    return result
+
+# --- Operazioni (girano nel thread di I/O) ---
+
+def delete_documents(paths, progress=None):
+    """Elimina definitivamente i documenti."""
+    def step(path, result):
+        os.remove(path)
+        discard_history(path)
+        result.removed.append(path)
+    return _run(paths, step, progress)
+
+def convert_quotes(paths, orders_dir, index, progress=None):
+    """Trasforma i preventivi in ordini con data ordine di oggi (il preventivo viene eliminato)."""
+    # Import ritardato: core.document_cache dipende (tramite l'archivio annuale) da questo modulo
+    from core.document_cache import load_document
+    today = datetime.now().date().isoformat()
+    os.makedirs(orders_dir, exist_ok=True)
+
+    def undo_write(target_path, result):
+        try:
+            os.remove(target_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Non si riesce a toglierlo: almeno compare nelle liste, così lo si vede prima di riprovare
+            print(f"Attenzione: Impossibile annullare {os.path.basename(target_path)}: {e}")
+            try:
+                summary = index.read_entry(target_path)
+            except OSError:
+                return
+            if summary is not None:
+                result.changed[target_path] = summary
+            return
+        discard_history(target_path)
+
+    def step(old_path, result):
+        data = load_document(old_path)
+        data["info_ordine"]["tipo_documento"] = "ordine"
+        data["info_ordine"]["data_ordine"] = today
+
+        cust_name = data["dati_cliente"]["nome_cliente"].strip() or "Cliente"
+        safe_cust_name = re.sub(r'[\\/*?:"<>|]', "", cust_name)
+        safe_cust_name = re.sub(r'\s+', '_', safe_cust_name).strip('_')
+        target_path = unique_path(orders_dir, f"Ordine_{safe_cust_name}_{data['info_ordine']['data_cerimonia']}")
+
+        write_document(target_path, data)
+        try:
+            record_revision(target_path, data, previous_path=old_path, created=True)
+            os.remove(old_path)
+        except Exception:
+            # Il preventivo è rimasto: senza l'ordine appena scritto, riprovare non crea doppioni
+            undo_write(target_path, result)
+            raise
+        discard_history(old_path)
+        summary = index.read_entry(target_path)
+        if summary is not None:
+            result.changed[target_path] = summary
+        result.removed.append(old_path)
+    return _run(paths, step, progress)
+
+def archive_documents(paths, data_dir, progress=None):
+    """
+    Sposta i documenti in archivio/<orders|quotes>/: escono da liste, report e
+    suggerimenti ma restano conservati (e nei backup).
+    """
+    def step(path, result):
+        subfolder = os.path.basename(os.path.dirname(path))
+        folder = os.path.join(data_dir, ARCHIVE_FOLDER, subfolder)
+        os.makedirs(folder, exist_ok=True)
+        target = unique_path(folder, os.path.splitext(os.path.basename(path))[0])
+        os.replace(path, target)
+        result.removed.append(path)
+    return _run(paths, step, progress)
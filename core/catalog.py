@@ -0,0 +1,258 @@
+import os
+import csv
+import shutil
+from datetime import date
+
+from core.order_index import get_order_index
+from core.data_io import get_data_io, load_lines_async, SCAN_TIMEOUT
+from core.prefix_index import PrefixIndex, normalize
+
+# ======================================================================
+# --- CATALOGO PRODOTTI ---
+# Raccoglie ditta/codice/descrizione/prezzo da tutti gli articoli salvati
+# (tramite l'indice dei documenti) e dai listini fornitori importati.
+# I suggerimenti usano indici per prefisso ordinati: la ricerca è una
+# bisezione, quindi resta sotto il millisecondo anche con decine di
+# migliaia di articoli.
+# ======================================================================
+
+# Sottocartella della cartella dati con i listini fornitori importati (CSV)
+PRICE_LISTS_FOLDER = "listini"
+
+# Intestazioni accettate nei CSV dei listini (in minuscolo)
+PRICE_LIST_COLUMNS = ("ditta", "codice", "descrizione", "prezzo")
+
+def _read_price_list(path):
+    """Legge un listino CSV (separatore ';' o ','): (data del listino, [(ditta, codice, descrizione, prezzo)])."""
+    rows = []
+    # La data del listino è quella del file: un ordine più recente ne aggiorna il prezzo
+    day = date.fromtimestamp(os.path.getmtime(path)).toordinal()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        for row in csv.DictReader(f, dialect=dialect):
+            row = {(k or "").strip().lower(): v for k, v in row.items()}
+            rows.append((row.get("ditta"), row.get("codice"), row.get("descrizione"), row.get("prezzo")))
+    return day, rows
+
+def _read_price_lists(folder):
+    """(Thread di I/O) Tutti i listini della cartella, in ordine di nome."""
+    if not os.path.isdir(folder):
+        return []
+    names = sorted(f for f in os.listdir(folder) if f.lower().endswith(".csv"))
+    price_lists = []
+    for name in names:
+        try:
+            price_lists.append(_read_price_list(os.path.join(folder, name)))
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"Attenzione: Impossibile leggere il listino {name}: {e}")
+    return price_lists
+
+def _copy_price_list(source_path, folder):
+    """(Thread di I/O) Controlla le colonne, copia il listino nella cartella e lo legge."""
+    with open(source_path, 'r', encoding='utf-8-sig') as f:
+        header = f.readline().lower()
+    if not all(col in header for col in PRICE_LIST_COLUMNS):
+        raise ValueError("Il listino deve avere le colonne: " + ", ".join(PRICE_LIST_COLUMNS))
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, os.path.basename(source_path))
+    shutil.copyfile(source_path, target)
+    return _read_price_list(target)
+
+class CatalogEntry:
+    """Un articolo del catalogo (identificato da ditta + codice, o descrizione se manca il codice)."""
+    __slots__ = ("ditta", "codice", "descrizione", "prezzo", "data")
+
+    def __init__(self, ditta, codice, descrizione, prezzo, data):
+        self.ditta = ditta
+        self.codice = codice
+        self.descrizione = descrizione
+        self.prezzo = prezzo
+        self.data = data # Data (ordinale) del prezzo: vince sempre il più recente
+
+    def label(self):
+        """Testo mostrato nel menu dei suggerimenti."""
+        parts = [p for p in (self.codice, self.descrizione) if p]
+        text = " — ".join(parts)
+        extra = ", ".join(p for p in (self.ditta, f"€ {self.prezzo}" if self.prezzo else "") if p)
+        return f"{text}  ({extra})" if extra else text
+
+class ProductCatalog:
+    """
+    Catalogo articoli derivato dall'indice dei documenti.
+    Si aggiorna in modo incrementale: riceve dall'indice solo i documenti
+    nuovi o modificati e aggiunge/aggiorna i relativi articoli. Le righe
+    articolo non ancora lette arrivano dopo, dalla lettura in background.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.entries = {} # chiave (ditta, codice/descrizione normalizzati) -> CatalogEntry
+        self.by_code = PrefixIndex()
+        self.by_description = PrefixIndex() # una chiave per ogni parola della descrizione
+        self.rebuild()
+        index.add_listener(self.on_index_changed)
+        index.add_lines_listener(self.on_lines_loaded)
+
+    # --- Costruzione ---
+
+    def rebuild(self):
+        """
+        Ricostruisce da zero con gli articoli dei documenti di cui l'indice ha già le righe
+        (nessun accesso alla cartella dati). Listini e righe mancanti si leggono in
+        background e si aggiungono quando arrivano (le righe una volta sola per documento).
+        """
+        self.entries = {}
+        for summary in self.index.entries.values():
+            self._add_document(summary)
+        self._rebuild_prefix_indexes()
+        load_lines_async()
+        self.load_price_lists_async()
+
+    def on_index_changed(self, changed, removed, reset):
+        if reset:
+            self.rebuild()
+            return
+        # Gli articoli dei documenti eliminati restano: il catalogo è uno storico dei prodotti
+        self._add_documents(changed)
+        load_lines_async(list(changed))
+
+    def on_lines_loaded(self, loaded):
+        self._add_documents(loaded)
+
+    def _add_documents(self, summaries):
+        for summary in summaries.values():
+            for key in self._add_document(summary):
+                self._index_entry(key)
+
+    def _add_document(self, summary):
+        """Aggiunge gli articoli di un documento; ritorna le chiavi toccate."""
+        touched = []
+        for ditta, codice, descrizione, _qty, prezzo in summary.righe or ():
+            key = self._upsert(ditta, codice, descrizione, prezzo, summary.data_ordine)
+            if key:
+                touched.append(key)
+        return touched
+
+    def _upsert(self, ditta, codice, descrizione, prezzo, day):
+        ditta, codice, descrizione, prezzo = (str(v or "").strip() for v in (ditta, codice, descrizione, prezzo))
+        if not codice and not descrizione:
+            return None
+        key = (normalize(ditta), normalize(codice) or normalize(descrizione))
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = CatalogEntry(ditta, codice, descrizione, prezzo, day)
+        elif day >= entry.data:
+            # Dato più recente: aggiorna descrizione e prezzo (se presenti)
+            if descrizione and descrizione != entry.descrizione:
+                # Le parole della descrizione vecchia non devono più suggerire l'articolo
+                # (quelle nuove le aggiunge _index_entry)
+                for word in self._description_keys(entry):
+                    self.by_description.remove(word, key)
+                entry.descrizione = descrizione
+            entry.prezzo = prezzo or entry.prezzo
+            entry.data = day
+        return key
+
+    def _rebuild_prefix_indexes(self):
+        self.by_code.rebuild([(normalize(e.codice), k) for k, e in self.entries.items() if e.codice])
+        self.by_description.rebuild([
+            (word, k) for k, e in self.entries.items() for word in self._description_keys(e)
+        ])
+
+    def _index_entry(self, key):
+        entry = self.entries[key]
+        if entry.codice:
+            self.by_code.add(normalize(entry.codice), key)
+        for word in self._description_keys(entry):
+            self.by_description.add(word, key)
+
+    @staticmethod
+    def _description_keys(entry):
+        """Chiavi di ricerca della descrizione: la frase intera e ogni parola che la compone."""
+        text = normalize(entry.descrizione)
+        if not text:
+            return []
+        words = text.split()
+        return [text] + [" ".join(words[i:]) for i in range(1, len(words))]
+
+    # --- Listini fornitori ---
+
+    def _price_list_dir(self):
+        return os.path.join(self.index.data_dir, PRICE_LISTS_FOLDER)
+
+    def load_price_lists_async(self):
+        """Legge i listini della cartella dati in background e ne aggiunge gli articoli."""
+        data_dir = self.index.data_dir
+
+        def loaded(price_lists):
+            if self.index.data_dir != data_dir:
+                return # Cartella cambiata nel frattempo
+            for day, rows in price_lists:
+                for key in self._add_price_list(day, rows):
+                    self._index_entry(key)
+        get_data_io().submit(_read_price_lists, self._price_list_dir(), on_done=loaded)
+
+    def _add_price_list(self, day, rows):
+        """Aggiunge gli articoli di un listino letto con _read_price_list; ritorna le chiavi toccate."""
+        touched = []
+        for ditta, codice, descrizione, prezzo in rows:
+            key = self._upsert(ditta, codice, descrizione, prezzo, day)
+            if key:
+                touched.append(key)
+        return touched
+
+    def import_price_list_async(self, source_path, on_done, on_error):
+        """
+        Copia un listino CSV nella cartella dati condivisa (così lo vedono tutte le
+        postazioni) e lo aggiunge al catalogo. Copia e lettura girano in background;
+        on_done(numero di articoli letti) e on_error(errore) nel thread dell'interfaccia.
+        """
+        data_dir = self.index.data_dir
+
+        def loaded(price_list):
+            touched = []
+            if self.index.data_dir == data_dir: # Altrimenti lo leggerà la nuova cartella
+                touched = self._add_price_list(*price_list)
+                for key in touched:
+                    self._index_entry(key)
+            on_done(len(touched))
+        # Copia di un file magari grande sulla condivisione: margine da scansione
+        get_data_io().submit(_copy_price_list, source_path, self._price_list_dir(),
+                             on_done=loaded, on_error=on_error, timeout=SCAN_TIMEOUT)
+
+    # --- Ricerca ---
+
+    def complete_code(self, prefix, limit=15):
+        """Articoli il cui codice inizia con 'prefix'."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        return [self.entries[k] for k in self.by_code.lookup(prefix, limit)]
+
+    def complete_description(self, prefix, limit=15):
+        """Articoli la cui descrizione (o una sua parola) inizia con 'prefix'."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        return [self.entries[k] for k in self.by_description.lookup(prefix, limit)]
+
+    def suppliers(self):
+        """Ditte presenti nel catalogo, in ordine alfabetico."""
+        return sorted({e.ditta.upper() for e in self.entries.values() if e.ditta})
+
+_catalog = None
+
+def get_catalog():
+    """Catalogo unico dell'applicazione (costruito al primo uso dall'indice dei documenti)."""
+    global _catalog
+    if _catalog is None:
+        # Costruito subito dalla cache dell'indice; i file cambiati arrivano
+        # poco dopo dalla scansione in background (tramite le notifiche dell'indice)
+        from core.data_io import refresh_index_async
+        _catalog = ProductCatalog(get_order_index())
+        refresh_index_async()
+    return _catalog
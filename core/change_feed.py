@@ -0,0 +1,258 @@
+import os
+import json
+import uuid
+import socket
+import hashlib
+import threading
+from datetime import datetime
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from paths import CACHE_DIR
+
+# ======================================================================
+# --- REGISTRO CONDIVISO DELLE MODIFICHE ---
+# Con più postazioni sulla stessa cartella dati, ogni salvataggio,
+# eliminazione o conferma di preventivo aggiunge una riga a un registro
+# in fondo al file (append-only) nella cartella dati:
+#   modifiche/generazione        -> numero del registro in uso
+#   modifiche/registro_<n>.jsonl -> una riga JSON per modifica
+# Ogni postazione ricorda fin dove ha letto (offset in byte) e ogni pochi
+# secondi legge solo le righe nuove, aggiornando indice e liste aperte
+# senza riscandire l'archivio.
+#
+# Compattazione: oltre MAX_LOG_BYTES si passa a un nuovo registro
+# (generazione successiva). Chi stava leggendo il vecchio lo finisce e poi
+# passa al nuovo; i registri più vecchi di una generazione vengono
+# eliminati. Una postazione rimasta spenta a lungo, che non trova più il
+# suo registro, fa una scansione completa (l'indice rilegge solo i file cambiati).
+# ======================================================================
+
+FEED_FOLDER = "modifiche"
+GENERATION_FILE = "generazione"
+MAX_LOG_BYTES = 256 * 1024
+POLL_INTERVAL_MS = 3000
+
+# Identificativo di questa sessione del programma (distingue le proprie modifiche da quelle altrui)
+HOST_NAME = os.environ.get("COMPUTERNAME") or socket.gethostname() or "postazione"
+STATION_ID = f"{HOST_NAME}-{uuid.uuid4().hex[:8]}"
+
+def station_name():
+    """Nome della postazione mostrato agli altri (Impostazioni, altrimenti il nome del computer)."""
+    from core.settings import get_settings
+    return get_settings().get("station_name", "").strip() or HOST_NAME
+
+_lock = threading.Lock() # Le scritture arrivano da più thread di I/O
+
+def _log_name(generation):
+    return f"registro_{generation}.jsonl"
+
+def _current_generation(folder):
+    try:
+        with open(os.path.join(folder, GENERATION_FILE), 'r', encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+# --- Scrittura (dai thread di I/O, subito dopo l'operazione sul file) ---
+
+def record_changes(saved=(), removed=(), data_dir=None):
+    """
+    Aggiunge al registro i documenti salvati e/o eliminati da questa postazione.
+    Un registro non aggiornabile non deve far fallire il salvataggio: si avvisa e basta
+    (le altre postazioni vedranno la modifica alla prossima scansione).
+    """
+    if data_dir is None:
+        from core.settings import get_settings
+        data_dir = get_settings().data_dir
+    now = datetime.now().isoformat(timespec="seconds")
+    lines = [
+        json.dumps({"postazione": STATION_ID, "nome": station_name(), "azione": action,
+                    "file": os.path.relpath(path, data_dir).replace(os.sep, "/"), "ora": now},
+                   ensure_ascii=False) + "\n"
+        for action, paths in (("salvato", saved), ("eliminato", removed)) for path in paths
+    ]
+    if not lines:
+        return
+    folder = os.path.join(data_dir, FEED_FOLDER)
+    try:
+        with _lock:
+            os.makedirs(folder, exist_ok=True)
+            generation = _current_generation(folder)
+            # Una sola write per blocco di righe: sulle cartelle di rete le aggiunte restano intere
+            with open(os.path.join(folder, _log_name(generation)), 'a', encoding='utf-8') as f:
+                f.write("".join(lines))
+                size = f.tell()
+            if size > MAX_LOG_BYTES:
+                _rotate(folder, generation)
+    except OSError as e:
+        print(f"Attenzione: Impossibile aggiornare il registro modifiche: {e}")
+
+def _rotate(folder, generation):
+    """Compattazione: si passa al registro successivo e si elimina quello di due generazioni fa."""
+    tmp_path = os.path.join(folder, GENERATION_FILE + f".{STATION_ID}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(str(generation + 1))
+    os.replace(tmp_path, os.path.join(folder, GENERATION_FILE))
+    try:
+        os.remove(os.path.join(folder, _log_name(generation - 1)))
+    except OSError:
+        pass
+
+# --- Lettura delle modifiche altrui ---
+
+class ChangeFeed(QObject):
+    """
+    Segue il registro delle modifiche della cartella dati.
+
+    Segnali:
+      - remote_changes(list): righe scritte da ALTRE postazioni appena applicate
+        all'indice, come dict {"postazione", "nome", "azione", "file" (percorso completo), "ora"}.
+    """
+    remote_changes = Signal(list)
+
+    def __init__(self, index, io):
+        super().__init__()
+        self.index = index
+        self.io = io
+        self.polling = False
+        self.set_data_dir(index.data_dir)
+        index.add_listener(self.on_index_changed)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(POLL_INTERVAL_MS)
+
+    # --- Cartella e posizione di lettura ---
+
+    def set_data_dir(self, data_dir):
+        self.data_dir = data_dir
+        self.folder = os.path.join(data_dir, FEED_FOLDER)
+        digest = hashlib.sha1(os.path.abspath(data_dir).encode("utf-8")).hexdigest()[:12]
+        self.position_path = os.path.join(CACHE_DIR, f"registro_{digest}.json")
+        self.position = self._load_position() # (generazione, offset) oppure None = da inizializzare
+
+    def on_index_changed(self, changed, removed, reset):
+        # Indice ri-puntato su un'altra cartella dati: si segue il suo registro
+        if reset and self.index.data_dir != self.data_dir:
+            self.set_data_dir(self.index.data_dir)
+
+    def _load_position(self):
+        try:
+            with open(self.position_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return int(data["generazione"]), int(data["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_position(self):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(self.position_path, 'w', encoding='utf-8') as f:
+                json.dump({"generazione": self.position[0], "offset": self.position[1]}, f)
+        except OSError as e:
+            print(f"Attenzione: Impossibile salvare la posizione del registro modifiche: {e}")
+
+    def poll(self):
+        """Legge in background le righe nuove del registro (se non c'è già una lettura in corso)."""
+        if self.polling:
+            return
+        self.polling = True
+        data_dir = self.data_dir
+        self.io.submit(self._read_new, self.folder, data_dir, self.position,
+                       on_done=lambda result: self._apply(data_dir, result),
+                       on_error=self._poll_failed)
+
+    def _poll_failed(self, error):
+        self.polling = False
+
+    def _read_new(self, folder, data_dir, position):
+        """
+        (Thread di I/O) Legge dal punto in cui si era arrivati.
+        Ritorna (nuova posizione, righe, riepiloghi dei file salvati, serve_scansione_completa).
+        """
+        current = _current_generation(folder)
+        if position is None:
+            # Prima volta su questa cartella: si parte dalla fine (lo stato attuale lo dà l'indice)
+            log_path = os.path.join(folder, _log_name(current))
+            size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+            return (current, size), [], {}, False
+
+        generation, offset = position
+        records = []
+        while True:
+            log_path = os.path.join(folder, _log_name(generation))
+            try:
+                with open(log_path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except FileNotFoundError:
+                if generation != current:
+                    # Registro già eliminato (o registro ricreato da capo): modifiche perse, si riscandisce tutto
+                    return (current, 0), [], {}, True
+                data = b""
+            # Solo righe complete: un'aggiunta in corso verrà letta al prossimo giro
+            complete = data[:data.rfind(b"\n") + 1]
+            offset += len(complete)
+            for line in complete.decode("utf-8", errors="replace").splitlines():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+            if generation == current:
+                break
+            generation, offset = generation + 1, 0 # Registro vecchio finito: si passa al successivo
+
+        # Riepiloghi (intestazioni) dei documenti salvati da altri, letti qui nel thread di I/O
+        summaries = {}
+        for record in records:
+            if record.get("postazione") == STATION_ID or record.get("azione") != "salvato":
+                continue
+            path = os.path.join(data_dir, *str(record.get("file", "")).split("/"))
+            try:
+                summaries[path] = self.index.read_entry(path)
+            except (OSError, ValueError):
+                summaries[path] = None # Già eliminato o spostato
+        return (generation, offset), records, summaries, False
+
+    def _apply(self, data_dir, result):
+        self.polling = False
+        if data_dir != self.data_dir:
+            return # Cartella dati cambiata nel frattempo
+        position, records, summaries, full_rescan = result
+        self.position = position
+        self._save_position()
+
+        if full_rescan:
+            from core.data_io import refresh_index_async
+            refresh_index_async()
+            return
+
+        changed, removed, remote = {}, {}, []
+        for record in records:
+            if record.get("postazione") == STATION_ID:
+                continue
+            path = os.path.join(self.data_dir, *str(record.get("file", "")).split("/"))
+            if record.get("azione") == "salvato" and summaries.get(path) is not None:
+                changed[path] = summaries[path]
+                removed.pop(path, None)
+            elif path in self.index.entries:
+                removed[path] = self.index.entries[path]
+                changed.pop(path, None)
+            remote.append({**record, "file": path})
+
+        if changed or removed:
+            self.index.apply(changed, removed)
+        if remote:
+            self.remote_changes.emit(remote)
+
+_feed = None
+
+def get_change_feed():
+    """Registro modifiche unico (collegato all'indice e al livello di I/O)."""
+    global _feed
+    if _feed is None:
+        from core.order_index import get_order_index
+        from core.data_io import get_data_io
+        _feed = ChangeFeed(get_order_index(), get_data_io())
+    return _feed
@@ -0,0 +1,307 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import threading
+from collections import namedtuple
+from datetime import date
+from contextlib import contextmanager
+
+from core.documents import read_document, read_header, build_header, HEADER_KEY
+from core.schema import migrate
+from core.totals import ensure_summary
+from core.summaries import DocumentSummary, document_lines
+from core.change_feed import STATION_ID, record_changes
+from core.leases import release
+from core.bulk import ARCHIVE_FOLDER, BulkResult, check_free
+
+# ======================================================================
+# --- ARCHIVIO ANNUALE (ORDINI DEGLI ANNI PASSATI) ---
+# Gli ordini di un anno concluso vengono raccolti in un unico file
+# compresso, archivio/annate/ordini_<anno>.pack, e tolti da orders/:
+# la scansione dell'indice e le liste correnti non li rileggono più.
+# Restano visibili alla ricerca "Archivio" e allo storico cliente (pagina
+# di ricerca), ai report (le righe articolo si leggono una volta per
+# versione dell'archivio) e all'esportazione.
+#
+# Struttura del file:
+#   PACK_MAGIC
+#   documento 1 (zlib) | documento 2 (zlib) | ...
+#   indice (zlib, JSON): [[nome, offset, lunghezza, intestazione], ...]
+#   coda fissa: offset indice, lunghezza indice, PACK_MAGIC
+# Il file si legge con mmap: per elencare i documenti si decomprime solo
+# l'indice (le intestazioni bastano a ricerca e tabella), per aprirne uno
+# si decomprime solo il suo tratto. La mappatura resta aperta il tempo
+# di una lettura, così il file può essere sostituito all'archiviazione
+# successiva anche se altre postazioni lo hanno consultato.
+#
+# Un documento archiviato si indica con "percorso archivio|nome file"
+# (il carattere '|' non è ammesso nei nomi di file) e si apre in sola lettura.
+# ======================================================================
+
+PACKS_FOLDER = "annate"
+PACK_EXTENSION = ".pack"
+PACK_SEPARATOR = "|"
+PACK_MAGIC = b"BMPACK1\n"
+PACK_VERSION = 1
+_TRAILER = struct.Struct("<QQ8s")
+
+# Si scrive una volta l'anno e si legge spesso: compressione massima
+COMPRESSION_LEVEL = 9
+# Copia dei documenti già archiviati: un avanzamento ogni tanti (tiene vivo il timeout dell'I/O)
+COPY_PROGRESS_STEP = 200
+
+# "stat" di un documento archiviato per DocumentSummary (data dell'archivio, byte compressi)
+PackStat = namedtuple("PackStat", "st_mtime st_size")
+
+def packs_dir(data_dir):
+    return os.path.join(data_dir, ARCHIVE_FOLDER, PACKS_FOLDER)
+
+def pack_path(data_dir, year):
+    return os.path.join(packs_dir(data_dir), f"ordini_{year}{PACK_EXTENSION}")
+
+def is_packed(path):
+    """True se il percorso indica un documento dentro un archivio annuale."""
+    return PACK_SEPARATOR in path
+
+def split_packed(path):
+    """'archivio|nome' -> (percorso archivio, nome del documento)."""
+    pack, _, name = path.partition(PACK_SEPARATOR)
+    return pack, name
+
+def document_name(path):
+    """Nome del file del documento, anche se archiviato."""
+    return split_packed(path)[1] if is_packed(path) else os.path.basename(path)
+
+def archive_year(summary):
+    """Anno a cui appartiene un ordine: cerimonia, altrimenti consegna o data ordine (None se mancanti)."""
+    ordinal = summary.data_cerimonia or summary.data_consegna or summary.data_ordine
+    return date.fromordinal(ordinal).year if ordinal else None
+
+# --- Lettura ---
+
+@contextmanager
+def _mapped(path):
+    """Il file mappato in sola lettura, con il suo stat (preso sullo stesso file aperto)."""
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size < len(PACK_MAGIC) + _TRAILER.size:
+            raise ValueError(f"{os.path.basename(path)} non è un archivio valido")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view, stat
+
+def _read_index(view):
+    offset, length, magic = _TRAILER.unpack_from(view, len(view) - _TRAILER.size)
+    if view[:len(PACK_MAGIC)] != PACK_MAGIC or magic != PACK_MAGIC or offset + length > len(view) - _TRAILER.size:
+        raise ValueError("Archivio non valido o incompleto")
+    try:
+        return json.loads(zlib.decompress(view[offset:offset + length]).decode("utf-8"))
+    except zlib.error as e:
+        raise ValueError(f"Indice dell'archivio danneggiato: {e}")
+
+class ColdArchive:
+    """
+    Posizioni e riepiloghi dei documenti negli archivi annuali.
+    Un archivio viene riletto solo se cambia (data di modifica o dimensione):
+    le visite successive alla ricerca nell'archivio non toccano il disco.
+    """
+    def __init__(self):
+        self._lock = threading.Lock() # Letture da più thread di I/O
+        # percorso archivio -> (mtime, size, {nome: (offset, lunghezza)}, [(percorso, riepilogo)])
+        self.packs = {}
+
+    def _pack(self, path, view, stat):
+        cached = self.packs.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached
+        locations, docs = {}, []
+        for name, offset, length, header in _read_index(view)["documenti"]:
+            locations[name] = (offset, length)
+            summary = DocumentSummary.from_header(header, "ordine", PackStat(stat.st_mtime, length))
+            docs.append((path + PACK_SEPARATOR + name, summary))
+        cached = self.packs[path] = (stat.st_mtime, stat.st_size, locations, docs)
+        return cached
+
+    def _cached(self, path):
+        """Dati di un archivio già letto e non cambiato, senza mapparlo."""
+        cached = self.packs.get(path)
+        if cached:
+            stat = os.stat(path)
+            if cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+                return cached
+        with _mapped(path) as (view, stat):
+            return self._pack(path, view, stat)
+
+    def documents(self, data_dir):
+        """(Thread di I/O) Elenco (percorso, riepilogo) di tutti i documenti archiviati della cartella dati."""
+        folder = packs_dir(data_dir)
+        paths = []
+        if os.path.isdir(folder):
+            paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(PACK_EXTENSION))
+        docs = []
+        with self._lock:
+            for path in paths:
+                try:
+                    docs.extend(self._cached(path)[3])
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    print(f"Attenzione: Impossibile leggere l'archivio {os.path.basename(path)}: {e}")
+            # Archivi spariti (o di un'altra cartella dati): non servono più
+            for path in set(self.packs) - set(paths):
+                del self.packs[path]
+        return docs
+
+    def documents_with_lines(self, data_dir, progress=None):
+        """
+        (Thread di I/O) Come documents(), con le righe articolo nei riepiloghi (servono ai report).
+        Le righe restano nei riepiloghi in memoria: si rileggono solo se l'archivio cambia.
+        """
+        docs = self.documents(data_dir)
+        missing = [(path, summary) for path, summary in docs if summary.righe is None]
+        for done, (path, summary) in enumerate(missing, 1):
+            try:
+                summary.righe = document_lines(self.read(path))
+            except (ValueError, KeyError, TypeError) as e:
+                # Documento rovinato: conta nei report senza righe, come quelli senza articoli
+                print(f"Attenzione: Righe illeggibili per {document_name(path)}: {e}")
+                summary.righe = []
+            if progress and done % COPY_PROGRESS_STEP == 0:
+                progress(done, len(missing))
+        return docs
+
+    def read(self, path):
+        """(Thread di I/O) Documento completo da un archivio, come read_document."""
+        pack, name = split_packed(path)
+        with _mapped(pack) as (view, stat):
+            with self._lock:
+                locations = self._pack(pack, view, stat)[2]
+            if name not in locations:
+                raise FileNotFoundError(f"{name} non è presente in {os.path.basename(pack)}")
+            offset, length = locations[name]
+            content = zlib.decompress(view[offset:offset + length])
+        document = json.loads(content.decode("utf-8"))
+        migrate(document)
+        ensure_summary(document)
+        return document
+
+_cold_archive = None
+
+def get_cold_archive():
+    global _cold_archive
+    if _cold_archive is None:
+        _cold_archive = ColdArchive()
+    return _cold_archive
+
+def read_any(path):
+    """Legge un documento, dalla cartella dati o da un archivio annuale."""
+    if is_packed(path):
+        return get_cold_archive().read(path)
+    return read_document(path)
+
+# --- Archiviazione (gira nel thread di I/O) ---
+
+def _header_of(path):
+    """Intestazione del documento; per i file nel formato precedente la si ricava dal contenuto."""
+    header = read_header(path)
+    if header is None:
+        data = read_document(path)
+        header = build_header(data, data.get(HEADER_KEY, {}).get("revisione", 0))
+    return header
+
+def _unique_name(names, name):
+    base, ext = os.path.splitext(name)
+    counter = 1
+    while name in names:
+        name = f"{base}_{counter}{ext}"
+        counter += 1
+    return name
+
+def pack_year(paths, data_dir, year, progress=None):
+    """
+    Sposta gli ordini indicati nell'archivio dell'anno. Se l'archivio esiste già
+    i documenti vi vengono aggiunti (quelli presenti sono copiati senza ricomprimerli).
+    L'archivio viene scritto per intero su un file temporaneo e sostituito in un
+    colpo solo: gli originali si eliminano solo dopo, quindi un'interruzione non
+    perde nulla (al massimo un documento resta sia in orders/ sia nell'archivio).
+    progress(fatti, totale) conta anche la copia dei documenti già archiviati
+    e la scrittura finale: su un archivio grande ogni fase dà segno di vita.
+    """
+    check_free(paths, progress)
+    result = BulkResult()
+    target = pack_path(data_dir, year)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.{STATION_ID}.tmp"
+    entries, packed = [], []
+    done, total = 0, len(paths) + 1 # +1: indice e scrittura su disco
+
+    def step(count=1):
+        nonlocal done
+        done += count
+        if progress:
+            progress(done, total)
+
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(PACK_MAGIC)
+            # 1. Documenti già archiviati: gli stessi byte compressi
+            if os.path.exists(target):
+                with _mapped(target) as (view, _stat):
+                    existing = _read_index(view)["documenti"]
+                    total += len(existing)
+                    for copied, (name, offset, length, header) in enumerate(existing, start=1):
+                        entries.append([name, out.tell(), length, header])
+                        out.write(view[offset:offset + length])
+                        if copied % COPY_PROGRESS_STEP == 0 or copied == len(existing):
+                            step(copied - done)
+            names = {entry[0] for entry in entries}
+
+            # 2. Documenti nuovi, il contenuto del file così com'è
+            for path in paths:
+                try:
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                    header = _header_of(path)
+                except FileNotFoundError:
+                    result.removed.append(path) # Già sparito: basta toglierlo dalle liste
+                except (OSError, ValueError, KeyError) as e:
+                    result.errors.append((path, str(e)))
+                else:
+                    name = _unique_name(names, os.path.basename(path))
+                    names.add(name)
+                    blob = zlib.compress(content, COMPRESSION_LEVEL)
+                    entries.append([name, out.tell(), len(blob), header])
+                    out.write(blob)
+                    packed.append(path)
+                step()
+
+            # 3. Indice e coda
+            index = json.dumps({"versione": PACK_VERSION, "anno": year, "documenti": entries},
+                               ensure_ascii=False, separators=(",", ":"))
+            index_blob = zlib.compress(index.encode("utf-8"), COMPRESSION_LEVEL)
+            index_offset = out.tell()
+            out.write(index_blob)
+            out.write(_TRAILER.pack(index_offset, len(index_blob), PACK_MAGIC))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, target)
+        step()
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # 4. Archivio al sicuro: ora si tolgono gli originali
+    for path in packed:
+        try:
+            os.remove(path)
+            release(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            result.errors.append((path, f"archiviato, ma l'originale non è stato eliminato ({e})"))
+            continue
+        result.removed.append(path)
+    record_changes(removed=result.removed, data_dir=data_dir)
+    return result
@@ -0,0 +1,142 @@
+import re
+
+from core.order_index import get_order_index
+from core.prefix_index import PrefixIndex, normalize
+
+# ======================================================================
+# --- RUBRICA CLIENTI ---
+# Elenco dei clienti senza doppioni, ricavato dall'indice dei documenti.
+# Si aggiorna solo con i documenti cambiati (nessuna scansione
+# dell'archivio mentre si digita) e risponde per prefisso di nome o
+# telefono.
+# ======================================================================
+
+def normalize_phone(phone):
+    """Solo cifre, senza prefisso internazionale italiano."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if digits.startswith("0039"):
+        digits = digits[4:]
+    elif digits.startswith("39") and len(digits) > 10:
+        digits = digits[2:]
+    return digits
+
+class Customer:
+    """Un cliente della rubrica con i documenti (percorsi) a lui collegati."""
+    __slots__ = ("nome", "telefono", "documenti", "ultima_data")
+
+    def __init__(self, nome, telefono):
+        self.nome = nome
+        self.telefono = telefono
+        self.documenti = set()
+        self.ultima_data = 0 # Data ordine più recente (ordinale): decide nome/telefono mostrati
+
+    def label(self):
+        """Testo mostrato nel menu dei suggerimenti."""
+        count = len(self.documenti)
+        docs = f"{count} document{'o' if count == 1 else 'i'}"
+        return f"{self.nome} — {self.telefono}  ({docs})" if self.telefono else f"{self.nome}  ({docs})"
+
+class CustomerDirectory:
+    """
+    Rubrica clienti, chiave = (nome normalizzato, telefono normalizzato).
+    Stesso nome scritto con maiuscole/spazi diversi o telefono con/senza
+    +39 corrispondono allo stesso cliente.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.rebuild()
+        index.add_listener(self.on_index_changed)
+
+    def rebuild(self):
+        self.customers = {}    # chiave -> Customer
+        self.doc_customer = {} # percorso documento -> chiave cliente
+        for path, summary in self.index.entries.items():
+            self._assign(path, summary, update_prefix=False)
+        self.by_name = PrefixIndex()
+        self.by_phone = PrefixIndex()
+        self.by_name.rebuild([(k, key) for key in self.customers for k in self._name_keys(key)])
+        self.by_phone.rebuild([(key[1], key) for key in self.customers if key[1]])
+
+    def on_index_changed(self, changed, removed, reset):
+        if reset:
+            self.rebuild()
+            return
+        for path in removed:
+            self._unassign(path)
+        for path, summary in changed.items():
+            self._assign(path, summary)
+
+    # --- Aggiornamento incrementale ---
+
+    def _assign(self, path, summary, update_prefix=True):
+        nome = " ".join(summary.nome_cliente.split())
+        telefono = summary.telefono_cliente.strip()
+        if not nome:
+            self._unassign(path)
+            return
+        key = (normalize(nome), normalize_phone(telefono))
+
+        if self.doc_customer.get(path) != key:
+            self._unassign(path)
+
+        customer = self.customers.get(key)
+        if customer is None:
+            customer = self.customers[key] = Customer(nome, telefono)
+            if update_prefix:
+                for k in self._name_keys(key):
+                    self.by_name.add(k, key)
+                if key[1]:
+                    self.by_phone.add(key[1], key)
+
+        customer.documenti.add(path)
+        self.doc_customer[path] = key
+        data = summary.data_ordine
+        if data >= customer.ultima_data:
+            customer.nome, customer.telefono, customer.ultima_data = nome, telefono, data
+
+    def _unassign(self, path):
+        key = self.doc_customer.pop(path, None)
+        if key is None:
+            return
+        customer = self.customers[key]
+        customer.documenti.discard(path)
+        if not customer.documenti:
+            # Nessun documento rimasto: il cliente esce dalla rubrica
+            del self.customers[key]
+            for k in self._name_keys(key):
+                self.by_name.remove(k, key)
+            if key[1]:
+                self.by_phone.remove(key[1], key)
+
+    @staticmethod
+    def _name_keys(key):
+        """Il nome intero e ogni parola da cui inizia (cerca sia per nome che per cognome)."""
+        words = key[0].split()
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    # --- Ricerca ---
+
+    def search(self, text, limit=15):
+        """Clienti il cui nome (o una sua parola) o telefono inizia con il testo digitato."""
+        compact = re.sub(r"[\s\-/.]", "", text)
+        if compact.lstrip("+").isdigit():
+            # Solo cifre: ricerca per telefono (il prefisso +39 digitato viene ignorato)
+            phone = re.sub(r"^(\+39|0039)", "", compact)
+            keys = self.by_phone.lookup(phone, limit) if phone else []
+        else:
+            prefix = normalize(text)
+            keys = self.by_name.lookup(prefix, limit) if prefix else []
+        return [self.customers[k] for k in keys]
+
+_directory = None
+
+def get_customer_directory():
+    """Rubrica unica dell'applicazione (costruita al primo uso dall'indice dei documenti)."""
+    global _directory
+    if _directory is None:
+        # Costruito subito dalla cache dell'indice; i file cambiati arrivano
+        # poco dopo dalla scansione in background (tramite le notifiche dell'indice)
+        from core.data_io import refresh_index_async
+        _directory = CustomerDirectory(get_order_index())
+        refresh_index_async()
+    return _directory
@@ -0,0 +1,245 @@
+import os
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from core.settings import get_settings
+
+# ======================================================================
+# --- ACCESSO ALLA CARTELLA DATI SENZA BLOCCARE L'INTERFACCIA ---
+# Le operazioni sui file della cartella dati (spesso una cartella di rete)
+# girano su un piccolo gruppo di thread. Il risultato torna nel thread
+# dell'interfaccia tramite callback, e se la cartella non risponde entro
+# il tempo massimo l'operazione viene data per fallita.
+#
+# "Interruttore" (circuit breaker): dopo alcuni errori di rete di fila la
+# cartella viene considerata irraggiungibile e le operazioni falliscono
+# subito, senza attese, finché una prova periodica non la ritrova.
+# ======================================================================
+
+WORKERS = 4
+
+# Secondi concessi a una singola operazione (apertura, eliminazione)
+DEFAULT_TIMEOUT = 10.0
+# La scansione dell'archivio tocca molti file: più tempo a disposizione
+SCAN_TIMEOUT = 60.0
+
+# Errori di rete consecutivi prima di considerare la cartella irraggiungibile
+FAILURE_THRESHOLD = 3
+# Ogni quanti secondi, a cartella irraggiungibile, si riprova a raggiungerla
+RETRY_AFTER = 15.0
+
+class ShareUnavailable(OSError):
+    """La cartella dati è considerata irraggiungibile (l'operazione non è nemmeno partita)."""
+
+class IOTimeout(OSError):
+    """L'operazione non si è conclusa entro il tempo massimo."""
+
+# Errori che riguardano il singolo file, non la raggiungibilità della cartella
+_FILE_ERRORS = (FileNotFoundError, FileExistsError, PermissionError, IsADirectoryError, NotADirectoryError)
+
+def is_connectivity_error(error):
+    return isinstance(error, (IOTimeout, ShareUnavailable)) or (
+        isinstance(error, OSError) and not isinstance(error, _FILE_ERRORS)
+    )
+
+def describe_error(error):
+    """Messaggio leggibile per l'utente."""
+    if isinstance(error, ShareUnavailable):
+        return "La cartella dati non è raggiungibile (rete o NAS non disponibili). Riprova tra poco."
+    if isinstance(error, IOTimeout):
+        return ("La cartella dati non ha risposto in tempo.\n"
+                "L'operazione potrebbe completarsi in ritardo: controlla prima di riprovare.")
+    return str(error)
+
+class DataIO(QObject):
+    """
+    Esegue funzioni di I/O in background.
+
+    Segnali:
+      - status_changed(bool, str): cartella raggiungibile o no, con un messaggio per la barra di stato.
+    """
+    status_changed = Signal(bool, str)
+    _job_finished = Signal(int, object, object) # id, risultato, errore (emesso dai thread)
+    _job_progress = Signal(int, int, int)       # id, fatti, totale (emesso dai thread)
+
+    def __init__(self, workers=WORKERS):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="data-io")
+        # Corsia in fila unica (salvataggi): un lavoro alla volta, nell'ordine di arrivo
+        self.serial_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data-io-serial")
+        self.jobs = {} # id -> (on_done, on_error, timer, on_progress)
+        self.ids = itertools.count(1)
+        self.failures = 0
+        self.online = True
+        self.open_until = 0.0
+        self._job_finished.connect(self._on_job_finished)
+        self._job_progress.connect(self._on_job_progress)
+
+        self.probe_timer = QTimer(self)
+        self.probe_timer.setInterval(int(RETRY_AFTER * 1000))
+        self.probe_timer.timeout.connect(self.probe)
+
+    # --- Esecuzione ---
+
+    def submit(self, func, *args, on_done=None, on_error=None, on_progress=None, timeout=DEFAULT_TIMEOUT,
+               force=False, serial=False):
+        """
+        Esegue func(*args) in background. on_done(risultato) oppure on_error(eccezione)
+        vengono chiamati nel thread dell'interfaccia, una sola volta.
+        Con 'on_progress' la funzione riceve anche progress=report, da chiamare come
+        report(fatti, totale): on_progress(fatti, totale) arriva nel thread dell'interfaccia
+        e il tempo massimo vale per ogni passo (un lavoro lungo che avanza non scade).
+        Con timeout=None non c'è tempo massimo: l'esito che arriva è sempre quello vero
+        (serve quando "scaduto" non deve voler dire "non fatto", come per i salvataggi).
+        Con 'serial' il lavoro va nella corsia in fila unica, dopo quelli già accodati lì.
+        Con la cartella irraggiungibile fallisce subito (salvo 'force', usato dalla prova).
+        """
+        job_id = next(self.ids)
+        if not force and not self.online and time.monotonic() < self.open_until:
+            error = ShareUnavailable("cartella dati irraggiungibile")
+            QTimer.singleShot(0, lambda: on_error(error) if on_error else None)
+            return job_id
+
+        timer = None
+        if timeout is not None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.timeout.connect(lambda: self._on_timeout(job_id, timeout))
+            timer.start(int(timeout * 1000))
+        self.jobs[job_id] = (on_done, on_error, timer, on_progress)
+
+        kwargs = {}
+        if on_progress:
+            kwargs["progress"] = lambda done, total: self._job_progress.emit(job_id, done, total)
+
+        def run():
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._job_finished.emit(job_id, None, e)
+            else:
+                self._job_finished.emit(job_id, result, None)
+        (self.serial_executor if serial else self.executor).submit(run)
+        return job_id
+
+    def _on_timeout(self, job_id, timeout):
+        # Il thread resta bloccato sul file finché la rete non risponde: il suo risultato verrà ignorato
+        self._finish(job_id, None, IOTimeout(f"nessuna risposta dopo {timeout:.0f} secondi"))
+
+    def _on_job_finished(self, job_id, result, error):
+        self._finish(job_id, result, error)
+
+    def _on_job_progress(self, job_id, done, total):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        _on_done, _on_error, timer, on_progress = job
+        if timer:
+            timer.start() # Il lavoro avanza: il tempo massimo riparte
+        on_progress(done, total)
+
+    def _finish(self, job_id, result, error):
+        job = self.jobs.pop(job_id, None)
+        if job is None:
+            return # Già concluso per timeout
+        on_done, on_error, timer, _on_progress = job
+        if timer:
+            timer.stop()
+            timer.deleteLater()
+
+        if error is None:
+            self._record_success()
+            if on_done:
+                on_done(result)
+        else:
+            if is_connectivity_error(error):
+                self._record_failure()
+            if on_error:
+                on_error(error)
+            else:
+                print(f"Attenzione: operazione sulla cartella dati fallita: {error}")
+
+    # --- Interruttore ---
+
+    def _record_success(self):
+        self.failures = 0
+        if not self.online:
+            self.online = True
+            self.probe_timer.stop()
+            self.status_changed.emit(True, "🟢 Cartella dati di nuovo raggiungibile")
+
+    def _record_failure(self):
+        self.failures += 1
+        if self.failures >= FAILURE_THRESHOLD or not self.online:
+            self.open_until = time.monotonic() + RETRY_AFTER
+            if self.online:
+                self.online = False
+                self.probe_timer.start()
+                self.status_changed.emit(False, "🔴 Cartella dati non raggiungibile: nuovo tentativo automatico tra poco")
+
+    def probe(self):
+        """Prova a raggiungere la cartella dati (a cartella irraggiungibile)."""
+        def check(path):
+            if not os.path.isdir(path):
+                raise ConnectionError(f"cartella non trovata: {path}")
+        self.submit(check, get_settings().data_dir, on_error=lambda e: None, timeout=DEFAULT_TIMEOUT, force=True)
+
+def refresh_index_async(on_done=None, on_error=None):
+    """
+    Aggiorna l'indice documenti: la scansione dei file gira in background,
+    l'applicazione delle modifiche (e le notifiche alle pagine) nel thread dell'interfaccia.
+    """
+    from core.order_index import get_order_index
+    index = get_order_index()
+    data_dir = index.data_dir
+
+    def apply(result):
+        if index.data_dir != data_dir:
+            return # Cartella cambiata nel frattempo: scansione non più valida
+        changed, removed, speed = result
+        index.note_speed(speed)
+        index.apply(changed, removed)
+        if on_done:
+            on_done()
+    # L'avanzamento non si mostra: serve a far ripartire il tempo massimo a ogni blocco letto,
+    # così la prima scansione di un archivio grande in rete non scade a metà
+    get_data_io().submit(index.scan, on_done=apply, on_error=on_error, timeout=SCAN_TIMEOUT,
+                         on_progress=lambda done, total: None)
+
+def load_lines_async(paths=None):
+    """
+    Legge in background le righe articolo dei documenti indicati (default: tutti) che
+    ancora non le hanno; arrivano a chi le usa tramite OrderIndex.add_lines_listener.
+    I documenti già in lettura per un'altra richiesta non vengono riletti.
+    """
+    from core.order_index import get_order_index
+    index = get_order_index()
+    data_dir = index.data_dir
+    pending = index.missing_lines(paths)
+    if not pending:
+        return
+
+    def apply(loaded):
+        if index.data_dir != data_dir:
+            return # Cartella cambiata nel frattempo: righe di un altro indice
+        index.set_lines(pending, loaded)
+
+    def failed(error):
+        if index.data_dir == data_dir:
+            index.lines_done(pending)
+        print(f"Attenzione: Impossibile leggere le righe articolo: {describe_error(error)}")
+    # Come per la scansione: ogni blocco letto fa ripartire il tempo massimo
+    get_data_io().submit(index.read_lines, pending, on_done=apply, on_error=failed, timeout=SCAN_TIMEOUT,
+                         on_progress=lambda done, total: None)
+
+_data_io = None
+
+def get_data_io():
+    """Istanza unica del livello di I/O (da usare dal thread dell'interfaccia)."""
+    global _data_io
+    if _data_io is None:
+        _data_io = DataIO()
+    return _data_io
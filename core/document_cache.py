@@ -0,0 +1,82 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+
+from core.cold_archive import is_packed, split_packed, read_any
+
+# ======================================================================
+# --- CACHE DEI DOCUMENTI LETTI DI RECENTE ---
+# Apertura, stampa e conferma di un documento passano da qui: se il file
+# non è cambiato (stessa data di modifica e dimensione) il documento
+# arriva dalla memoria, con un solo stat sulla cartella di rete invece
+# di apertura + lettura + migrazione. La ricerca legge in anticipo il
+# documento selezionato o sotto il mouse (prefetch), così il doppio clic
+# trova già tutto pronto.
+#
+# Ogni documento è tenuto come testo JSON già migrato: ogni chiamante ne
+# riceve una copia propria (json.loads, circa 4 volte più veloce di
+# copy.deepcopy) e può modificarla senza toccare la cache.
+# Oltre MAX_DOCUMENTS si dimentica il documento usato meno di recente.
+# ======================================================================
+
+MAX_DOCUMENTS = 64
+
+class DocumentCache:
+    """Documenti letti di recente, validati con data di modifica e dimensione del file."""
+
+    def __init__(self, max_documents=MAX_DOCUMENTS):
+        self.max_documents = max_documents
+        self._lock = threading.Lock() # Usata da più thread di I/O
+        self._items = OrderedDict()   # percorso -> (mtime, size, testo JSON), dal meno recente
+
+    def _stamp(self, path):
+        # Per i documenti dell'archivio annuale conta il file di archivio
+        stat = os.stat(split_packed(path)[0] if is_packed(path) else path)
+        return stat.st_mtime, stat.st_size
+
+    def _text(self, path):
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            self.discard(path)
+            raise
+        with self._lock:
+            item = self._items.get(path)
+            if item is not None and item[:2] == stamp:
+                self._items.move_to_end(path)
+                return item[2]
+
+        # Lo stat è preso prima della lettura: se il file cambia nel frattempo,
+        # alla prossima richiesta non corrisponderà e il documento verrà riletto
+        text = json.dumps(read_any(path), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._items[path] = (*stamp, text)
+            self._items.move_to_end(path)
+            while len(self._items) > self.max_documents:
+                self._items.popitem(last=False)
+        return text
+
+    def load(self, path):
+        """(Thread di I/O) Il documento, come read_document: dalla memoria se il file non è cambiato."""
+        return json.loads(self._text(path))
+
+    def prefetch(self, path):
+        """(Thread di I/O) Porta il documento in cache senza restituirlo."""
+        self._text(path)
+
+    def discard(self, path):
+        with self._lock:
+            self._items.pop(path, None)
+
+_document_cache = None
+
+def get_document_cache():
+    global _document_cache
+    if _document_cache is None:
+        _document_cache = DocumentCache()
+    return _document_cache
+
+def load_document(path):
+    """Legge un documento (anche dall'archivio annuale) passando dalla cache."""
+    return get_document_cache().load(path)
@@ -0,0 +1,120 @@
+import os
+import json
+
+from core.totals import attach_summary, ensure_summary
+from core.schema import SCHEMA_KEY, SCHEMA_VERSION, migrate
+
+# ======================================================================
+# --- LETTURA E SCRITTURA DOCUMENTI ---
+# Tutti i file ordine/preventivo passano da qui: in lettura i documenti
+# vecchi vengono portati all'ultimo formato (vedi core/schema.py), in
+# scrittura si aggiungono versione e dati derivati (riepilogo totali).
+#
+# La prima riga del file è una piccola intestazione con i dati usati
+# dalle liste (cliente, date, tipo, totali, revisione):
+#   {"intestazione":{...},
+#   "versione_schema":3,"info_ordine":{...},...}
+# Il file resta un JSON valido, ma per elencare un documento basta
+# leggere i primi byte (read_header) invece di tutto il file.
+# ======================================================================
+
+HEADER_KEY = "intestazione"
+HEADER_PREFIX = b'{"' + HEADER_KEY.encode("ascii") + b'":'
+
+# Un'intestazione tipica occupa ~350 byte: si legge un primo blocco piccolo
+# e lo si allunga solo se la prima riga non è ancora finita, fino al limite.
+HEADER_FIRST_READ = 512
+HEADER_READ_LIMIT = 4096
+
+def use_compact_format():
+    """Formato di scrittura scelto nelle impostazioni (compatto = senza spazi né a capo)."""
+    from core.settings import get_settings
+    return bool(get_settings().get("compact_documents", True))
+
+def is_compact_text(text):
+    """True se il contenuto di un file è scritto in formato compatto (niente indentazione)."""
+    return "\n    " not in text
+
+def build_header(document, revision):
+    """Campi dell'intestazione, ricavati dal documento (già all'ultimo formato)."""
+    info = document["info_ordine"]
+    cust = document["dati_cliente"]
+    return {
+        "revisione": revision,
+        "tipo_documento": info["tipo_documento"],
+        "nome_cliente": cust["nome_cliente"],
+        "telefono_cliente": cust["telefono_cliente"],
+        "data_ordine": info["data_ordine"],
+        "data_cerimonia": info["data_cerimonia"],
+        "data_consegna": info["data_consegna"],
+        "operatore": info["operatore"],
+        "tipo_cerimonia": info["tipo_cerimonia"],
+        "tipo_confetti": info["tipo_confetti"],
+        **ensure_summary(document),
+    }
+
+def read_header(file_path):
+    """
+    Legge solo l'intestazione di un documento (al massimo HEADER_READ_LIMIT byte).
+    Ritorna None per i file senza intestazione (formato precedente): in quel
+    caso serve read_document.
+    """
+    with open(file_path, 'rb') as f:
+        chunk = f.read(HEADER_FIRST_READ)
+        if not chunk.startswith(HEADER_PREFIX):
+            return None
+        while b"\n" not in chunk and len(chunk) < HEADER_READ_LIMIT:
+            more = f.read(len(chunk))
+            if not more:
+                break
+            chunk += more
+    line, newline, _rest = chunk.partition(b"\n")
+    if not newline or not line.startswith(HEADER_PREFIX) or not line.endswith(b","):
+        return None
+    try:
+        header = json.loads(line[len(HEADER_PREFIX):-1].decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return header if isinstance(header, dict) else None
+
+def read_document(file_path):
+    """Legge un documento JSON. Solleva json.JSONDecodeError / IOError come open+json.load."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    migrate(document)
+    ensure_summary(document)
+    return document
+
+def write_document(file_path, document, compact=None):
+    """
+    Scrive un documento JSON aggiornandone versione, riepilogo totali e intestazione.
+    La revisione riparte da quella del file che viene sovrascritto.
+    In formato compatto il file pesa circa un terzo in meno (meno byte sulla rete).
+    """
+    migrate(document)
+    attach_summary(document)
+    if compact is None:
+        compact = use_compact_format()
+
+    previous = None
+    if os.path.exists(file_path):
+        try:
+            previous = read_header(file_path)
+        except OSError:
+            previous = None
+    revision = (previous or {}).get("revisione", 0) + 1
+    header = build_header(document, revision)
+
+    # La versione come prima chiave del corpo, leggibile anche aprendo il file a mano
+    body = {SCHEMA_KEY: SCHEMA_VERSION, **{k: v for k, v in document.items() if k != HEADER_KEY}}
+    if compact:
+        body_text = json.dumps(body, ensure_ascii=False, separators=(",", ":"))
+    else:
+        body_text = json.dumps(body, indent=4, ensure_ascii=False)
+    header_text = json.dumps(header, ensure_ascii=False, separators=(",", ":"))
+
+    with open(file_path, 'w', encoding='utf-8') as f:
+        # L'intestazione non contiene mai "a capo" (json li scrive come \n)
+        f.write('{"' + HEADER_KEY + '":' + header_text + ",\n" + body_text[1:].lstrip("\n"))
+
+    document[HEADER_KEY] = header
@@ -0,0 +1,174 @@
+import os
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from paths import DRAFTS_DIR
+
+# ======================================================================
+# --- BOZZE (RECUPERO DOPO ARRESTO IMPROVVISO) ---
+# Il modulo in compilazione viene registrato in un piccolo journal locale:
+# la prima riga contiene lo stato completo, le successive SOLO i campi
+# cambiati. Scritture su un thread dedicato (mai durante la digitazione),
+# compattazione periodica in un'unica riga.
+#
+# Un documento salvato in background (Salva/Stampa liberano subito il
+# modulo) lascia lo stato completo in un file a parte, "in salvataggio",
+# eliminato solo a salvataggio riuscito: se il programma si chiude o il
+# salvataggio fallisce, i dati restano recuperabili.
+# ======================================================================
+
+DRAFT_PATH = os.path.join(DRAFTS_DIR, "ordine_in_corso.jsonl")
+HELD_PREFIX = "in_salvataggio_"
+
+# Dopo quante righe di modifiche il journal viene riscritto compatto
+COMPACT_AFTER = 50
+
+class DraftJournal:
+    """
+    Journal della bozza corrente.
+    Lo stato è un dict piatto {campo: valore}; record() confronta con
+    l'ultimo stato registrato e accoda solo le differenze.
+    """
+    def __init__(self, path=DRAFT_PATH):
+        self.path = path
+        self._last_state = {}
+        self._lines = 0
+        # Un solo thread: le scritture restano nell'ordine in cui sono chieste
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bozze")
+
+    def reset(self, baseline_state):
+        """
+        Nuovo punto di partenza (modulo appena azzerato, caricato o salvato):
+        la bozza precedente non serve più e viene eliminata.
+        """
+        self._last_state = dict(baseline_state)
+        self._lines = 0
+        self._writer.submit(self._remove_file)
+
+    def record(self, state):
+        """Registra lo stato attuale del modulo (solo i campi cambiati dall'ultima volta)."""
+        changes = {k: v for k, v in state.items() if self._last_state.get(k) != v}
+        if not changes:
+            return
+
+        if self._lines == 0:
+            # Prima modifica dopo un reset: serve lo stato completo come base
+            payload = dict(state)
+        elif self._lines >= COMPACT_AFTER:
+            self._writer.submit(self._rewrite, dict(state))
+            self._last_state = dict(state)
+            self._lines = 1
+            return
+        else:
+            payload = changes
+
+        self._last_state = dict(state)
+        self._lines += 1
+        self._writer.submit(self._append, payload)
+
+    def load(self):
+        """Ricostruisce l'ultimo stato della bozza rimasta su disco (o None se non c'è)."""
+        if not os.path.exists(self.path):
+            return None
+        state = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        state.update(json.loads(line))
+                    except json.JSONDecodeError:
+                        break # Ultima riga troncata dall'arresto: si tiene quanto letto finora
+        except IOError as e:
+            print(f"Attenzione: Impossibile leggere la bozza: {e}")
+            return None
+        return state or None
+
+    def discard(self):
+        """Elimina la bozza (es. l'utente rinuncia al ripristino)."""
+        self._last_state = {}
+        self._lines = 0
+        self._writer.submit(self._remove_file)
+
+    # --- Documenti in salvataggio ---
+
+    def hold(self, state):
+        """
+        Tiene da parte lo stato di un documento in salvataggio, finché release_held
+        non lo elimina. Ritorna il percorso del file.
+        """
+        path = os.path.join(os.path.dirname(self.path), f"{HELD_PREFIX}{uuid.uuid4().hex[:8]}.json")
+        self._writer.submit(self._write_held, path, dict(state))
+        return path
+
+    def release_held(self, path):
+        """Salvataggio riuscito (o dati già ripresi nel modulo): lo stato tenuto da parte non serve più."""
+        self._writer.submit(self._remove_file, path)
+
+    def held(self):
+        """Salvataggi rimasti in sospeso (es. programma chiuso prima della fine): [(percorso, stato)]."""
+        folder = os.path.dirname(self.path)
+        result = []
+        try:
+            names = sorted(n for n in os.listdir(folder) if n.startswith(HELD_PREFIX) and n.endswith(".json"))
+        except FileNotFoundError:
+            return result
+        for name in names:
+            path = os.path.join(folder, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result.append((path, json.load(f)))
+            except (OSError, ValueError) as e:
+                print(f"Attenzione: Impossibile leggere il documento in salvataggio {name}: {e}")
+        return result
+
+    def flush(self):
+        """Attende che tutte le scritture in coda siano completate."""
+        self._writer.submit(lambda: None).result()
+
+    # --- Operazioni su disco (thread di scrittura) ---
+
+    def _append(self, payload):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(payload, ensure_ascii=False, separators=(',', ':')) + "\n")
+        except Exception as e:
+            print(f"Attenzione: Impossibile salvare la bozza: {e}")
+
+    def _rewrite(self, state):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(state, ensure_ascii=False, separators=(',', ':')) + "\n")
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Attenzione: Impossibile compattare la bozza: {e}")
+
+    def _write_held(self, path, state):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Attenzione: Impossibile registrare il documento in salvataggio: {e}")
+
+    def _remove_file(self, path=None):
+        path = path or self.path
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            print(f"Attenzione: Impossibile eliminare la bozza: {e}")
+
+_journal = None
+
+def get_draft_journal():
+    """Journal unico delle bozze (condiviso da pagina Nuovo Ordine e finestra principale)."""
+    global _journal
+    if _journal is None:
+        _journal = DraftJournal()
+    return _journal
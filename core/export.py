@@ -0,0 +1,213 @@
+import os
+import csv
+import json
+import zipfile
+import argparse
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from core.documents import read_document
+from core.totals import parse_amount, line_total, format_amount
+from core.summaries import date_ordinal
+from core.bulk import ARCHIVE_FOLDER
+from core.cold_archive import get_cold_archive, document_name
+
+# ======================================================================
+# --- ESPORTAZIONE ARCHIVIO (CSV / ODS) ---
+# Esporta ordini e preventivi per il commercialista: quelli correnti,
+# quelli archiviati (archivio/orders|quotes) e gli ordini degli archivi
+# annuali (vedi core/cold_archive.py). Tutto passa per
+# generatori: si legge un documento alla volta e le righe vengono scritte
+# man mano, quindi la memoria usata non dipende dalla grandezza dell'archivio.
+#
+# Uso da riga di comando (dalla cartella del programma):
+#   python -m core.export riepilogo.csv --tipo ordine --dal 2024-01-01 --al 2024-12-31
+# ======================================================================
+
+# Sottocartelle per tipo di documento (come nell'indice)
+FOLDERS = {"ordine": "orders", "preventivo": "quotes"}
+
+DATE_FIELDS = ("data_ordine", "data_cerimonia", "data_consegna")
+
+# Modalità: una riga per documento oppure una riga per articolo
+DOCUMENT_COLUMNS = [
+    "Tipo", "File", "Data Ordine", "Data Cerimonia", "Data Consegna", "Cliente", "Telefono",
+    "Operatore", "Tipo Cerimonia", "Tipo Confetti", "Totale", "Acconti", "Saldo"
+]
+ARTICLE_COLUMNS = [
+    "Tipo", "File", "Data Ordine", "Data Cerimonia", "Cliente",
+    "Ditta", "Codice", "Descrizione", "Quantità", "Prezzo Unitario", "Totale Riga"
+]
+MODES = {"documento": DOCUMENT_COLUMNS, "articolo": ARTICLE_COLUMNS}
+
+# Ogni quanti documenti letti l'esportazione dà un segno di vita (timeout dell'I/O)
+PROGRESS_STEP = 100
+
+# --- Lettura ---
+
+def _in_period(day, date_from, date_to):
+    return not ((date_from and day < date_from) or (date_to and day > date_to))
+
+def iter_documents(data_dir, doc_types=("ordine", "preventivo"), date_field="data_ordine", date_from="", date_to="",
+                   progress=None):
+    """
+    Genera (tipo, percorso, documento) per i documenti nel periodo indicato.
+    Le date sono stringhe ISO ('AAAA-MM-GG'); vuoto = nessun limite.
+    I file illeggibili vengono saltati con un avviso.
+    progress(fatti, 0), se indicato, ogni PROGRESS_STEP documenti letti (il totale non è noto).
+    """
+    done = 0
+    for doc_type in doc_types:
+        for folder in (os.path.join(data_dir, FOLDERS[doc_type]),
+                       os.path.join(data_dir, ARCHIVE_FOLDER, FOLDERS[doc_type])):
+            if not os.path.isdir(folder):
+                continue
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    done += 1
+                    if progress and done % PROGRESS_STEP == 0:
+                        progress(done, 0)
+                    try:
+                        document = read_document(entry.path)
+                    except (OSError, json.JSONDecodeError) as e:
+                        print(f"Esportazione: salto {entry.name} ({e})")
+                        continue
+                    if _in_period(document.get("info_ordine", {}).get(date_field, ""), date_from, date_to):
+                        yield doc_type, entry.path, document
+
+    if "ordine" not in doc_types:
+        return
+    # Archivi annuali (solo ordini): il periodo si controlla sull'intestazione, prima di decomprimere
+    archive = get_cold_archive()
+    lo = date_ordinal(date_from) if date_from else 0
+    hi = date_ordinal(date_to) if date_to else 0
+    for path, summary in archive.documents(data_dir):
+        day = getattr(summary, date_field)
+        if (lo and day < lo) or (hi and day > hi):
+            continue
+        done += 1
+        if progress and done % PROGRESS_STEP == 0:
+            progress(done, 0)
+        try:
+            document = archive.read(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Esportazione: salto {document_name(path)} ({e})")
+            continue
+        yield "ordine", path, document
+
+def iter_rows(documents, mode="documento"):
+    """Trasforma i documenti in righe piatte (liste di str/Decimal). La prima riga è l'intestazione."""
+    yield MODES[mode]
+    for doc_type, path, document in documents:
+        info = document.get("info_ordine", {})
+        customer = document.get("dati_cliente", {})
+        name = document_name(path)
+        if mode == "documento":
+            summary = document["riepilogo"]
+            yield [
+                doc_type, name, info.get("data_ordine", ""), info.get("data_cerimonia", ""),
+                info.get("data_consegna", ""), customer.get("nome_cliente", ""),
+                customer.get("telefono_cliente", ""), info.get("operatore", ""),
+                info.get("tipo_cerimonia", ""), info.get("tipo_confetti", ""),
+                Decimal(summary["totale"]), Decimal(summary["acconti"]), Decimal(summary["saldo"])
+            ]
+        else:
+            for line in document.get("dettagli_ordine", []):
+                yield [
+                    doc_type, name, info.get("data_ordine", ""), info.get("data_cerimonia", ""),
+                    customer.get("nome_cliente", ""), line.get("ditta", ""), line.get("codice", ""),
+                    line.get("descrizione", ""), parse_amount(line.get("quantita")),
+                    parse_amount(line.get("prezzo_unitario")),
+                    line_total(line.get("quantita"), line.get("prezzo_unitario"))
+                ]
+
+# --- Scrittura ---
+
+def write_csv(rows, file_path):
+    """
+    CSV "all'italiana" (separatore ';', virgola decimale, BOM per Excel).
+    Ritorna il numero di righe dati scritte.
+    """
+    count = -1 # L'intestazione non conta
+    with open(file_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        for row in rows:
+            writer.writerow([format_amount(v).replace(".", ",") if isinstance(v, Decimal) else v for v in row])
+            count += 1
+    return max(count, 0)
+
+_ODS_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+ <manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>
+ <manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>
+"""
+
+_ODS_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">
+<office:body><office:spreadsheet><table:table table:name="Esportazione">
+"""
+
+_ODS_TAIL = "</table:table></office:spreadsheet></office:body></office:document-content>\n"
+
+def _ods_cell(value):
+    if isinstance(value, Decimal):
+        return f'<table:table-cell office:value-type="float" office:value="{value}"><text:p>{value}</text:p></table:table-cell>'
+    return f'<table:table-cell office:value-type="string"><text:p>{escape(str(value))}</text:p></table:table-cell>'
+
+def write_ods(rows, file_path):
+    """
+    Foglio ODS scritto riga per riga direttamente nello zip (content.xml in
+    streaming), senza costruire il documento in memoria come farebbe ezodf.
+    Ritorna il numero di righe dati scritte.
+    """
+    count = -1
+    with zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        # Il mimetype deve essere il primo file e non compresso
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet", zipfile.ZIP_STORED)
+        archive.writestr("META-INF/manifest.xml", _ODS_MANIFEST)
+        with archive.open("content.xml", "w") as raw:
+            raw.write(_ODS_HEAD.encode("utf-8"))
+            for row in rows:
+                raw.write(("<table:table-row>" + "".join(_ods_cell(v) for v in row) + "</table:table-row>\n").encode("utf-8"))
+                count += 1
+            raw.write(_ODS_TAIL.encode("utf-8"))
+    return max(count, 0)
+
+def export_archive(data_dir, file_path, mode="documento", doc_types=("ordine", "preventivo"),
+                   date_field="data_ordine", date_from="", date_to="", progress=None):
+    """
+    Esporta in CSV o ODS (scelto dall'estensione del file). Ritorna il numero di righe dati.
+    progress: come per iter_documents (per il thread di I/O).
+    """
+    rows = iter_rows(iter_documents(data_dir, doc_types, date_field, date_from, date_to, progress), mode)
+    writer = write_ods if file_path.lower().endswith(".ods") else write_csv
+    return writer(rows, file_path)
+
+# --- Riga di comando ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.export", description="Esporta ordini e preventivi in CSV o ODS.")
+    parser.add_argument("file", help="File di destinazione (.csv oppure .ods)")
+    parser.add_argument("--cartella", help="Cartella dati (default: quella configurata nel programma)")
+    parser.add_argument("--modo", choices=list(MODES), default="documento", help="Una riga per documento o per articolo")
+    parser.add_argument("--tipo", choices=["ordine", "preventivo", "tutti"], default="tutti")
+    parser.add_argument("--campo-data", choices=DATE_FIELDS, default="data_ordine", help="Data usata per il filtro periodo")
+    parser.add_argument("--dal", default="", help="Data iniziale AAAA-MM-GG (inclusa)")
+    parser.add_argument("--al", default="", help="Data finale AAAA-MM-GG (inclusa)")
+    args = parser.parse_args(argv)
+
+    if args.cartella:
+        data_dir = args.cartella
+    else:
+        from paths import get_data_dir
+        data_dir = get_data_dir()
+
+    doc_types = ("ordine", "preventivo") if args.tipo == "tutti" else (args.tipo,)
+    count = export_archive(data_dir, args.file, args.modo, doc_types, args.campo_data, args.dal, args.al)
+    print(f"Esportate {count} righe in {args.file}")
+
+if __name__ == "__main__":
+    main()
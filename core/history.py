@@ -0,0 +1,219 @@
+import os
+import json
+from datetime import datetime
+
+from core.documents import HEADER_KEY
+from core.change_feed import STATION_ID, station_name
+
+# ======================================================================
+# --- STORICO DELLE REVISIONI ---
+# Ogni salvataggio di un documento aggiunge una riga a un registro del
+# documento (storico/<orders|quotes>/<nome>.jsonl nella cartella dati)
+# con le sole differenze rispetto alla revisione precedente:
+#   - dati cliente e info ordine: i campi cambiati (e quelli tolti);
+#   - righe articolo: per ogni riga cambiata i campi cambiati, più il
+#     nuovo numero di righe (le righe in più sono "cambiate" da vuote).
+# La prima riga del registro è la differenza da un documento vuoto, cioè
+# il documento completo: ogni revisione si ricostruisce applicando le
+# differenze in ordine, e il registro cresce quanto le modifiche.
+#
+# Il registro non deve mai far fallire un salvataggio: in caso di errore
+# si avvisa e basta. Un documento nuovo (file che prima del salvataggio
+# non esisteva) riparte da un registro vuoto, anche se ne esisteva uno di
+# un documento omonimo eliminato; per tutti gli altri si aggiunge in coda.
+# Il numero di revisione non basta a deciderlo: riparte da 1 anche quando
+# l'intestazione del file sovrascritto non è leggibile.
+# ======================================================================
+
+HISTORY_FOLDER = "storico"
+# Parti del documento seguite nello storico (i totali si ricalcolano dalle righe)
+TRACKED_SECTIONS = ("dati_cliente", "info_ordine", "dettagli_ordine")
+LINES_SECTION = "dettagli_ordine"
+
+# Nomi dei campi mostrati nello storico (gli altri: "colore_nastri" -> "Colore nastri")
+FIELD_LABELS = {
+    "nome_cliente": "Nome cliente", "telefono_cliente": "Telefono",
+    "data_ordine": "Data ordine", "data_cerimonia": "Data cerimonia", "data_consegna": "Data consegna",
+    "tipo_documento": "Tipo documento", "acconto1_importo": "Importo 1° acconto",
+    "acconto2_importo": "Importo 2° acconto", "acconto1_tipo": "Tipo 1° acconto",
+    "acconto2_tipo": "Tipo 2° acconto", "quantita": "Quantità", "prezzo_unitario": "Prezzo",
+}
+# Campo calcolato dagli altri: nel riepilogo delle modifiche sarebbe solo rumore
+DERIVED_LINE_FIELDS = ("prezzo_totale",)
+
+def history_path(doc_path):
+    """Registro delle revisioni di un documento (stessa sottocartella, dentro 'storico')."""
+    folder, name = os.path.split(doc_path)
+    data_dir, subfolder = os.path.split(folder)
+    return os.path.join(data_dir, HISTORY_FOLDER, subfolder, os.path.splitext(name)[0] + ".jsonl")
+
+# --- Differenze ---
+
+def _diff_fields(old, new):
+    delta = {}
+    changed = {k: v for k, v in new.items() if old.get(k) != v}
+    removed = [k for k in old if k not in new]
+    if changed:
+        delta["+"] = changed
+    if removed:
+        delta["-"] = removed
+    return delta
+
+def _apply_fields(old, delta):
+    result = {k: v for k, v in old.items() if k not in delta.get("-", ())}
+    result.update(delta.get("+", {}))
+    return result
+
+def _diff_lines(old, new):
+    lines = {}
+    for i, line in enumerate(new):
+        line_delta = _diff_fields(old[i] if i < len(old) else {}, line)
+        if line_delta:
+            lines[str(i)] = line_delta
+    if not lines and len(old) == len(new):
+        return {}
+    return {"n": len(new), "righe": lines}
+
+def _apply_lines(old, delta):
+    lines = [dict(line) for line in old[:delta["n"]]]
+    lines += [{} for _ in range(delta["n"] - len(lines))]
+    for i, line_delta in delta["righe"].items():
+        lines[int(i)] = _apply_fields(lines[int(i)], line_delta)
+    return lines
+
+def diff(old_state, new_state):
+    """Differenze tra due stati {sezione: contenuto} (solo le sezioni cambiate)."""
+    delta = {}
+    for section in TRACKED_SECTIONS:
+        if section == LINES_SECTION:
+            section_delta = _diff_lines(old_state.get(section, []), new_state.get(section, []))
+        else:
+            section_delta = _diff_fields(old_state.get(section, {}), new_state.get(section, {}))
+        if section_delta:
+            delta[section] = section_delta
+    return delta
+
+def apply_delta(state, delta):
+    """Nuovo stato ottenuto applicando le differenze (lo stato di partenza non viene modificato)."""
+    result = dict(state)
+    for section, section_delta in delta.items():
+        if section == LINES_SECTION:
+            result[section] = _apply_lines(state.get(section, []), section_delta)
+        else:
+            result[section] = _apply_fields(state.get(section, {}), section_delta)
+    return result
+
+def tracked_state(document):
+    return {section: document.get(section, [] if section == LINES_SECTION else {}) for section in TRACKED_SECTIONS}
+
+# --- Registro ---
+
+def read_history(doc_path):
+    """Righe del registro di un documento ([] se non c'è). Le righe illeggibili vengono saltate."""
+    records = []
+    try:
+        with open(history_path(doc_path), 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+def revisions(doc_path):
+    """Revisioni registrate, dalla più vecchia: [(riga del registro, stato completo dopo quella revisione)]."""
+    state = {}
+    result = []
+    for record in read_history(doc_path):
+        state = apply_delta(state, record.get("modifiche", {}))
+        result.append((record, state))
+    return result
+
+def record_revision(doc_path, document, previous_path=None, created=False):
+    """
+    Aggiunge al registro le differenze del documento appena salvato (con write_document).
+    'previous_path': documento da cui questo deriva (preventivo confermato): lo storico prosegue da lì.
+    'created': il file non esisteva prima di questo salvataggio.
+    """
+    try:
+        revision = document.get(HEADER_KEY, {}).get("revisione", 0)
+        continues = previous_path is not None and previous_path != doc_path
+        if continues:
+            records = read_history(previous_path)
+        elif created:
+            records = [] # Documento nuovo: lo storico di un omonimo eliminato non gli appartiene
+        else:
+            records = read_history(doc_path)
+
+        state = {}
+        for record in records:
+            state = apply_delta(state, record.get("modifiche", {}))
+        delta = diff(state, tracked_state(document))
+        if records and not delta:
+            return # Salvato senza modifiche: niente da registrare
+
+        line = json.dumps({
+            "revisione": revision,
+            "tipo": document.get("info_ordine", {}).get("tipo_documento", ""),
+            "ora": datetime.now().isoformat(timespec="seconds"),
+            "postazione": station_name(),
+            "modifiche": delta,
+        }, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+        path = history_path(doc_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if records and not continues:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            return
+        # Registro nuovo (o copiato dal documento d'origine): scritto per intero
+        tmp_path = f"{path}.{STATION_ID}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in records)
+            f.write(line)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        print(f"Attenzione: Impossibile aggiornare lo storico di {os.path.basename(doc_path)}: {e}")
+
+def discard_history(doc_path):
+    """Elimina il registro di un documento eliminato."""
+    try:
+        os.remove(history_path(doc_path))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Attenzione: Impossibile eliminare lo storico di {os.path.basename(doc_path)}: {e}")
+
+# --- Descrizione delle modifiche ---
+
+def _label(field):
+    return FIELD_LABELS.get(field, field.replace("_", " ").capitalize())
+
+def _line_text(line):
+    text = line.get("descrizione") or line.get("codice") or "articolo"
+    return f"{text} ({line.get('quantita', '')} × {line.get('prezzo_unitario', '')})"
+
+def describe_changes(before, after):
+    """Modifiche tra due stati, in frasi leggibili (es. "Riga 2 quantità: «10» → «12»")."""
+    changes = []
+    for section in TRACKED_SECTIONS:
+        if section == LINES_SECTION:
+            continue
+        old, new = before.get(section, {}), after.get(section, {})
+        for field in new:
+            if old.get(field, "") != new[field] and (field in old or new[field] not in ("", None)):
+                changes.append(f"{_label(field)}: «{old.get(field, '')}» → «{new[field]}»")
+
+    old_lines, new_lines = before.get(LINES_SECTION, []), after.get(LINES_SECTION, [])
+    for i in range(max(len(old_lines), len(new_lines))):
+        if i >= len(old_lines):
+            changes.append(f"Riga {i + 1} aggiunta: {_line_text(new_lines[i])}")
+        elif i >= len(new_lines):
+            changes.append(f"Riga {i + 1} eliminata: {_line_text(old_lines[i])}")
+        else:
+            for field, value in new_lines[i].items():
+                if field not in DERIVED_LINE_FIELDS and old_lines[i].get(field, "") != value:
+                    changes.append(f"Riga {i + 1} {_label(field).lower()}: «{old_lines[i].get(field, '')}» → «{value}»")
+    return changes
@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+
+# ======================================================================
+# --- PULIZIA CARTELLA DI OUTPUT ---
+# Le stampe (.ods/.pdf) sono file temporanei: vengono rimossi in
+# background dopo l'avvio, senza mai bloccare la comparsa della finestra.
+# ======================================================================
+
+# Estensioni dei file generati dalla stampa
+OUTPUT_EXTENSIONS = (".ods", ".pdf", ".bak")
+
+# I file più giovani di così non vengono toccati: lo spooler di stampa
+# potrebbe starli ancora leggendo.
+DEFAULT_MAX_AGE_HOURS = 24
+
+# Tempo massimo (secondi) concesso alla pulizia: oltre si rimanda al prossimo avvio.
+DEFAULT_TIME_BUDGET = 3.0
+
+def clean_output_directory(directory, max_age_hours=DEFAULT_MAX_AGE_HOURS, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Elimina i file di stampa più vecchi di 'max_age_hours' dalla cartella indicata.
+    Si interrompe appena supera 'time_budget' secondi.
+    Ritorna il numero di file eliminati.
+    """
+    if not os.path.isdir(directory):
+        return 0
+
+    deadline = time.monotonic() + time_budget
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if time.monotonic() > deadline:
+                    print(f"Pulizia output interrotta (oltre {time_budget:.0f}s): riprenderà al prossimo avvio.")
+                    break
+
+                if not entry.name.endswith(OUTPUT_EXTENSIONS):
+                    continue
+
+                try:
+                    if not (entry.is_file() or entry.is_symlink()):
+                        continue
+                    if entry.stat().st_mtime > cutoff:
+                        continue
+                    os.unlink(entry.path)
+                    removed += 1
+                except Exception as e:
+                    print(f"Attenzione: Impossibile eliminare {entry.path}. Motivo: {e}")
+    except OSError as e:
+        print(f"Attenzione: Impossibile leggere la cartella {directory}. Motivo: {e}")
+
+    return removed
+
+def start_background_cleanup(directory, max_age_hours=DEFAULT_MAX_AGE_HOURS, time_budget=DEFAULT_TIME_BUDGET):
+    """Avvia la pulizia in un thread separato (daemon: non trattiene la chiusura dell'app)."""
+    def _run():
+        removed = clean_output_directory(directory, max_age_hours, time_budget)
+        if removed:
+            print(f"Pulizia output: eliminati {removed} file da {directory}")
+
+    thread = threading.Thread(target=_run, name="output-cleanup", daemon=True)
+    thread.start()
+    return thread
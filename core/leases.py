@@ -0,0 +1,197 @@
+import os
+import json
+import time
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtWidgets import QApplication
+
+from core.change_feed import STATION_ID, station_name
+
+# ======================================================================
+# --- DOCUMENTI IN MODIFICA (LEASE) ---
+# Chi apre un documento per modificarlo crea accanto al file un piccolo
+# "Ordine_X.json.lease" con il proprio nome e una scadenza, rinnovata
+# ogni HEARTBEAT_MS finché il documento resta aperto. Le altre postazioni
+# lo trovano all'apertura (una sola lettura, nessuna scansione della
+# cartella) e mostrano il documento in sola lettura.
+# Se il programma si chiude male o la rete cade, il lease scade da solo
+# dopo LEASE_TTL secondi e il documento torna libero.
+# ======================================================================
+
+LEASE_SUFFIX = ".lease"
+LEASE_TTL = 90
+HEARTBEAT_MS = 30000
+# Ogni quanto una postazione in sola lettura controlla se il documento si è liberato
+WATCH_MS = 5000
+
+class LeaseHeld(PermissionError):
+    """Il documento è aperto in modifica da un'altra postazione."""
+    def __init__(self, holder):
+        self.holder = holder
+        super().__init__(f"Il documento è in modifica da {holder}.")
+
+def lease_path(doc_path):
+    return doc_path + LEASE_SUFFIX
+
+def read_lease(doc_path):
+    """Lease valido (non scaduto) del documento, oppure None."""
+    try:
+        with open(lease_path(doc_path), 'r', encoding='utf-8') as f:
+            lease = json.load(f)
+        return lease if lease.get("scade", 0) > time.time() else None
+    except (FileNotFoundError, ValueError):
+        return None
+
+def holder_of(doc_path):
+    """Nome di chi ha il documento in modifica, se è un'altra postazione (altrimenti None)."""
+    lease = read_lease(doc_path)
+    if lease is None or lease.get("postazione") == STATION_ID:
+        return None
+    return lease.get("nome") or "un'altra postazione"
+
+def ensure_free(doc_path):
+    """Solleva LeaseHeld se un'altra postazione sta modificando il documento."""
+    holder = holder_of(doc_path)
+    if holder:
+        raise LeaseHeld(holder)
+
+def _lease_data():
+    return json.dumps({"postazione": STATION_ID, "nome": station_name(), "scade": time.time() + LEASE_TTL})
+
+def _write(doc_path):
+    path = lease_path(doc_path)
+    tmp_path = f"{path}.{STATION_ID}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(_lease_data())
+    os.replace(tmp_path, path)
+
+def acquire(doc_path):
+    """
+    Prende il documento in modifica. Ritorna None se riuscito, altrimenti il
+    nome di chi lo ha già (in quel caso il documento va aperto in sola lettura).
+    """
+    try:
+        # Creazione esclusiva: tra due postazioni che aprono insieme ne vince una sola
+        fd = os.open(lease_path(doc_path), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        holder = holder_of(doc_path)
+        if holder:
+            return holder
+        # Lease nostro o scaduto: si rinnova, poi si verifica di non essere stati preceduti
+        _write(doc_path)
+        return holder_of(doc_path)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(_lease_data())
+    return None
+
+def renew(doc_path):
+    """Rinnova il proprio lease (solleva LeaseHeld se nel frattempo lo ha preso un altro)."""
+    ensure_free(doc_path)
+    _write(doc_path)
+
+def release(doc_path):
+    """Libera il documento (solo se il lease è ancora nostro)."""
+    try:
+        with open(lease_path(doc_path), 'r', encoding='utf-8') as f:
+            lease = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return
+    if lease.get("postazione") == STATION_ID:
+        try:
+            os.remove(lease_path(doc_path))
+        except FileNotFoundError:
+            pass
+
+class LeaseKeeper(QObject):
+    """
+    Lease del documento aperto in una pagina: lo rinnova finché serve e,
+    se il documento è in sola lettura, controlla quando si libera.
+
+    Segnali:
+      - released(str): il documento osservato in sola lettura è di nuovo libero.
+      - lost(str, str): il nostro lease è stato preso da un altro (documento, nome).
+    """
+    released = Signal(str)
+    lost = Signal(str, str)
+
+    def __init__(self, io, parent=None):
+        super().__init__(parent)
+        self.io = io
+        self.held = None     # Documento che stiamo modificando
+        self.watched = None  # Documento aperto in sola lettura
+
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self.renew)
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(WATCH_MS)
+        self.watch_timer.timeout.connect(self.check_watched)
+
+        # Chiusura del programma: il documento torna subito libero per gli altri
+        QApplication.instance().aboutToQuit.connect(self.release_now)
+
+    def hold(self, doc_path):
+        """Il lease su doc_path è già stato preso (in background): da qui lo si rinnova."""
+        if self.held and self.held != doc_path:
+            self.io.submit(release, self.held, on_error=lambda e: None)
+        self.stop_watching()
+        self.held = doc_path
+        self.heartbeat.start()
+
+    def watch(self, doc_path):
+        """Documento in sola lettura: si avvisa quando chi lo modifica lo chiude."""
+        self.drop()
+        self.watched = doc_path
+        self.watch_timer.start()
+
+    def drop(self):
+        """Rilascia il documento in modifica (in background) e smette di osservare."""
+        self.stop_watching()
+        if self.held:
+            self.io.submit(release, self.held, on_error=lambda e: None)
+        self.held = None
+        self.heartbeat.stop()
+
+    def hand_over(self):
+        """
+        Smette di rinnovare il documento in modifica SENZA rilasciarlo: lo rilascerà
+        chi lo riceve (un salvataggio in background, a lavoro finito). Ritorna il documento.
+        """
+        held = self.held
+        self.stop_watching()
+        self.held = None
+        self.heartbeat.stop()
+        return held
+
+    def stop_watching(self):
+        self.watched = None
+        self.watch_timer.stop()
+
+    def renew(self):
+        doc_path = self.held
+
+        def failed(error):
+            if isinstance(error, LeaseHeld) and self.held == doc_path:
+                self.held = None
+                self.heartbeat.stop()
+                self.lost.emit(doc_path, error.holder)
+            # Errori di rete: il prossimo battito riproverà (il lease dura più di un intervallo)
+        self.io.submit(renew, doc_path, on_error=failed)
+
+    def check_watched(self):
+        doc_path = self.watched
+
+        def checked(holder):
+            if holder is None and self.watched == doc_path:
+                self.stop_watching()
+                self.released.emit(doc_path)
+        self.io.submit(holder_of, doc_path, on_done=checked, on_error=lambda e: None)
+
+    def release_now(self):
+        # Senza attese sulla rete: con la cartella irraggiungibile il lease scadrà da solo
+        if self.held and self.io.online:
+            try:
+                release(self.held)
+            except OSError:
+                pass
+        self.held = None
@@ -0,0 +1,396 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from paths import CACHE_DIR
+from core.settings import get_settings
+from core.documents import read_document, read_header, build_header, HEADER_KEY
+from core.summaries import DocumentSummary, document_lines
+from core.change_feed import STATION_ID
+
+# ======================================================================
+# --- INDICE LOCALE DEI DOCUMENTI ---
+# Tiene in memoria (e in una cache locale) i dati essenziali di ogni
+# ordine/preventivo. A ogni aggiornamento rilegge SOLO i file nuovi o
+# modificati (confronto mtime + dimensione), invece di tutto l'archivio.
+# Dei file nuovi legge solo l'intestazione (pochi byte, vedi
+# core/documents.py); le righe articolo, che servono solo a catalogo,
+# report e riepilogo fornitori, vengono lette la prima volta che servono,
+# in background (vedi load_lines_async in core/data_io.py): chi le usa
+# riceve i documenti completati con add_lines_listener.
+#
+# Prima scansione di un archivio grande (cache assente, cartella di rete
+# appena collegata): i file da leggere vengono divisi in blocchi letti da
+# più thread insieme. Il lavoro è quasi tutto attesa della rete, quindi
+# bastano i thread (niente processi separati). Il numero di letture in
+# parallelo si sceglie nelle Impostazioni; la velocità ottenuta (file/s)
+# viene stampata a fine lettura e mostrata nelle Impostazioni accanto al
+# numero di letture in parallelo, per scegliere il valore adatto alla rete.
+# ======================================================================
+
+DOC_TYPES = (("ordine", "orders"), ("preventivo", "quotes"))
+
+# Versione del formato della cache: se cambia, la cache viene ricostruita da zero
+INDEX_VERSION = 4
+
+# Letture in parallelo di default (impostazione "index_workers") e limite massimo
+DEFAULT_SCAN_WORKERS = 8
+MAX_SCAN_WORKERS = 32
+# File per blocco: ogni blocco è un'unità di lavoro (e un passo di avanzamento)
+SCAN_CHUNK_SIZE = 64
+# Con meno file di così si legge in sequenza: avviare i thread costerebbe più del guadagno
+PARALLEL_MIN_FILES = 2 * SCAN_CHUNK_SIZE
+
+def scan_workers():
+    """Letture in parallelo per la scansione, dalle impostazioni (1 = in sequenza)."""
+    try:
+        workers = int(get_settings().get("index_workers", DEFAULT_SCAN_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_SCAN_WORKERS
+    return max(1, min(workers, MAX_SCAN_WORKERS))
+
+def _read_lines_chunk(chunk):
+    lines = []
+    for path, summary in chunk:
+        try:
+            lines.append((path, (summary, document_lines(read_document(path)))))
+        except (json.JSONDecodeError, AttributeError, KeyError, TypeError, FileNotFoundError):
+            lines.append((path, (summary, []))) # File corrotto o sparito: nessun articolo
+        except OSError:
+            continue # Rete: si riproverà alla prossima richiesta
+    return lines
+
+# Velocità di una lettura dell'indice: file letti, secondi impiegati, letture in parallelo
+ScanSpeed = namedtuple("ScanSpeed", "files seconds workers")
+
+def describe_speed(speed):
+    """Testo per log e Impostazioni, es. '1200 file in 3.1s (387 file/s, letture in parallelo: 8)'."""
+    return (f"{speed.files} file in {speed.seconds:.1f}s ({speed.files / speed.seconds:.0f} file/s, "
+            f"letture in parallelo: {speed.workers})")
+
+def _workers_for(count):
+    return scan_workers() if count >= PARALLEL_MIN_FILES else 1
+
+def _read_in_chunks(items, read_chunk, progress=None):
+    """
+    read_chunk(blocco) su blocchi di SCAN_CHUNK_SIZE elementi, da più thread se sono tanti.
+    read_chunk ritorna coppie (percorso, valore); il risultato è {percorso: valore}.
+    """
+    workers = _workers_for(len(items))
+    chunks = [items[i:i + SCAN_CHUNK_SIZE] for i in range(0, len(items), SCAN_CHUNK_SIZE)]
+
+    result = {}
+    done = 0
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(chunks)), thread_name_prefix="index-scan") if workers > 1 else None
+    try:
+        results = pool.map(read_chunk, chunks) if pool else map(read_chunk, chunks)
+        for chunk, values in zip(chunks, results):
+            result.update(values)
+            done += len(chunk)
+            if progress:
+                progress(done, len(items))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return result
+
+class OrderIndex:
+    """
+    Indice dei documenti della cartella dati corrente.
+
+    'entries' mappa il percorso completo del file al suo riepilogo (DocumentSummary,
+    vedi core/summaries.py): gli stessi oggetti sono condivisi da tutte le pagine.
+    'righe' è None finché non serve: chi usa le righe articolo le chiede con
+    load_lines_async(percorsi) (core/data_io.py) e le riceve con
+    add_lines_listener(callback): callback(loaded), loaded = {percorso: riepilogo}
+    dei documenti a cui sono appena state aggiunte le righe.
+    Chi deriva dati dall'indice (catalogo, clienti, report...) si registra con
+    add_listener(callback) e riceve callback(changed, removed, reset):
+      - changed: dict {percorso: riepilogo} dei documenti nuovi o modificati
+      - removed: lista dei percorsi spariti
+      - reset:   True se l'indice è stato sostituito (es. cambio cartella dati)
+    """
+    def __init__(self, data_dir):
+        self.listeners = []
+        self.lines_listeners = []
+        self._cache_lock = threading.Lock()
+        self.set_data_dir(data_dir)
+
+    # --- Cartella dati e cache su disco ---
+
+    def set_data_dir(self, data_dir):
+        """Punta l'indice a un'altra cartella dati, caricandone la cache locale."""
+        self.data_dir = data_dir
+        digest = hashlib.sha1(os.path.abspath(data_dir).encode("utf-8")).hexdigest()[:12]
+        self.cache_path = os.path.join(CACHE_DIR, f"indice_{digest}.json")
+        self.entries = self._load_cache()
+        self.lines_pending = set() # Documenti di cui si stanno già leggendo le righe
+        self.last_speed = None     # ScanSpeed dell'ultima lettura grande di questa cartella
+        self._notify({}, [], reset=True)
+
+    def folder_for(self, doc_type):
+        """Cartella dei documenti di un tipo ('ordine' o 'preventivo')."""
+        return os.path.join(self.data_dir, dict(DOC_TYPES)[doc_type])
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get("versione") != INDEX_VERSION:
+                return {}
+            return {path: DocumentSummary.from_row(row) for path, row in cache["documenti"].items()}
+        except (FileNotFoundError, json.JSONDecodeError, IOError, KeyError, AttributeError, IndexError, TypeError):
+            return {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # File temporaneo proprio di questa sessione: due programmi aperti non si pestano i piedi
+            tmp_path = f"{self.cache_path}.{STATION_ID}.tmp"
+            with self._cache_lock:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    rows = {path: summary.to_row() for path, summary in self.entries.items()}
+                    json.dump({"versione": INDEX_VERSION, "documenti": rows}, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"Attenzione: Impossibile salvare la cache dell'indice: {e}")
+
+    # --- Aggiornamento ---
+
+    def refresh(self):
+        """
+        Confronta l'indice con le cartelle e rilegge solo i file cambiati.
+        Ritorna (changed, removed).
+        """
+        changed, removed, speed = self.scan()
+        self.note_speed(speed)
+        return self.apply(changed, removed)
+
+    def note_speed(self, speed):
+        """Ricorda la velocità dell'ultima lettura grande (None = lettura piccola, non conta)."""
+        if speed is not None:
+            self.last_speed = speed
+
+    def scan(self, progress=None):
+        """
+        Parte "lenta" di refresh(): legge le cartelle senza modificare l'indice,
+        quindi può girare in un thread separato (vedi core/data_io.py).
+        'progress(fatti, totale)', se indicato, viene chiamato dopo ogni blocco di file letti.
+        Ritorna (changed, removed, speed) con removed = {percorso: riepilogo visto dalla scansione}
+        e speed = ScanSpeed se i file da leggere erano tanti (prima lettura), altrimenti None.
+        """
+        known = dict(self.entries)
+        to_read = []
+        seen = set()
+
+        for doc_type, subfolder in DOC_TYPES:
+            folder = os.path.join(self.data_dir, subfolder)
+            if not os.path.isdir(folder):
+                continue
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    seen.add(entry.path)
+
+                    old = known.get(entry.path)
+                    if old and old.mtime == stat.st_mtime and old.size == stat.st_size:
+                        continue
+                    to_read.append((entry.path, doc_type, stat))
+
+        changed, speed = self._read_summaries(to_read, progress)
+        removed = {path: summary for path, summary in known.items() if path not in seen}
+        return changed, removed, speed
+
+    def _read_chunk(self, chunk):
+        summaries = []
+        for path, doc_type, stat in chunk:
+            summary = self._read_summary(path, doc_type, stat)
+            if summary is not None:
+                summaries.append((path, summary))
+        return summaries
+
+    def _read_summaries(self, to_read, progress=None):
+        """
+        Riepiloghi dei file nuovi o modificati, a blocchi (in parallelo se sono tanti).
+        Ritorna ({percorso: riepilogo}, ScanSpeed o None se i file erano pochi).
+        """
+        if not to_read:
+            return {}, None
+        start = time.perf_counter()
+        changed = _read_in_chunks(to_read, self._read_chunk, progress)
+        if len(to_read) < PARALLEL_MIN_FILES:
+            return changed, None
+        speed = ScanSpeed(len(to_read), max(time.perf_counter() - start, 1e-6), _workers_for(len(to_read)))
+        print(f"[Indice] {describe_speed(speed)}")
+        return changed, speed
+
+    def apply(self, changed, removed):
+        """
+        Applica all'indice il risultato di scan() e avvisa chi ne dipende.
+        Se nel frattempo un documento è stato salvato da questa postazione
+        (update_path), vale il dato più recente. Ritorna (changed, removed).
+        """
+        for path, summary in list(changed.items()):
+            current = self.entries.get(path)
+            if current is not None and current.mtime > summary.mtime:
+                del changed[path]
+            else:
+                self.entries[path] = summary
+        removed = [path for path, seen in removed.items() if self.entries.get(path) is seen]
+        for path in removed:
+            del self.entries[path]
+        if changed or removed:
+            self._save_cache()
+            self._notify(changed, removed)
+        return changed, removed
+
+    def update_path(self, file_path):
+        """Aggiorna un singolo documento appena salvato (o lo rimuove se non esiste più)."""
+        if not os.path.exists(file_path):
+            self.remove_path(file_path)
+            return
+        summary = self.read_entry(file_path)
+        if summary is not None:
+            self.entries[file_path] = summary
+            self._save_cache()
+            self._notify({file_path: summary}, [])
+
+    def read_entry(self, file_path):
+        """Riepilogo di un singolo file, senza toccare l'indice (può girare in un thread separato)."""
+        doc_type = self._type_of(file_path)
+        if doc_type is None:
+            return None
+        return self._read_summary(file_path, doc_type, os.stat(file_path))
+
+    def replace_path(self, old_path, new_path, summary):
+        """Un documento è stato spostato (es. preventivo confermato): un'unica notifica."""
+        removed = {old_path: self.entries.get(old_path)} if old_path in self.entries else {}
+        return self.apply({new_path: summary} if summary is not None else {}, removed)
+
+    def remove_path(self, file_path):
+        """Toglie dall'indice un documento eliminato o spostato."""
+        if self.entries.pop(file_path, None) is not None:
+            self._save_cache()
+            self._notify({}, [file_path])
+
+    def _type_of(self, file_path):
+        folder = os.path.abspath(os.path.dirname(file_path))
+        for doc_type, subfolder in DOC_TYPES:
+            if folder == os.path.abspath(os.path.join(self.data_dir, subfolder)):
+                return doc_type
+        return None
+
+    def _read_summary(self, file_path, doc_type, stat):
+        """
+        Riepilogo di un file: basta l'intestazione (lettura parziale). I file nel
+        formato precedente vengono letti per intero, e già che ci siamo si
+        tengono anche le righe articolo.
+        """
+        try:
+            header = read_header(file_path)
+            if header is not None:
+                return DocumentSummary.from_header(header, doc_type, stat)
+            data = read_document(file_path)
+            summary = DocumentSummary.from_header(build_header(data, data.get(HEADER_KEY, {}).get("revisione", 0)), doc_type, stat)
+            summary.righe = document_lines(data)
+            return summary
+        except (json.JSONDecodeError, IOError, AttributeError, KeyError, TypeError):
+            return None # Ignora file corrotti
+
+    # --- Righe articolo (lette in background, vedi load_lines_async in core/data_io.py) ---
+
+    def missing_lines(self, paths=None):
+        """
+        Documenti indicati (default: tutti) ancora senza righe e non già in lettura:
+        [(percorso, riepilogo)]. Da qui risultano in lettura fino a set_lines o lines_done.
+        """
+        if paths is None:
+            paths = list(self.entries)
+        pending = []
+        for path in paths:
+            summary = self.entries.get(path)
+            if summary is not None and summary.righe is None and path not in self.lines_pending:
+                pending.append((path, summary))
+                self.lines_pending.add(path)
+        return pending
+
+    def read_lines(self, pending, progress=None):
+        """
+        (Thread di I/O) Legge le righe articolo dei documenti di missing_lines, senza toccare l'indice.
+        Ritorna {percorso: (riepilogo, righe)}; un file illeggibile per la rete resta da leggere.
+        """
+        return _read_in_chunks(pending, _read_lines_chunk, progress)
+
+    def set_lines(self, pending, loaded):
+        """
+        Assegna le righe lette da read_lines(pending) e avvisa chi le usa. Un documento
+        cambiato nel frattempo viene saltato: il nuovo riepilogo avrà una sua lettura.
+        """
+        self.lines_done(pending)
+        applied = {}
+        for path, (summary, lines) in loaded.items():
+            if self.entries.get(path) is summary:
+                summary.righe = lines
+                applied[path] = summary
+        if applied:
+            self._save_cache()
+            for callback in list(self.lines_listeners):
+                try:
+                    callback(applied)
+                except Exception as e:
+                    print(f"Attenzione: errore nell'aggiornamento di un indice derivato: {e}")
+        return applied
+
+    def lines_done(self, pending):
+        """Lettura delle righe conclusa (o fallita): i documenti rimasti senza righe si possono richiedere di nuovo."""
+        self.lines_pending.difference_update(path for path, _summary in pending)
+
+    # --- Lettura ---
+
+    def documents(self, doc_type):
+        """Elenco (percorso, riepilogo) dei documenti di un tipo."""
+        return [(path, e) for path, e in self.entries.items() if e.tipo == doc_type]
+
+    # --- Notifiche ---
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def add_lines_listener(self, callback):
+        self.lines_listeners.append(callback)
+
+    def _notify(self, changed, removed, reset=False):
+        for callback in list(self.listeners):
+            try:
+                callback(changed, removed, reset)
+            except Exception as e:
+                print(f"Attenzione: errore nell'aggiornamento di un indice derivato: {e}")
+
+_order_index = None
+
+def build_order_index():
+    """(Thread di I/O) Indice della cartella dati corrente, dalla cache locale: da passare a install_order_index."""
+    return OrderIndex(get_settings().data_dir)
+
+def install_order_index(index):
+    """Rende 'index' l'indice unico (se nel frattempo non ne è già stato creato uno) e lo ritorna."""
+    global _order_index
+    if _order_index is None:
+        _order_index = index
+        get_settings().data_dir_changed.connect(_order_index.set_data_dir)
+    return _order_index
+
+def get_order_index():
+    """Indice unico dell'applicazione, ri-puntato automaticamente se cambia la cartella dati."""
+    if _order_index is None:
+        install_order_index(OrderIndex(get_settings().data_dir))
+    return _order_index
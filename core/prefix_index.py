@@ -0,0 +1,55 @@
+import bisect
+
+# ======================================================================
+# --- INDICE PER PREFISSO ---
+# Struttura condivisa da catalogo prodotti e rubrica clienti per i
+# suggerimenti istantanei mentre si digita.
+# ======================================================================
+
+def normalize(text):
+    """Minuscolo e spazi compattati: la forma usata per chiavi e confronti."""
+    return " ".join(str(text or "").lower().split())
+
+class PrefixIndex:
+    """Lista ordinata di (chiave, id) interrogabile per prefisso con bisect."""
+    def __init__(self):
+        self.keys = []
+        self.ids = []
+
+    def rebuild(self, pairs):
+        pairs = sorted(pairs)
+        self.keys = [k for k, _ in pairs]
+        self.ids = [i for _, i in pairs]
+
+    def add(self, key, entry_id):
+        pos = bisect.bisect_left(self.keys, key)
+        # Evita doppioni della stessa coppia
+        while pos < len(self.keys) and self.keys[pos] == key:
+            if self.ids[pos] == entry_id:
+                return
+            pos += 1
+        self.keys.insert(pos, key)
+        self.ids.insert(pos, entry_id)
+
+    def lookup(self, prefix, limit):
+        """Id (senza ripetizioni) delle chiavi che iniziano con 'prefix', nell'ordine della chiave."""
+        result = []
+        seen = set()
+        pos = bisect.bisect_left(self.keys, prefix)
+        keys, ids = self.keys, self.ids
+        while pos < len(keys) and keys[pos].startswith(prefix) and len(result) < limit:
+            entry_id = ids[pos]
+            if entry_id not in seen:
+                seen.add(entry_id)
+                result.append(entry_id)
+            pos += 1
+        return result
+
+    def remove(self, key, entry_id):
+        pos = bisect.bisect_left(self.keys, key)
+        while pos < len(self.keys) and self.keys[pos] == key:
+            if self.ids[pos] == entry_id:
+                del self.keys[pos]
+                del self.ids[pos]
+                return
+            pos += 1
@@ -4,11 +4,12 @@ import re
 import platform
 import subprocess
 import webbrowser
+from collections import namedtuple
 from datetime import datetime
-from PySide6.QtWidgets import QMessageBox
 
 # Importa i percorsi dinamici (gestione exe/sviluppo)
 from paths import TEMPLATE_PATH, OUTPUT_DIR
+from core.totals import ensure_summary
 
 # ======================================================================
 # --- CONFIGURAZIONE MAPPING CELLE ---
@@ -84,12 +85,12 @@ def _clean_value_for_ods(value, is_numeric=False):
             
     return text_val
 
-def _trigger_print_or_open(file_path):
+def send_to_printer(file_path):
     """
     Gestisce l'azione finale:
     1. Prova a STAMPARE direttamente (senza aprire finestre).
     2. Se fallisce, APRE il file con il visualizzatore predefinito (es. Acrobat, Anteprima).
-    3. Se fallisce anche quello, apre nel Browser.
+    Ritorna "stampato" o "aperto"; se non riesce nemmeno ad aprirlo solleva OSError.
     """
     full_path = os.path.realpath(file_path)
     system = platform.system()
@@ -105,6 +106,7 @@ def _trigger_print_or_open(file_path):
             
         else: # Linux
             subprocess.run(["lpr", full_path], check=True)
+        return "stampato"
             
     except Exception as e:
         # --- TENTATIVO 2: Fallback (Apertura File) ---
@@ -116,8 +118,9 @@ def _trigger_print_or_open(file_path):
                 subprocess.run(["open", full_path], check=True)
             else:
                 subprocess.run(["xdg-open", full_path], check=True)
+            return "aperto"
         except Exception as final_e:
-             QMessageBox.critical(None, "Errore Apertura", f"Impossibile aprire il file: {final_e}")
+            raise OSError(f"Impossibile aprire il file: {final_e}") from final_e
 
 # ======================================================================
 # --- MOTORE PDF (LibreOffice) ---
@@ -183,9 +186,15 @@ def _convert_to_pdf(ods_path, output_dir):
 
 # ======================================================================
 # --- FUNZIONE PRINCIPALE DI GENERAZIONE ---
+# Nessuna finestra da qui: la preparazione gira nella coda di stampa
+# (core/print_queue.py), fuori dal thread dell'interfaccia. Gli avvisi
+# tornano nel risultato, gli errori come eccezioni.
 # ======================================================================
 
-def generate_and_print_order(order_data, original_json_filename):
+# File pronto da stampare (PDF, oppure l'ODS se la conversione non è riuscita) e avvisi per l'utente
+RenderedOrder = namedtuple("RenderedOrder", "path warnings")
+
+def render_order(order_data, original_json_filename):
     """
     Flusso principale:
     1. Apre template.ods.
@@ -193,143 +202,132 @@ def generate_and_print_order(order_data, original_json_filename):
     3. Gestisce logica Preventivo (nasconde totali).
     4. Salva .ODS temporaneo.
     5. Converte in PDF.
-    6. Stampa/Apre il PDF.
+    La stampa vera e propria è send_to_printer(risultato.path).
     """
-    
+    warnings = []
+
     # 1. Controlli Preliminari
     if not os.path.exists(TEMPLATE_PATH):
-        QMessageBox.critical(None, "Errore Template", f"File non trovato: '{TEMPLATE_PATH}'")
-        return False
+        raise FileNotFoundError(f"Modello di stampa non trovato: '{TEMPLATE_PATH}'")
 
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    try:
-        # 2. Caricamento Template
-        doc = ezodf.opendoc(TEMPLATE_PATH)
-        sheet = doc.sheets[0] 
-        
-        # Estrazione dati dal JSON
-        info = order_data.get("info_ordine", {})
-        customer = order_data.get("dati_cliente", {})
-        details = order_data.get("dettagli_ordine", [])
-
-        # --- FASE A: Scrittura Campi Singoli ---
-        # Usiamo set_value per inserire i dati nelle coordinate mappate
-        sheet[CELL_MAP["nome_cliente"]].set_value(customer.get("nome_cliente", ""))
-        sheet[CELL_MAP["telefono_cliente"]].set_value(customer.get("telefono_cliente", ""))
-        
-        sheet[CELL_MAP["data_ordine"]].set_value(_format_date(info.get("data_ordine")))
-        sheet[CELL_MAP["data_cerimonia"]].set_value(_format_date(info.get("data_cerimonia")))
-        sheet[CELL_MAP["data_consegna"]].set_value(_format_date(info.get("data_consegna")))
-        sheet[CELL_MAP["operatore"]].set_value(info.get("operatore", ""))
-        sheet[CELL_MAP["tipo_cerimonia"]].set_value(info.get("tipo_cerimonia", ""))
-        
-        sheet[CELL_MAP["colore_nastri"]].set_value(info.get("colore_nastri", ""))
-        sheet[CELL_MAP["tipo_confetti"]].set_value(info.get("tipo_confetti", ""))
-        sheet[CELL_MAP["colore_confetti"]].set_value(info.get("colore_confetti", ""))
-        sheet[CELL_MAP["confezione"]].set_value(info.get("confezione", ""))
-        sheet[CELL_MAP["pagamento"]].set_value(info.get("pagamento", ""))
-        sheet[CELL_MAP["altro"]].set_value(info.get("altro", ""))
-
-        # --- FASE B: Gestione Acconti ---
-        # Scrive l'acconto solo se il tipo è definito (es. "Contanti")
-        ac1_tipo = _clean_value_for_ods(info.get('acconto1_tipo'))
-        ac1_importo = _clean_value_for_ods(info.get('acconto1_importo'), is_numeric=True)
-        
-        if ac1_tipo:
-            sheet[CELL_MAP["acconto1_tipo"]].set_value(ac1_tipo)
-            sheet[CELL_MAP["acconto1_importo"]].set_value(ac1_importo, currency='EUR')
-        else:
-            # Pulisce le celle se non c'è acconto
-            sheet[CELL_MAP["acconto1_tipo"]].set_value("")
-            sheet[CELL_MAP["acconto1_importo"]].set_value("") 
-
-        ac2_tipo = _clean_value_for_ods(info.get('acconto2_tipo'))
-        ac2_importo = _clean_value_for_ods(info.get('acconto2_importo'), is_numeric=True)
-        
-        if ac2_tipo:
-            sheet[CELL_MAP["acconto2_tipo"]].set_value(ac2_tipo)
-            sheet[CELL_MAP["acconto2_importo"]].set_value(ac2_importo, currency='EUR')
-        else:
-            sheet[CELL_MAP["acconto2_tipo"]].set_value("")
-            sheet[CELL_MAP["acconto2_importo"]].set_value("") 
+    # 2. Caricamento Template
+    doc = ezodf.opendoc(TEMPLATE_PATH)
+    sheet = doc.sheets[0] 
+    
+    # Estrazione dati dal JSON
+    info = order_data.get("info_ordine", {})
+    customer = order_data.get("dati_cliente", {})
+    details = order_data.get("dettagli_ordine", [])
 
-        # --- FASE C: Popolamento Tabella ---
-        start_row = CELL_MAP.get("tabella_start_row_index")
-        total_row = CELL_MAP.get("tabella_total_row_index")
-        
-        available_rows = total_row - start_row
-        python_grand_total = 0.0 # Calcoliamo il totale in Python per sicurezza
+    # --- FASE A: Scrittura Campi Singoli ---
+    # Usiamo set_value per inserire i dati nelle coordinate mappate
+    sheet[CELL_MAP["nome_cliente"]].set_value(customer.get("nome_cliente", ""))
+    sheet[CELL_MAP["telefono_cliente"]].set_value(customer.get("telefono_cliente", ""))
+    
+    sheet[CELL_MAP["data_ordine"]].set_value(_format_date(info.get("data_ordine")))
+    sheet[CELL_MAP["data_cerimonia"]].set_value(_format_date(info.get("data_cerimonia")))
+    sheet[CELL_MAP["data_consegna"]].set_value(_format_date(info.get("data_consegna")))
+    sheet[CELL_MAP["operatore"]].set_value(info.get("operatore", ""))
+    sheet[CELL_MAP["tipo_cerimonia"]].set_value(info.get("tipo_cerimonia", ""))
+    
+    sheet[CELL_MAP["colore_nastri"]].set_value(info.get("colore_nastri", ""))
+    sheet[CELL_MAP["tipo_confetti"]].set_value(info.get("tipo_confetti", ""))
+    sheet[CELL_MAP["colore_confetti"]].set_value(info.get("colore_confetti", ""))
+    sheet[CELL_MAP["confezione"]].set_value(info.get("confezione", ""))
+    sheet[CELL_MAP["pagamento"]].set_value(info.get("pagamento", ""))
+    sheet[CELL_MAP["altro"]].set_value(info.get("altro", ""))
 
-        for i, item in enumerate(details):
-            if i >= available_rows:
-                break # Interrompe se superiamo lo spazio nel foglio
-            
-            row_idx = start_row + i
-            
-            q_val = _clean_value_for_ods(item.get('quantita'), is_numeric=True)
-            p_val = _clean_value_for_ods(item.get('prezzo_unitario'), is_numeric=True)
-            
-            # Calcolo parziale
-            python_grand_total += (q_val * p_val)
+    # --- FASE B: Gestione Acconti ---
+    # Scrive l'acconto solo se il tipo è definito (es. "Contanti")
+    ac1_tipo = _clean_value_for_ods(info.get('acconto1_tipo'))
+    ac1_importo = _clean_value_for_ods(info.get('acconto1_importo'), is_numeric=True)
+    
+    if ac1_tipo:
+        sheet[CELL_MAP["acconto1_tipo"]].set_value(ac1_tipo)
+        sheet[CELL_MAP["acconto1_importo"]].set_value(ac1_importo, currency='EUR')
+    else:
+        # Pulisce le celle se non c'è acconto
+        sheet[CELL_MAP["acconto1_tipo"]].set_value("")
+        sheet[CELL_MAP["acconto1_importo"]].set_value("") 
 
-            # Scrittura Riga (Colonne fisse: 0=Ditta, 1=Codice, 2=Descr, 4=Qt, 5=Prezzo)
-            sheet[(row_idx, 0)].set_value(_clean_value_for_ods(item.get('ditta')))
-            sheet[(row_idx, 1)].set_value(_clean_value_for_ods(item.get('codice')))
-            sheet[(row_idx, 2)].set_value(_clean_value_for_ods(item.get('descrizione')))
-            sheet[(row_idx, 4)].set_value(q_val)
-            sheet[(row_idx, 5)].set_value(p_val, currency='EUR')
-            
-            # Formula Excel per la riga (per estetica se si apre il file ODS)
-            sheet[(row_idx, 6)].formula = f"of:=E{row_idx + 1}*F{row_idx + 1}"
+    ac2_tipo = _clean_value_for_ods(info.get('acconto2_tipo'))
+    ac2_importo = _clean_value_for_ods(info.get('acconto2_importo'), is_numeric=True)
+    
+    if ac2_tipo:
+        sheet[CELL_MAP["acconto2_tipo"]].set_value(ac2_tipo)
+        sheet[CELL_MAP["acconto2_importo"]].set_value(ac2_importo, currency='EUR')
+    else:
+        sheet[CELL_MAP["acconto2_tipo"]].set_value("")
+        sheet[CELL_MAP["acconto2_importo"]].set_value("") 
 
-        # Pulizia righe rimaste vuote
-        for row_idx in range(start_row + len(details), total_row):
-            for col in [0, 1, 2, 4, 5, 6]:
-                sheet[(row_idx, col)].set_value("")
+    # --- FASE C: Popolamento Tabella ---
+    start_row = CELL_MAP.get("tabella_start_row_index")
+    total_row = CELL_MAP.get("tabella_total_row_index")
+    
+    available_rows = total_row - start_row
 
-        # Avviso se articoli troncati
-        if len(details) > available_rows:
-            QMessageBox.warning(None, "Attenzione", f"Alcuni articoli sono stati esclusi dalla stampa (Max {available_rows}).")
+    for i, item in enumerate(details):
+        if i >= available_rows:
+            break # Interrompe se superiamo lo spazio nel foglio
         
-        # --- FASE D: Gestione Totale (Ordine vs Preventivo) ---
-        tipo_documento = info.get("tipo_documento", "ordine") 
+        row_idx = start_row + i
         
-        if tipo_documento == "preventivo":
-            # Se è un preventivo, NASCONDIAMO il totale finale
-            sheet[(total_row, 5)].set_value("") 
-            sheet[(total_row, 6)].set_value(" ")
-            sheet[(total_row, 6)].formula = ""
-        else:
-            # Se è un ordine, scriviamo il totale calcolato
-            sheet[(total_row, 5)].set_value("TOTALE")
-            sheet[(total_row, 6)].set_value(python_grand_total, currency='EUR')
+        q_val = _clean_value_for_ods(item.get('quantita'), is_numeric=True)
+        p_val = _clean_value_for_ods(item.get('prezzo_unitario'), is_numeric=True)
 
-        # --- FASE E: Salvataggio e Conversione ---
-        # 1. Salva ODS
-        base_name = os.path.splitext(original_json_filename)[0]
-        safe_name = re.sub(r'[\\/*?:"<>|]', "_", base_name)
-        ods_filename = f"{safe_name}.ods"
-        output_path_ods = os.path.join(OUTPUT_DIR, ods_filename)
-        
-        doc.saveas(output_path_ods)
-        
-        # 2. Converti in PDF
-        pdf_path = _convert_to_pdf(output_path_ods, OUTPUT_DIR)
+        # Scrittura Riga (Colonne fisse: 0=Ditta, 1=Codice, 2=Descr, 4=Qt, 5=Prezzo)
+        sheet[(row_idx, 0)].set_value(_clean_value_for_ods(item.get('ditta')))
+        sheet[(row_idx, 1)].set_value(_clean_value_for_ods(item.get('codice')))
+        sheet[(row_idx, 2)].set_value(_clean_value_for_ods(item.get('descrizione')))
+        sheet[(row_idx, 4)].set_value(q_val)
+        sheet[(row_idx, 5)].set_value(p_val, currency='EUR')
         
-        # 3. Lancia Stampa/Apertura
-        if pdf_path:
-            _trigger_print_or_open(pdf_path)
-            return True
-        else:
-            # Fallback: se PDF fallisce, apre l'ODS
-            QMessageBox.warning(None, "Info", "Conversione PDF non riuscita. Apro il file modificabile.")
-            _trigger_print_or_open(output_path_ods)
-            return False
+        # Formula Excel per la riga (per estetica se si apre il file ODS)
+        sheet[(row_idx, 6)].formula = f"of:=E{row_idx + 1}*F{row_idx + 1}"
 
-    except Exception as e:
-        QMessageBox.critical(None, "Errore Critico Stampa", f"{e}")
-        import traceback
-        traceback.print_exc()
-        return False
\ No newline at end of file
+    # Pulizia righe rimaste vuote
+    for row_idx in range(start_row + len(details), total_row):
+        for col in [0, 1, 2, 4, 5, 6]:
+            sheet[(row_idx, col)].set_value("")
+
+    # Avviso se articoli troncati: il totale stampato resta quello dell'intero documento
+    if len(details) > available_rows:
+        warnings.append(
+            f"{len(details) - available_rows} articoli su {len(details)} non sono stati stampati "
+            f"(massimo {available_rows} righe): il totale stampato li comprende."
+        )
+    
+    # --- FASE D: Gestione Totale (Ordine vs Preventivo) ---
+    tipo_documento = info.get("tipo_documento", "ordine") 
+    
+    if tipo_documento == "preventivo":
+        # Se è un preventivo, NASCONDIAMO il totale finale
+        sheet[(total_row, 5)].set_value("") 
+        sheet[(total_row, 6)].set_value(" ")
+        sheet[(total_row, 6)].formula = ""
+    else:
+        # Se è un ordine, scriviamo il totale salvato nel documento (lo stesso di liste e report)
+        grand_total = float(ensure_summary(order_data)["totale"])
+        sheet[(total_row, 5)].set_value("TOTALE")
+        sheet[(total_row, 6)].set_value(grand_total, currency='EUR')
+
+    # --- FASE E: Salvataggio e Conversione ---
+    # 1. Salva ODS
+    base_name = os.path.splitext(original_json_filename)[0]
+    safe_name = re.sub(r'[\\/*?:"<>|]', "_", base_name)
+    ods_filename = f"{safe_name}.ods"
+    output_path_ods = os.path.join(OUTPUT_DIR, ods_filename)
+    
+    doc.saveas(output_path_ods)
+    
+    # 2. Converti in PDF
+    pdf_path = _convert_to_pdf(output_path_ods, OUTPUT_DIR)
+    
+    if pdf_path:
+        return RenderedOrder(pdf_path, warnings)
+    # Fallback: se PDF fallisce, si stampa/apre l'ODS
+    warnings.append("Conversione PDF non riuscita: si usa il file modificabile.")
+    return RenderedOrder(output_path_ods, warnings)
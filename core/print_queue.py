@@ -0,0 +1,61 @@
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QObject, Signal
+
+# ======================================================================
+# --- CODA DI STAMPA ---
+# Dopo il salvataggio la stampa procede per fasi, tutte in background:
+#   1. preparazione: modello ODS compilato e convertito in PDF (LibreOffice);
+#   2. invio alla stampante (o apertura in anteprima se non si può stampare).
+# Ogni fase conclusa viene segnalata all'interfaccia, che intanto resta
+# libera: l'operatore può già inserire l'ordine successivo.
+#
+# Un solo thread, dedicato: i fogli escono nell'ordine in cui sono stati
+# chiesti e LibreOffice non viene mai avviato due volte insieme (due
+# conversioni in parallelo sullo stesso profilo utente si bloccano).
+# È separata dal livello di I/O della cartella dati (core/data_io.py):
+# una conversione lenta non è un problema di rete, non deve far scattare
+# l'interruttore né occupare i thread dei salvataggi.
+# ======================================================================
+
+class PrintQueue(QObject):
+    """
+    Stampa documenti in background, uno alla volta.
+
+    Segnali (nel thread dell'interfaccia):
+      - rendered(str, list): documento pronto (nome, avvisi per l'utente).
+      - printed(str, str): documento inviato ("stampato") o aperto in anteprima ("aperto").
+      - failed(str, object): stampa non riuscita (nome, eccezione).
+    """
+    rendered = Signal(str, list)
+    printed = Signal(str, str)
+    failed = Signal(str, object)
+
+    def __init__(self):
+        super().__init__()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="print")
+
+    def submit(self, order_data, document_name):
+        """Accoda la stampa. order_data deve essere una copia propria: viene letta dal thread di stampa."""
+        self.executor.submit(self._run, order_data, document_name)
+
+    def _run(self, order_data, document_name):
+        try:
+            # Import ritardato: ezodf viene caricato solo alla prima stampa (e fuori dall'interfaccia)
+            from core.print_order import render_order, send_to_printer
+            result = render_order(order_data, document_name)
+            self.rendered.emit(document_name, result.warnings)
+            self.printed.emit(document_name, send_to_printer(result.path))
+        except Exception as e:
+            traceback.print_exc()
+            self.failed.emit(document_name, e)
+
+_print_queue = None
+
+def get_print_queue():
+    """Istanza unica della coda di stampa (da usare dal thread dell'interfaccia)."""
+    global _print_queue
+    if _print_queue is None:
+        _print_queue = PrintQueue()
+    return _print_queue
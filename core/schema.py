@@ -0,0 +1,170 @@
+import os
+import json
+import argparse
+
+from core.totals import attach_summary
+
+# ======================================================================
+# --- VERSIONE DEL FORMATO DOCUMENTI E MIGRAZIONI ---
+# Ogni documento salvato porta il numero di versione del suo formato.
+# I documenti più vecchi vengono aggiornati al volo in lettura (in
+# memoria) passando, una versione alla volta, per le migrazioni
+# registrate qui sotto; su disco cambiano al primo salvataggio, oppure
+# tutti insieme con l'aggiornamento dell'archivio:
+#   python -m core.schema [--cartella PERCORSO]
+#
+# Per cambiare il formato: aumentare SCHEMA_VERSION e aggiungere una
+# funzione @migration(vecchia_versione) che porta il documento avanti di uno.
+# ======================================================================
+
+SCHEMA_KEY = "versione_schema"
+SCHEMA_VERSION = 3
+
+# Campi (e valori di default) di ogni sezione del documento
+INFO_FIELDS = {
+    "data_ordine": "", "operatore": "", "data_cerimonia": "", "data_consegna": "",
+    "tipo_cerimonia": "", "colore_nastri": "", "tipo_confetti": "", "colore_confetti": "",
+    "confezione": "", "pagamento": "", "altro": "", "tipo_documento": "",
+    "acconto1_tipo": "", "acconto1_importo": "", "acconto2_tipo": "", "acconto2_importo": "",
+}
+CUSTOMER_FIELDS = {"nome_cliente": "", "telefono_cliente": ""}
+LINE_FIELDS = {
+    "ditta": "", "codice": "", "descrizione": "",
+    "quantita": "", "prezzo_unitario": "", "prezzo_totale": "0.00",
+}
+
+_MIGRATIONS = {}
+
+def migration(from_version):
+    """Registra la funzione che porta un documento dalla versione indicata alla successiva."""
+    def register(func):
+        _MIGRATIONS[from_version] = func
+        return func
+    return register
+
+@migration(0)
+def _complete_fields(document):
+    """Documenti senza versione: campi aggiunti nel tempo (es. data consegna, acconti) mancanti."""
+    for section, fields in (("info_ordine", INFO_FIELDS), ("dati_cliente", CUSTOMER_FIELDS)):
+        values = document.setdefault(section, {})
+        for key, default in fields.items():
+            values.setdefault(key, default)
+    lines = document.setdefault("dettagli_ordine", [])
+    for line in lines:
+        for key, default in LINE_FIELDS.items():
+            line.setdefault(key, default)
+
+@migration(1)
+def _add_summary(document):
+    """Riepilogo totali/acconti/saldo salvato nel documento."""
+    attach_summary(document)
+
+@migration(2)
+def _header_on_save(document):
+    """Intestazione in prima riga (vedi core/documents.py): viene scritta al salvataggio."""
+
+def migrate(document):
+    """
+    Porta il documento (in memoria) all'ultima versione del formato.
+    Ritorna True se è stato modificato.
+    """
+    version = document.get(SCHEMA_KEY, 0)
+    if version > SCHEMA_VERSION:
+        print(f"ATTENZIONE: documento in un formato più recente ({version}) di questo programma ({SCHEMA_VERSION}).")
+        return False
+    if version == SCHEMA_VERSION:
+        return False
+    while version < SCHEMA_VERSION:
+        _MIGRATIONS[version](document)
+        version += 1
+    document[SCHEMA_KEY] = version
+    return True
+
+# --- Aggiornamento dell'intero archivio ---
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def migrate_archive(data_dir, compact=None, progress=None):
+    """
+    Riscrive i documenti non aggiornati (versione vecchia o formattazione
+    diversa da quella scelta). Ritorna (documenti riscritti, documenti totali).
+    Segue le regole di core/bulk.py: se anche un solo documento da riscrivere è in
+    modifica su un'altra postazione non si tocca nulla (DocumentsInUse); un errore
+    su un documento non ferma gli altri; ogni riscrittura entra nello storico e alla
+    fine una sola riga di registro modifiche per tutti.
+    progress(fatti, totale), se indicato, dopo ogni documento letto o riscritto.
+    """
+    from core.documents import write_document, use_compact_format, is_compact_text
+    from core.bulk import check_free
+    from core.leases import release
+    from core.change_feed import record_changes
+    from core.history import record_revision
+
+    if compact is None:
+        compact = use_compact_format()
+    paths = []
+    for subfolder in ("orders", "quotes"):
+        folder = os.path.join(data_dir, subfolder)
+        if os.path.isdir(folder):
+            with os.scandir(folder) as entries:
+                paths.extend(entry.path for entry in entries if entry.name.endswith(".json"))
+    done, total = 0, len(paths)
+
+    def step():
+        nonlocal done
+        done += 1
+        if progress:
+            progress(done, total)
+
+    # 1. Cosa va riscritto (solo lettura)
+    to_write = []
+    for path in paths:
+        try:
+            text = _read_text(path)
+            if migrate(json.loads(text)) or is_compact_text(text) != compact:
+                to_write.append(path)
+                total += 1
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Aggiornamento archivio: salto {os.path.basename(path)} ({e})")
+        step()
+    # Il controllo dei lease tiene ferma la barra dov'è (e vivo il timeout dell'I/O)
+    check_free(to_write, (lambda _done, _total: progress(done, total)) if progress else None)
+
+    # 2. Riscritture, un documento alla volta (riletto: può essere cambiato nel frattempo)
+    saved = []
+    for path in to_write:
+        try:
+            document = json.loads(_read_text(path))
+            migrate(document)
+            write_document(path, document, compact=compact)
+            record_revision(path, document)
+            saved.append(path)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Aggiornamento archivio: salto {os.path.basename(path)} ({e})")
+        try:
+            release(path)
+        except OSError:
+            pass # Un nostro lease rimasto scade da solo
+        step()
+    record_changes(saved=saved, data_dir=data_dir)
+    return len(saved), len(paths)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.schema", description="Aggiorna tutti i documenti all'ultimo formato.")
+    parser.add_argument("--cartella", help="Cartella dati (default: quella configurata nel programma)")
+    parser.add_argument("--esteso", action="store_true", help="Scrive i file indentati invece che compatti")
+    args = parser.parse_args(argv)
+
+    if args.cartella:
+        data_dir = args.cartella
+    else:
+        from paths import get_data_dir
+        data_dir = get_data_dir()
+
+    rewritten, total = migrate_archive(data_dir, compact=not args.esteso)
+    print(f"Documenti aggiornati: {rewritten} su {total}")
+
+if __name__ == "__main__":
+    main()
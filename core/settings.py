@@ -0,0 +1,90 @@
+import os
+import json
+from PySide6.QtCore import QObject, Signal
+
+from paths import get_config_path, load_config, resolve_data_dir
+
+# ======================================================================
+# --- SERVIZIO IMPOSTAZIONI ---
+# config.json viene letto UNA volta sola; le pagine leggono i percorsi
+# da qui e ricevono un segnale quando cambiano, senza riavviare l'app.
+# ======================================================================
+
+class SettingsService(QObject):
+    """
+    Impostazioni dell'applicazione, tenute in memoria.
+
+    Segnali:
+      - settings_changed(dict): emesso dopo ogni salvataggio, con il config completo.
+      - data_dir_changed(str): emesso quando cambia la cartella dati (nuovo percorso).
+        Chi tiene cache, indici o watcher sulla cartella dati deve collegarsi qui.
+    """
+    settings_changed = Signal(dict)
+    data_dir_changed = Signal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.config_path = get_config_path()
+        self._config = load_config()
+        self._data_dir = None
+
+    # --- Lettura (dalla memoria, mai dal disco) ---
+
+    def get(self, key, default=None):
+        return self._config.get(key, default)
+
+    @property
+    def data_dir(self):
+        """Cartella dati corrente (solo il percorso: nessun accesso al disco, vedi ensure_data_dir)."""
+        if self._data_dir is None:
+            self._data_dir = resolve_data_dir(self._config)
+        return self._data_dir
+
+    def ensure_data_dir(self):
+        """(Thread di I/O) Crea la cartella dati se manca: su una cartella di rete può bloccare."""
+        os.makedirs(self.data_dir, exist_ok=True)
+
+    @property
+    def orders_dir(self):
+        return os.path.join(self.data_dir, "orders")
+
+    @property
+    def quotes_dir(self):
+        return os.path.join(self.data_dir, "quotes")
+
+    # --- Scrittura ---
+
+    def update(self, **changes):
+        """
+        Applica e salva su config.json le modifiche indicate.
+        Solleva un'eccezione se la scrittura fallisce (il config in memoria resta invariato).
+        """
+        new_config = dict(self._config)
+        new_config.update(changes)
+
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            json.dump(new_config, f, indent=4)
+
+        self._apply(new_config)
+
+    def reload(self):
+        """Rilegge config.json dal disco (es. se modificato a mano)."""
+        self._apply(load_config())
+
+    def _apply(self, new_config):
+        old_data_dir = self._data_dir
+        self._config = new_config
+        self._data_dir = None
+
+        self.settings_changed.emit(dict(self._config))
+        if old_data_dir is None or self.data_dir != old_data_dir:
+            self.data_dir_changed.emit(self.data_dir)
+
+_settings = None
+
+def get_settings():
+    """Ritorna l'istanza unica del servizio impostazioni (creata al primo uso)."""
+    global _settings
+    if _settings is None:
+        _settings = SettingsService()
+    return _settings
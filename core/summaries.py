@@ -0,0 +1,113 @@
+import sys
+from datetime import date
+
+from core.totals import parse_amount
+from core.prefix_index import normalize
+
+# ======================================================================
+# --- RIEPILOGHI DEI DOCUMENTI IN MEMORIA ---
+# Un oggetto con __slots__ per documento al posto di un dict con quindici
+# chiavi: niente dizionario per istanza, date come numeri (giorni dal
+# calendario, 0 = non indicata), importi in centesimi e testi ripetuti
+# (operatore, cerimonia, ditte, nomi dei clienti) condivisi con
+# sys.intern. Lo stesso oggetto è usato da indice, ricerca, report,
+# riepilogo fornitori e suggerimenti: nessuna copia per pagina.
+# Le chiavi di ordinamento/ricerca (date e importi numerici, nome
+# normalizzato) sono pronte fin dalla lettura: ordinare non costa altro.
+# Confronto di memoria con i dict: python benchmarks/summary_memory.py
+# ======================================================================
+
+# Campi data (salvati come ordinale; 0 = data mancante)
+DATE_FIELDS = ("data_ordine", "data_cerimonia", "data_consegna")
+# Importi (salvati in centesimi)
+AMOUNT_FIELDS = ("totale", "acconti", "saldo")
+# Testi, nell'ordine in cui compaiono nella cache
+TEXT_FIELDS = ("tipo", "nome_cliente", "telefono_cliente", "operatore", "tipo_cerimonia", "tipo_confetti")
+
+_intern = sys.intern
+
+def date_ordinal(iso_date):
+    """Data ISO ('2026-05-01') -> ordinale; 0 se mancante o non valida."""
+    try:
+        return date.fromisoformat(iso_date).toordinal()
+    except (ValueError, TypeError):
+        return 0
+
+def intern_line(line):
+    """Riga articolo [ditta, codice, descrizione, quantita, prezzo] con la ditta condivisa."""
+    ditta, codice, descrizione, quantita, prezzo = line
+    return (_intern(ditta), codice, descrizione, quantita, prezzo)
+
+def document_lines(document):
+    """Righe articolo di un documento in forma compatta: (ditta, codice, descrizione, quantita, prezzo_unitario)."""
+    return [
+        intern_line((r["ditta"], r["codice"], r["descrizione"], str(r["quantita"]), str(r["prezzo_unitario"])))
+        for r in document["dettagli_ordine"]
+    ]
+
+class DocumentSummary:
+    """
+    Riepilogo di un ordine/preventivo (il percorso è la chiave dell'indice, non è ripetuto qui).
+    'righe' è None finché le righe articolo non vengono lette (load_lines_async in core/data_io.py).
+    """
+    __slots__ = ("mtime", "size", "revisione") + TEXT_FIELDS + DATE_FIELDS + AMOUNT_FIELDS + ("righe", "chiave_cliente")
+
+    @classmethod
+    def from_header(cls, header, doc_type, stat):
+        """Riepilogo a partire dall'intestazione di un documento (vedi core/documents.py)."""
+        s = cls.__new__(cls)
+        s.mtime = stat.st_mtime
+        s.size = stat.st_size
+        s.revisione = header.get("revisione", 0)
+        s.tipo = _intern(doc_type)
+        s.nome_cliente = _intern(str(header.get("nome_cliente", "Sconosciuto")))
+        s.telefono_cliente = _intern(str(header.get("telefono_cliente", "")))
+        for field in ("operatore", "tipo_cerimonia", "tipo_confetti"):
+            setattr(s, field, _intern(str(header.get(field, ""))))
+        for field in DATE_FIELDS:
+            setattr(s, field, date_ordinal(header.get(field, "")))
+        for field in AMOUNT_FIELDS:
+            setattr(s, field, int(parse_amount(header.get(field, "0.00")) * 100))
+        s.righe = None
+        s.chiave_cliente = _intern(normalize(s.nome_cliente))
+        return s
+
+    # --- Cache su disco (una lista per documento, più compatta di un oggetto JSON) ---
+
+    def to_row(self):
+        row = [self.mtime, self.size, self.revisione]
+        row += [getattr(self, f) for f in TEXT_FIELDS + DATE_FIELDS + AMOUNT_FIELDS]
+        row.append(None if self.righe is None else [list(line) for line in self.righe])
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        s = cls.__new__(cls)
+        s.mtime, s.size, s.revisione = row[0], row[1], row[2]
+        n = 3
+        for field in TEXT_FIELDS:
+            setattr(s, field, _intern(row[n]))
+            n += 1
+        for field in DATE_FIELDS + AMOUNT_FIELDS:
+            setattr(s, field, row[n])
+            n += 1
+        s.righe = None if row[n] is None else [intern_line(line) for line in row[n]]
+        s.chiave_cliente = _intern(normalize(s.nome_cliente))
+        return s
+
+    # --- Presentazione ---
+
+    def iso_date(self, field):
+        """Data in formato ISO ('' se mancante)."""
+        ordinal = getattr(self, field)
+        return date.fromordinal(ordinal).isoformat() if ordinal else ""
+
+    def display_date(self, field):
+        """Data come gg/mm/aaaa ('N.D.' se mancante)."""
+        ordinal = getattr(self, field)
+        return date.fromordinal(ordinal).strftime("%d/%m/%Y") if ordinal else "N.D."
+
+    def display_amount(self, field):
+        """Importo come testo con due decimali (es. '12.50')."""
+        cents = getattr(self, field)
+        return f"{'-' if cents < 0 else ''}{abs(cents) // 100}.{abs(cents) % 100:02d}"
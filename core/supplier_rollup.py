@@ -0,0 +1,158 @@
+import re
+import bisect
+
+from core.order_index import get_order_index
+from core.data_io import load_lines_async
+from core.totals import parse_amount, ZERO
+
+# ======================================================================
+# --- RIEPILOGO ACQUISTI PER FORNITORE ---
+# Quantità da ordinare per ditta/codice, divise per giorno di consegna.
+# Il riepilogo è una "vista materializzata": viene aggiornato documento
+# per documento (salvataggio, modifica, conversione, eliminazione)
+# togliendo il contributo vecchio e aggiungendo quello nuovo, senza
+# ricalcolare tutto l'archivio.
+# ======================================================================
+
+def _delivery_day(summary):
+    """Giorno di consegna dell'ordine (o della cerimonia, per gli ordini senza consegna)."""
+    return summary.data_consegna or summary.data_cerimonia or None
+
+class SupplierRollup:
+    """
+    Vista: giorno di consegna -> {(ditta, codice): quantità}.
+    Ogni documento ricorda il proprio contributo, così una modifica
+    tocca solo i contatori interessati. Un ordine di cui non si hanno
+    ancora le righe articolo conta da quando arrivano (lettura in background).
+    """
+    def __init__(self, index):
+        self.index = index
+        self.rebuild()
+        index.add_listener(self.on_index_changed)
+        index.add_lines_listener(self.on_lines_loaded)
+
+    def rebuild(self):
+        self.contributions = {} # percorso -> (giorno, [((ditta, codice), quantità)])
+        self.by_day = {}        # giorno -> {(ditta, codice): [quantità, righe]}
+        self.days = []          # giorni presenti, ordinati (per filtrare il periodo con bisect)
+        self.descriptions = {}  # (ditta, codice) -> ultima descrizione vista
+        docs = self.index.documents("ordine")
+        for path, summary in docs:
+            self._add(path, summary)
+        load_lines_async([path for path, _summary in docs])
+
+    def on_index_changed(self, changed, removed, reset):
+        if reset:
+            self.rebuild()
+            return
+        for path in removed:
+            self._remove(path)
+        self.on_lines_loaded(changed)
+        load_lines_async([path for path, summary in changed.items() if summary.tipo == "ordine"])
+
+    def on_lines_loaded(self, loaded):
+        for path, summary in loaded.items():
+            self._remove(path)
+            if summary.tipo == "ordine":
+                self._add(path, summary)
+
+    # --- Aggiornamento incrementale ---
+
+    def _add(self, path, summary):
+        day = _delivery_day(summary)
+        if day is None:
+            return
+        lines = []
+        for ditta, codice, descrizione, qty, _price in summary.righe or ():
+            quantity = parse_amount(qty)
+            if not quantity:
+                continue
+            key = (ditta.strip().upper() or "N.D.", codice.strip() or descrizione.strip())
+            lines.append((key, quantity))
+            if descrizione:
+                self.descriptions[key] = descrizione
+        if not lines:
+            return
+
+        self.contributions[path] = (day, lines)
+        bucket = self.by_day.get(day)
+        if bucket is None:
+            bucket = self.by_day[day] = {}
+            bisect.insort(self.days, day)
+        for key, quantity in lines:
+            values = bucket.get(key)
+            if values is None:
+                values = bucket[key] = [ZERO, 0]
+            values[0] += quantity
+            values[1] += 1
+
+    def _remove(self, path):
+        contribution = self.contributions.pop(path, None)
+        if contribution is None:
+            return
+        day, lines = contribution
+        bucket = self.by_day[day]
+        for key, quantity in lines:
+            # Si conta sulle righe, non sulla quantità: righe in positivo e in negativo
+            # possono dare zero mentre altri ordini contribuiscono ancora alla chiave
+            values = bucket[key]
+            values[0] -= quantity
+            values[1] -= 1
+            if not values[1]:
+                del bucket[key]
+        if not bucket:
+            del self.by_day[day]
+            del self.days[bisect.bisect_left(self.days, day)]
+
+    # --- Interrogazione ---
+
+    def query(self, date_from, date_to):
+        """
+        Totali per ditta nel periodo di consegna [date_from, date_to] (oggetti date).
+        Ritorna {ditta: [(codice, descrizione, quantità)]}, tutto in ordine alfabetico.
+        """
+        lo = bisect.bisect_left(self.days, date_from.toordinal())
+        hi = bisect.bisect_right(self.days, date_to.toordinal())
+        totals = {}
+        for day in self.days[lo:hi]:
+            for key, (quantity, _count) in self.by_day[day].items():
+                totals[key] = totals.get(key, ZERO) + quantity
+
+        result = {}
+        for (ditta, codice), quantity in sorted(totals.items()):
+            result.setdefault(ditta, []).append((codice, self.descriptions.get((ditta, codice), ""), quantity))
+        return result
+
+    def export_ods(self, file_path, date_from, date_to):
+        """Esporta il riepilogo del periodo in un file ODS con un foglio per ogni ditta."""
+        import ezodf # Import ritardato, come per la stampa
+
+        rollup = self.query(date_from, date_to)
+        doc = ezodf.newdoc(doctype="ods", filename=file_path)
+        period = f"Consegne dal {date_from.strftime('%d/%m/%Y')} al {date_to.strftime('%d/%m/%Y')}"
+
+        for ditta, lines in rollup.items():
+            # Nomi foglio: niente caratteri speciali, massimo 31 caratteri
+            sheet_name = re.sub(r'[\\/*?:\[\]]', "_", ditta)[:31]
+            sheet = ezodf.Sheet(sheet_name, size=(len(lines) + 3, 3))
+            sheet[0, 0].set_value(ditta)
+            sheet[0, 1].set_value(period)
+            for col, header in enumerate(("Codice", "Descrizione", "Quantità")):
+                sheet[2, col].set_value(header)
+            for r, (codice, descrizione, quantity) in enumerate(lines, start=3):
+                sheet[r, 0].set_value(codice)
+                sheet[r, 1].set_value(descrizione)
+                sheet[r, 2].set_value(float(quantity))
+            doc.sheets += sheet
+
+        doc.save()
+        return len(rollup)
+
+_rollup = None
+
+def get_supplier_rollup():
+    """Riepilogo fornitori unico (collegato all'indice dei documenti)."""
+    global _rollup
+    if _rollup is None:
+        _rollup = SupplierRollup(get_order_index())
+    return _rollup
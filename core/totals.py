@@ -0,0 +1,78 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# ======================================================================
+# --- CALCOLO TOTALI ---
+# Unico punto di calcolo di totali, acconti e saldo, in Decimal (niente
+# errori di arrotondamento dei float). Il risultato viene salvato in ogni
+# documento nel blocco "riepilogo", così liste e report non devono
+# rileggere e ricalcolare tutte le righe.
+# ======================================================================
+
+SUMMARY_KEY = "riepilogo"
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+def parse_amount(value):
+    """
+    Converte un importo scritto a mano in Decimal.
+    Accetta '10.50', '10,50', '1.234,50', '€ 12'. Testo non valido = 0.
+    """
+    text = str(value if value is not None else "").strip().replace("€", "").replace(" ", "")
+    if not text:
+        return ZERO
+    if "," in text:
+        # Formato italiano: il punto separa le migliaia, la virgola i decimali
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        return ZERO
+    return amount if amount.is_finite() else ZERO
+
+def quantize(amount):
+    """Arrotonda al centesimo (mezzo centesimo per eccesso, come alla cassa)."""
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def format_amount(amount):
+    """Decimal -> testo con due decimali (es. '12.50'), come salvato nei documenti."""
+    return f"{quantize(amount):.2f}"
+
+def line_total(quantity, unit_price):
+    """Totale di una riga articolo."""
+    return quantize(parse_amount(quantity) * parse_amount(unit_price))
+
+def compute_summary(document):
+    """
+    Calcola il riepilogo economico di un documento:
+      - totale:  somma delle righe articolo
+      - acconti: somma degli acconti versati
+      - saldo:   quanto resta da pagare
+    Gli importi sono stringhe con due decimali (il JSON non conosce Decimal).
+    """
+    info = document.get("info_ordine", {})
+    total = sum((line_total(r.get("quantita"), r.get("prezzo_unitario"))
+                 for r in document.get("dettagli_ordine", [])), ZERO)
+    deposits = quantize(parse_amount(info.get("acconto1_importo")) + parse_amount(info.get("acconto2_importo")))
+    return {
+        "totale": format_amount(total),
+        "acconti": format_amount(deposits),
+        "saldo": format_amount(total - deposits),
+    }
+
+def attach_summary(document):
+    """Scrive (o riscrive) il riepilogo nel documento e lo ritorna."""
+    summary = compute_summary(document)
+    document[SUMMARY_KEY] = summary
+    return summary
+
+def ensure_summary(document):
+    """
+    Ritorna il riepilogo del documento. I documenti salvati prima della sua
+    introduzione vengono completati al volo (in memoria) e lo avranno su
+    disco al prossimo salvataggio.
+    """
+    summary = document.get(SUMMARY_KEY)
+    if not isinstance(summary, dict) or not all(k in summary for k in ("totale", "acconti", "saldo")):
+        summary = attach_summary(document)
+    return summary
@@ -1,34 +1,52 @@
+import time
+# Riferimento temporale per il report di avvio (preso prima di ogni import pesante)
+_STARTUP_T0 = time.perf_counter()
+
 import sys
 import os
 import traceback
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
 
 # Importa i nostri percorsi
-from paths import STYLE_PATH, OUTPUT_DIR 
+from paths import STYLE_PATH, OUTPUT_DIR, get_app_dir
+from core.housekeeping import start_background_cleanup
 
-# --- Funzione di pulizia ---
-def clean_output_directory(directory):
-    if not os.path.exists(directory):
-        return
-    
-    for filename in os.listdir(directory):
-        if not (filename.endswith(".ods") or 
-                filename.endswith(".pdf") or 
-                filename.endswith(".bak")): 
-            continue
-            
-        file_path = os.path.join(directory, filename)
-        
-        try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
-                os.unlink(file_path)
-        except Exception as e:
-            print(f"Attenzione: Impossibile eliminare {file_path}. Motivo: {e}")
+# --- Report tempi di avvio ---
+_startup_marks = []
+
+# Oltre questa dimensione startup.log riparte da capo (il precedente resta in startup.log.1)
+STARTUP_LOG_MAX_BYTES = 64 * 1024
+
+def mark_startup(label):
+    """Registra un passaggio dell'avvio con il tempo trascorso dall'inizio."""
+    _startup_marks.append((label, time.perf_counter() - _STARTUP_T0))
+
+def report_startup_time():
+    """
+    Stampa i tempi di avvio e li accoda a 'startup.log' (accanto a config.json),
+    così da poter confrontare le postazioni più lente anche senza console.
+    Il file non supera STARTUP_LOG_MAX_BYTES: resta solo la generazione precedente.
+    """
+    mark_startup("menu visibile")
+    lines = [f"  {label:<22} {elapsed * 1000:8.0f} ms" for label, elapsed in _startup_marks]
+    print("[Avvio] Tempi di avvio:")
+    print("\n".join(lines))
+
+    log_path = os.path.join(get_app_dir(), "startup.log")
+    try:
+        if os.path.exists(log_path) and os.path.getsize(log_path) > STARTUP_LOG_MAX_BYTES:
+            os.replace(log_path, log_path + ".1")
+        with open(log_path, 'a', encoding='utf-8') as f:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            summary = ", ".join(f"{label}={elapsed * 1000:.0f}ms" for label, elapsed in _startup_marks)
+            f.write(f"{stamp} {summary}\n")
+    except Exception as e:
+        print(f"Attenzione: Impossibile scrivere {log_path}. Motivo: {e}")
 
 # --- Funzione main ---
 def main():
-    # Esegui la pulizia all'avvio
-    clean_output_directory(OUTPUT_DIR) 
+    mark_startup("import moduli")
     
     # Crea l'applicazione
     app = QApplication(sys.argv)
@@ -42,12 +60,26 @@ def main():
         print(f"ATTENZIONE: file '{STYLE_PATH}' non trovato. L'app userà lo stile di default.")
     except Exception as e:
         print(f"!!! ERRORE nel caricamento dello stylesheet: {e}")
+    mark_startup("QApplication + stile")
 
     # --- Importa la finestra DOPO aver creato l'app ---
     from main_window import MainWindow
     
     window = MainWindow()
+    mark_startup("finestra costruita")
     window.show()
+
+    # Il timer scatta al primo giro del ciclo eventi, cioè quando il menu è disegnato
+    QTimer.singleShot(0, report_startup_time)
+
+    # Pulizia delle vecchie stampe in background, a finestra già visibile
+    QTimer.singleShot(0, lambda: start_background_cleanup(OUTPUT_DIR))
+
+    # Backup automatico (se attivato nelle impostazioni): import ritardato, fuori dal percorso di avvio
+    def start_backups():
+        from core.backup import start_backup_scheduler
+        start_backup_scheduler()
+    QTimer.singleShot(0, start_backups)
     
     # Avvia l'applicazione
     sys.exit(app.exec())
@@ -1,17 +1,17 @@
-import json
 import os 
 from PySide6.QtWidgets import QMainWindow, QStackedWidget, QMessageBox
 from PySide6.QtGui import QIcon # Importa QIcon
+from PySide6.QtCore import QTimer, Qt
 from pages.menu_page import MenuPage
-from pages.search_page import SearchPage
-from pages.new_order_page import NewOrderPage
-from pages.settings_page import SettingsPage 
 
-# Importa la funzione di stampa
-from core.print_order import generate_and_print_order
 # Importa il percorso dell'icona
 from paths import ICON_PATH 
 
+# NOTA: le pagine Ricerca, Nuovo Ordine, Report, Riepilogo Fornitori e Impostazioni (e con esse la stampa/ezodf)
+# vengono importate e costruite solo alla prima navigazione, per mostrare il menu
+# il prima possibile all'avvio. Lo stesso vale per i moduli core (I/O, archivio,
+# coda di stampa): si importano nei metodi che li usano, a menu già visibile.
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -33,37 +33,99 @@ class MainWindow(QMainWindow):
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
-        # Creazione delle pagine
+        # Pagine create "al bisogno" (vedi proprietà più sotto)
+        self._search_page = None
+        self._new_order_page = None
+        self._settings_page = None
+        self._reports_page = None
+        self._supplier_rollup_page = None
+
+        # Creazione del menu (unica pagina costruita all'avvio)
         self.menu_page = MenuPage(
             on_search=lambda: self.show_page(self.search_page),
             on_new_order=self.prepare_and_show_new_order,
+            on_reports=lambda: self.show_page(self.reports_page),
+            on_supplier_rollup=lambda: self.show_page(self.supplier_rollup_page),
             on_settings=lambda: self.show_page(self.settings_page)
         )
-        
-        self.search_page = SearchPage(
-            on_back=lambda: self.show_page(self.menu_page),
-            on_load_order=self.open_order_for_editing,
-            on_print_order=self.print_existing_order 
-        )
-        
-        self.new_order_page = NewOrderPage(
-            on_back=lambda: self.show_page(self.menu_page)
-        )
-        
-        # --- INIZIALIZZAZIONE NUOVA PAGINA IMPOSTAZIONI ---
-        self.settings_page = SettingsPage(
-            on_back=lambda: self.show_page(self.menu_page)
-        )
-
-        # Aggiunta delle pagine allo stack
         self.stack.addWidget(self.menu_page)
-        self.stack.addWidget(self.search_page)
-        self.stack.addWidget(self.new_order_page)
-        self.stack.addWidget(self.settings_page) 
 
         # Mostra il menu principale all'avvio
         self.show_page(self.menu_page)
 
+        # Barra di stato (cartella dati, stampe): collegata al primo giro del ciclo eventi,
+        # prima di qualsiasi lavoro in background
+        QTimer.singleShot(0, self.connect_status_bar)
+
+        # A finestra visibile, propone il ripristino di un ordine rimasto a metà
+        QTimer.singleShot(0, self.offer_draft_recovery)
+
+        # Modifiche fatte dalle altre postazioni sulla stessa cartella dati
+        QTimer.singleShot(0, self.start_change_feed)
+
+    # ============================================================================
+    # --- COSTRUZIONE PIGRA DELLE PAGINE ---
+    # ============================================================================
+
+    def _add_lazy_page(self, factory):
+        """Costruisce una pagina e la aggiunge allo stack."""
+        page = factory()
+        self.stack.addWidget(page)
+        return page
+
+    @property
+    def search_page(self):
+        if self._search_page is None:
+            from pages.search_page import SearchPage
+            self._search_page = self._add_lazy_page(lambda: SearchPage(
+                on_back=lambda: self.show_page(self.menu_page),
+                on_load_order=self.open_order_for_editing,
+                on_print_order=self.print_existing_order 
+            ))
+        return self._search_page
+
+    @property
+    def new_order_page(self):
+        if self._new_order_page is None:
+            from pages.new_order_page import NewOrderPage
+            self._new_order_page = self._add_lazy_page(lambda: NewOrderPage(
+                on_back=lambda: self.show_page(self.menu_page),
+                on_show_history=self.show_customer_history,
+                on_notify=self.notify
+            ))
+        return self._new_order_page
+
+    @property
+    def settings_page(self):
+        if self._settings_page is None:
+            from pages.settings_page import SettingsPage
+            self._settings_page = self._add_lazy_page(lambda: SettingsPage(
+                on_back=lambda: self.show_page(self.menu_page)
+            ))
+        return self._settings_page
+
+    @property
+    def reports_page(self):
+        if self._reports_page is None:
+            from pages.reports_page import ReportsPage
+            self._reports_page = self._add_lazy_page(lambda: ReportsPage(
+                on_back=lambda: self.show_page(self.menu_page)
+            ))
+        return self._reports_page
+
+    @property
+    def supplier_rollup_page(self):
+        if self._supplier_rollup_page is None:
+            from pages.supplier_rollup_page import SupplierRollupPage
+            self._supplier_rollup_page = self._add_lazy_page(lambda: SupplierRollupPage(
+                on_back=lambda: self.show_page(self.menu_page)
+            ))
+        return self._supplier_rollup_page
+
+    # ============================================================================
+    # --- NAVIGAZIONE ---
+    # ============================================================================
+
     def show_page(self, page):
         """Cambia la pagina visibile."""
         self.stack.setCurrentWidget(page)
@@ -78,28 +140,176 @@ class MainWindow(QMainWindow):
         self.new_order_page.load_order(file_path) 
         self.show_page(self.new_order_page)
 
+    def offer_draft_recovery(self):
+        """
+        Se l'ultima sessione si è interrotta durante un inserimento, propone di ripristinarlo.
+        Poi i salvataggi in background che la chiusura ha lasciato in sospeso: forse
+        riusciti, forse no, quindi si propone di riportarli nel modulo per controllarli.
+        Nel modulo ne entra uno solo: gli altri verranno proposti al prossimo avvio.
+        """
+        from core.drafts import get_draft_journal
+        journal = get_draft_journal()
+        state = journal.load()
+        if state:
+            customer = state.get("dati_cliente.nome_cliente") or "senza nome"
+            if self.ask_draft_recovery(
+                "Ordine Non Salvato",
+                f"È stato trovato un ordine non salvato (Cliente: {customer}).\nVuoi ripristinarlo?"
+            ):
+                self.new_order_page.restore_draft(state)
+                self.show_page(self.new_order_page)
+                return
+            journal.discard()
+
+        for held_path, held_state in journal.held():
+            customer = held_state.get("dati_cliente.nome_cliente") or "senza nome"
+            restore = self.ask_draft_recovery(
+                "Salvataggio Interrotto",
+                f"Il programma si è chiuso mentre salvava il documento di {customer}: potrebbe non essere stato salvato.\n"
+                "Vuoi riportarlo nel modulo? Controlla nella Ricerca prima di salvarlo di nuovo, per non crearne un doppione."
+            )
+            journal.release_held(held_path)
+            if restore:
+                self.new_order_page.restore_draft(held_state)
+                self.show_page(self.new_order_page)
+                return
+
+    def ask_draft_recovery(self, title, text):
+        msg = QMessageBox(self)
+        msg.setWindowTitle(title)
+        msg.setText(text)
+        msg.setIcon(QMessageBox.Question)
+
+        btn_si = msg.addButton("Sì, Ripristina", QMessageBox.YesRole)
+        msg.addButton("No, Elimina", QMessageBox.NoRole)
+
+        msg.exec()
+        return msg.clickedButton() == btn_si
+
+    def show_customer_history(self, customer_name):
+        """Mostra la pagina di ricerca filtrata sui documenti di un cliente."""
+        self.search_page.show_customer(customer_name)
+        self.show_page(self.search_page)
+
     def print_existing_order(self, file_path):
         """
-        Carica i dati JSON da un file e chiama la funzione di stampa.
+        Carica i dati JSON da un file (o dall'archivio annuale, in background) e li accoda alla stampa.
         """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                order_data = json.load(f)
-            
-            base_filename = os.path.basename(file_path)
-            
-            # Chiama la funzione di stampa importata
-            generate_and_print_order(order_data, base_filename)
-            
-        except (json.JSONDecodeError, IOError) as e:
+        from core.cold_archive import document_name
+        from core.document_cache import load_document
+        from core.data_io import get_data_io, describe_error
+        from core.print_queue import get_print_queue
+
+        def loaded(order_data):
+            name = document_name(file_path)
+            get_print_queue().submit(order_data, name)
+            self.notify(f"🖨️ {name}: stampa in preparazione...")
+
+        def failed(error):
             QMessageBox.critical(
                 self, 
                 "Errore di Caricamento", 
-                f"Impossibile leggere il file dell'ordine per la stampa:\n{e}"
+                f"Impossibile leggere il file dell'ordine per la stampa:\n{describe_error(error)}"
+            )
+
+        get_data_io().submit(load_document, file_path, on_done=loaded, on_error=failed)
+
+    # ============================================================================
+    # --- AVVISI E STAMPE IN BACKGROUND ---
+    # ============================================================================
+
+    def notify(self, text):
+        """Avviso che non interrompe il lavoro: compare nella barra di stato e sparisce da solo."""
+        self.statusBar().setStyleSheet("")
+        self.statusBar().showMessage(text, 8000)
+
+    def on_print_rendered(self, name, warnings):
+        self.notify(f"🖨️ {name}: PDF pronto, invio alla stampante...")
+        if warnings:
+            self.show_print_problem("Attenzione", f"{name}:\n" + "\n".join(warnings), QMessageBox.Warning)
+
+    def on_print_sent(self, name, action):
+        if action == "stampato":
+            self.notify(f"✅ {name} inviato alla stampante")
+        else:
+            self.notify(f"✅ {name} aperto in anteprima (stampa diretta non disponibile)")
+
+    def on_print_failed(self, name, error):
+        self.statusBar().showMessage(f"❌ Stampa di {name} non riuscita", 8000)
+        self.show_print_problem("Errore di Stampa", f"Impossibile stampare {name}:\n{error}", QMessageBox.Critical)
+
+    def show_print_problem(self, title, text, icon):
+        """Messaggio non modale: l'operatore lo legge quando vuole, senza fermare l'inserimento in corso."""
+        box = QMessageBox(icon, title, text, QMessageBox.Ok, self)
+        box.setModal(False)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.show()
+
+    # ============================================================================
+    # --- STATO DELLA CARTELLA DATI ---
+    # ============================================================================
+
+    def connect_status_bar(self):
+        """Barra di stato: raggiungibilità della cartella dati e avanzamento delle stampe."""
+        from core.data_io import get_data_io
+        from core.print_queue import get_print_queue
+        get_data_io().status_changed.connect(self.on_data_status_changed)
+        print_queue = get_print_queue()
+        print_queue.rendered.connect(self.on_print_rendered)
+        print_queue.printed.connect(self.on_print_sent)
+        print_queue.failed.connect(self.on_print_failed)
+
+    def on_data_status_changed(self, online, message):
+        """Mostra nella barra di stato se la cartella dati (es. su NAS) è raggiungibile."""
+        self.statusBar().setStyleSheet("" if online else "color: #842029; font-weight: bold;")
+        # Il messaggio di "nuovo collegamento" sparisce da solo, quello di errore resta
+        self.statusBar().showMessage(message, 8000 if online else 0)
+
+    def start_change_feed(self):
+        """
+        La cartella dati (spesso in rete) si prepara in background: creazione se manca
+        e indice dalla cache locale. Il registro modifiche parte comunque, anche se la
+        cartella non risponde: le sue letture passano dall'interruttore di rete.
+        """
+        from core.settings import get_settings
+        from core.data_io import get_data_io
+        from core.order_index import build_order_index, install_order_index
+
+        def prepare():
+            get_settings().ensure_data_dir()
+            return build_order_index()
+
+        def ready(index):
+            install_order_index(index)
+            follow()
+
+        def follow(_error=None):
+            from core.change_feed import get_change_feed
+            get_change_feed().remote_changes.connect(self.on_remote_changes)
+
+        get_data_io().submit(prepare, on_done=ready, on_error=follow)
+
+    def on_remote_changes(self, records):
+        """Indice e liste sono già aggiornati: qui si avvisa l'utente (barra di stato e documento aperto)."""
+        last = records[-1]
+        station = last.get("nome") or "un'altra postazione"
+        text = f"🔄 {os.path.basename(last['file'])} {last['azione']} da {station}"
+        if len(records) > 1:
+            text += f" (e altre {len(records) - 1} modifiche)"
+        self.statusBar().showMessage(text, 8000)
+
+        # Il documento aperto in modifica è stato cambiato altrove: meglio saperlo prima di salvare
+        page = self._new_order_page
+        if page is None or self.stack.currentWidget() is not page or not page.current_file_path:
+            return
+        touched = [r for r in records if os.path.normcase(r["file"]) == os.path.normcase(page.current_file_path)]
+        if touched and page.read_only and touched[-1]["azione"] == "salvato":
+            # Documento in sola lettura: si mostra la versione appena salvata da chi lo modifica
+            page.load_order(page.current_file_path)
+        elif touched:
+            r = touched[-1]
+            QMessageBox.warning(
+                self, "Documento Modificato Altrove",
+                f"Il documento aperto è stato {r['azione']} dalla postazione {r.get('nome') or '?'} alle {r.get('ora', '')[11:16]}.\n"
+                "Salvando ora, le sue modifiche verranno sovrascritte."
             )
-        except Exception as e:
-            QMessageBox.critical(
-                self, 
-                "Errore di Stampa", 
-                f"Si è verificato un errore imprevisto durante la stampa:\n{e}"
-            )
\ No newline at end of file
@@ -0,0 +1,174 @@
+from datetime import datetime
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QLineEdit,
+    QListWidget, QListWidgetItem, QPushButton, QMessageBox, QProgressBar
+)
+from PySide6.QtCore import Qt
+
+from core.backup import get_backup_engine
+from core.order_index import get_order_index
+from core.data_io import get_data_io, refresh_index_async, describe_error, SCAN_TIMEOUT
+
+class RestoreDialog(QDialog):
+    """
+    Finestra di ripristino dai backup.
+    Si sceglie un'istantanea (data/ora) e si ripristina un singolo
+    documento oppure l'intera cartella com'era in quel momento.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.engine = get_backup_engine()
+        self.setWindowTitle("Ripristina da Backup")
+        self.resize(600, 450)
+
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Backup del:"))
+        self.snapshot_combo = QComboBox()
+        # Dal più recente al più vecchio
+        for snapshot_id in reversed(self.engine.snapshots()):
+            when = datetime.strptime(snapshot_id[:15], "%Y%m%d-%H%M%S")
+            self.snapshot_combo.addItem(when.strftime("%d/%m/%Y %H:%M:%S"), snapshot_id)
+        self.snapshot_combo.currentIndexChanged.connect(self.load_files)
+        layout.addWidget(self.snapshot_combo)
+
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filtra per nome file...")
+        self.filter_input.textChanged.connect(self.filter_files)
+        layout.addWidget(self.filter_input)
+
+        self.file_list = QListWidget()
+        layout.addWidget(self.file_list)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        # --- BOTTONI ---
+        button_layout = QHBoxLayout()
+        btn_close = QPushButton("Chiudi")
+        btn_close.clicked.connect(self.reject)
+        self.btn_restore_doc = QPushButton("📄 Ripristina Documento")
+        self.btn_restore_doc.clicked.connect(self.restore_document)
+        self.btn_restore_all = QPushButton("⏪ Ripristina Tutto a Questa Data")
+        self.btn_restore_all.setStyleSheet("background-color: #f8d7da; border: 1px solid #f5c2c7; color: #842029; font-weight: bold;")
+        self.btn_restore_all.clicked.connect(self.restore_snapshot)
+        button_layout.addWidget(btn_close)
+        button_layout.addStretch()
+        button_layout.addWidget(self.btn_restore_doc)
+        button_layout.addWidget(self.btn_restore_all)
+        layout.addLayout(button_layout)
+
+        self.load_files()
+
+    def current_snapshot(self):
+        return self.snapshot_combo.currentData()
+
+    def load_files(self):
+        """Elenca i documenti contenuti nell'istantanea selezionata."""
+        self.file_list.clear()
+        snapshot_id = self.current_snapshot()
+        if not snapshot_id:
+            return
+        for rel_path in sorted(self.engine.load_snapshot(snapshot_id)["file"]):
+            folder, _, name = rel_path.rpartition("/")
+            icon = "🗄️ " if folder.startswith("archivio/") else ("📂 " if folder == "orders" else "📝 ")
+            label = icon + name
+            item = QListWidgetItem(label)
+            item.setData(Qt.UserRole, rel_path)
+            self.file_list.addItem(item)
+        self.filter_files()
+
+    def filter_files(self):
+        text = self.filter_input.text().lower()
+        for i in range(self.file_list.count()):
+            item = self.file_list.item(i)
+            item.setHidden(text not in item.text().lower())
+
+    def restore_document(self):
+        item = self.file_list.currentItem()
+        if not item:
+            QMessageBox.warning(self, "Nessuna Selezione", "Seleziona un documento da ripristinare.")
+            return
+        rel_path = item.data(Qt.UserRole)
+        reply = QMessageBox.question(
+            self, "Conferma Ripristino",
+            f"Ripristinare '{rel_path}' com'era il {self.snapshot_combo.currentText()}?\n"
+            "La versione attuale verrà sostituita.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        engine, snapshot_id, index = self.engine, self.current_snapshot(), get_order_index()
+
+        def restore():
+            path = engine.restore_document(snapshot_id, rel_path)
+            return path, index.read_entry(path)
+
+        def restored(result):
+            self.set_busy(False)
+            path, summary = result
+            if summary is not None:
+                index.apply({path: summary}, {})
+            QMessageBox.information(self, "Ripristino Completato", "Documento ripristinato correttamente.")
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.critical(self, "Errore", f"Impossibile ripristinare il documento:\n{describe_error(error)}")
+
+        self.set_busy(True)
+        get_data_io().submit(restore, on_done=restored, on_error=failed)
+
+    def restore_snapshot(self):
+        if not self.current_snapshot():
+            return
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Conferma Ripristino Completo")
+        msg.setText(
+            f"Riportare tutti gli ordini e preventivi com'erano il {self.snapshot_combo.currentText()}?\n\n"
+            "I documenti creati dopo quella data verranno rimossi.\n"
+            "Lo stato attuale viene salvato prima in un nuovo backup, quindi sarà possibile tornare indietro."
+        )
+        msg.setIcon(QMessageBox.Warning)
+        btn_si = msg.addButton("Sì, Ripristina", QMessageBox.DestructiveRole)
+        msg.addButton("Annulla", QMessageBox.RejectRole)
+        msg.exec()
+        if msg.clickedButton() != btn_si:
+            return
+
+        def finished(result):
+            self.set_busy(False)
+            restored, removed, errors = result
+            # Rilettura dell'indice in background: liste e report si aggiornano da soli
+            refresh_index_async()
+            text = f"Documenti ripristinati: {restored}\nDocumenti rimossi: {removed}"
+            if errors:
+                details = "\n".join(f"• {rel_path}: {error}" for rel_path, error in errors[:10])
+                if len(errors) > 10:
+                    details += f"\n… e altri {len(errors) - 10}"
+                QMessageBox.warning(self, "Ripristino Incompleto", f"{text}\nNon riusciti:\n{details}")
+            else:
+                QMessageBox.information(self, "Ripristino Completato", text)
+            self.accept()
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.critical(self, "Errore", f"Impossibile completare il ripristino:\n{describe_error(error)}")
+
+        self.set_busy(True)
+        # Backup preliminare e confronto di tutti i file: margine da scansione tra un avanzamento e l'altro
+        get_data_io().submit(self.engine.restore_snapshot, self.current_snapshot(),
+                             on_done=finished, on_error=failed, on_progress=self.show_progress,
+                             timeout=SCAN_TIMEOUT)
+
+    def set_busy(self, busy):
+        """Durante un ripristino: barra di avanzamento visibile e bottoni bloccati."""
+        for widget in (self.btn_restore_doc, self.btn_restore_all, self.snapshot_combo):
+            widget.setEnabled(not busy)
+        self.progress_bar.setRange(0, 0) # Indeterminata finché non arriva il primo avanzamento
+        self.progress_bar.setVisible(busy)
+
+    def show_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
@@ -0,0 +1,127 @@
+from PySide6.QtWidgets import (
+    QDialog, QFormLayout, QComboBox, QCheckBox, QDialogButtonBox,
+    QFileDialog, QMessageBox, QProgressBar
+)
+from PySide6.QtCore import QDate
+
+from core.export import export_archive, DATE_FIELDS
+from core.data_io import get_data_io, describe_error, SCAN_TIMEOUT
+from pages.new_order_page import NoWheelDateEdit
+
+class ExportDialog(QDialog):
+    """
+    Finestra di esportazione dell'archivio in CSV/ODS (per il commercialista).
+    Permette di scegliere quali documenti, il periodo e il dettaglio delle righe.
+    """
+    DOC_CHOICES = [
+        ("Ordini e Preventivi", ("ordine", "preventivo")),
+        ("Solo Ordini", ("ordine",)),
+        ("Solo Preventivi", ("preventivo",)),
+    ]
+    MODE_CHOICES = [
+        ("Una riga per documento", "documento"),
+        ("Una riga per articolo", "articolo"),
+    ]
+    DATE_LABELS = {"data_ordine": "Data Ordine", "data_cerimonia": "Data Cerimonia", "data_consegna": "Data Consegna"}
+
+    def __init__(self, data_dir, parent=None):
+        super().__init__(parent)
+        self.data_dir = data_dir
+        self.busy = False
+        self.setWindowTitle("Esporta Archivio")
+
+        layout = QFormLayout(self)
+
+        self.doc_combo = QComboBox()
+        for label, _ in self.DOC_CHOICES:
+            self.doc_combo.addItem(label)
+        layout.addRow("Documenti:", self.doc_combo)
+
+        self.mode_combo = QComboBox()
+        for label, _ in self.MODE_CHOICES:
+            self.mode_combo.addItem(label)
+        layout.addRow("Righe:", self.mode_combo)
+
+        # --- PERIODO (facoltativo) ---
+        self.period_check = QCheckBox("Filtra per periodo")
+        self.period_check.setChecked(True)
+        layout.addRow(self.period_check)
+
+        self.date_field_combo = QComboBox()
+        for field in DATE_FIELDS:
+            self.date_field_combo.addItem(self.DATE_LABELS[field], field)
+        layout.addRow("In base a:", self.date_field_combo)
+
+        today = QDate.currentDate()
+        self.date_from = NoWheelDateEdit()
+        self.date_from.setDate(QDate(today.year(), 1, 1))
+        self.date_to = NoWheelDateEdit()
+        self.date_to.setDate(today)
+        layout.addRow("Dal:", self.date_from)
+        layout.addRow("Al:", self.date_to)
+
+        for widget in (self.date_field_combo, self.date_from, self.date_to):
+            self.period_check.toggled.connect(widget.setEnabled)
+
+        # Avanzamento dell'esportazione (documenti letti: il totale non è noto in anticipo)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addRow(self.progress_bar)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.button(QDialogButtonBox.Ok).setText("Esporta...")
+        self.buttons.button(QDialogButtonBox.Cancel).setText("Annulla")
+        self.buttons.accepted.connect(self.run_export)
+        self.buttons.rejected.connect(self.reject)
+        layout.addRow(self.buttons)
+
+    def run_export(self):
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Esporta Archivio", "Esportazione_Archivio.csv", "File CSV (*.csv);;Foglio ODS (*.ods)"
+        )
+        if not file_path:
+            return
+        # Se l'utente non ha scritto l'estensione, vale il filtro scelto
+        if not file_path.lower().endswith((".csv", ".ods")):
+            file_path += ".ods" if "ods" in selected_filter else ".csv"
+
+        date_from = date_to = ""
+        if self.period_check.isChecked():
+            date_from = self.date_from.date().toString("yyyy-MM-dd")
+            date_to = self.date_to.date().toString("yyyy-MM-dd")
+
+        def finished(count):
+            self.set_busy(False)
+            QMessageBox.information(self, "Esportazione Completata", f"Esportate {count} righe in:\n{file_path}")
+            self.accept()
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.critical(self, "Errore", f"Impossibile esportare l'archivio:\n{describe_error(error)}")
+
+        self.set_busy(True)
+        # Lettura di tutto l'archivio: margine da scansione tra un avanzamento e l'altro
+        get_data_io().submit(
+            export_archive, self.data_dir, file_path,
+            self.MODE_CHOICES[self.mode_combo.currentIndex()][1],
+            self.DOC_CHOICES[self.doc_combo.currentIndex()][1],
+            self.date_field_combo.currentData(), date_from, date_to,
+            on_done=finished, on_error=failed, on_progress=self.show_progress, timeout=SCAN_TIMEOUT
+        )
+
+    def set_busy(self, busy):
+        """Durante l'esportazione: barra di avanzamento visibile e comandi bloccati."""
+        self.busy = busy
+        for widget in (self.buttons, self.doc_combo, self.mode_combo, self.period_check):
+            widget.setEnabled(not busy)
+        self.progress_bar.setRange(0, 0) # Indeterminata: il totale non è noto
+        self.progress_bar.setVisible(busy)
+
+    def show_progress(self, done, total):
+        self.progress_bar.setFormat(f"{done} documenti letti")
+        self.progress_bar.setTextVisible(True)
+
+    def reject(self):
+        # La finestra resta aperta finché l'esportazione non finisce (il file è a metà)
+        if not self.busy:
+            super().reject()
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, QListWidgetItem, QPushButton
+)
+from PySide6.QtCore import Qt
+
+from core.history import describe_changes
+
+class RevisionHistoryDialog(QDialog):
+    """
+    Revisioni di un documento (vedi core/history.py): a sinistra l'elenco dei
+    salvataggi, a destra cosa è cambiato rispetto al precedente.
+    "Ripristina" riporta nel modulo la versione scelta: diventa definitiva
+    solo salvando (e il salvataggio sarà a sua volta una nuova revisione).
+    """
+    def __init__(self, revisions, can_restore=True, parent=None):
+        super().__init__(parent)
+        self.revisions = revisions # [(riga del registro, stato completo)]
+        self.chosen_state = None
+        self.setWindowTitle("Storico Revisioni")
+        self.resize(800, 450)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Salvataggi del documento, dal più recente. Seleziona una revisione per vedere cosa è cambiato."))
+
+        lists_layout = QHBoxLayout()
+        self.revision_list = QListWidget()
+        self.revision_list.setMaximumWidth(300)
+        # Dal più recente al più vecchio
+        for position in reversed(range(len(revisions))):
+            record = revisions[position][0]
+            try:
+                when = datetime.fromisoformat(record.get("ora", "")).strftime("%d/%m/%Y %H:%M")
+            except ValueError:
+                when = "?"
+            label = f"Rev. {record.get('revisione', '?')} ({record.get('tipo', '')}) — {when} — {record.get('postazione', '')}"
+            item = QListWidgetItem(label)
+            item.setData(Qt.UserRole, position)
+            self.revision_list.addItem(item)
+        self.revision_list.currentItemChanged.connect(self.show_changes)
+        lists_layout.addWidget(self.revision_list)
+
+        self.changes_list = QListWidget()
+        lists_layout.addWidget(self.changes_list)
+        layout.addLayout(lists_layout)
+
+        # --- BOTTONI ---
+        button_layout = QHBoxLayout()
+        btn_close = QPushButton("Chiudi")
+        btn_close.clicked.connect(self.reject)
+        self.btn_restore = QPushButton("↩️ Ripristina Questa Versione")
+        self.btn_restore.clicked.connect(self.restore)
+        self.btn_restore.setEnabled(can_restore)
+        button_layout.addWidget(btn_close)
+        button_layout.addStretch()
+        button_layout.addWidget(self.btn_restore)
+        layout.addLayout(button_layout)
+
+        if self.revision_list.count():
+            self.revision_list.setCurrentRow(0)
+
+    def show_changes(self, item, _previous=None):
+        self.changes_list.clear()
+        if item is None:
+            return
+        position = item.data(Qt.UserRole)
+        if position == 0:
+            self.changes_list.addItem("Prima versione registrata.")
+            return
+        changes = describe_changes(self.revisions[position - 1][1], self.revisions[position][1])
+        self.changes_list.addItems(changes or ["Nessuna modifica ai dati seguiti dallo storico."])
+
+    def restore(self):
+        item = self.revision_list.currentItem()
+        if item is None:
+            return
+        self.chosen_state = self.revisions[item.data(Qt.UserRole)][1]
+        self.accept()
@@ -3,9 +3,10 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton
 class MenuPage(QWidget):
     """
     Pagina del menu principale.
-    Fornisce l'accesso alla ricerca ordini, alla creazione di nuovi documenti e alle impostazioni.
+    Fornisce l'accesso alla ricerca ordini, alla creazione di nuovi documenti, ai report,
+    al riepilogo fornitori e alle impostazioni.
     """
-    def __init__(self, on_search, on_new_order, on_settings):
+    def __init__(self, on_search, on_new_order, on_reports, on_supplier_rollup, on_settings):
         super().__init__()
         layout = QVBoxLayout()
 
@@ -15,14 +16,20 @@ class MenuPage(QWidget):
 
         btn_search = QPushButton("🔍 Cerca File")
         btn_new_order = QPushButton("📝 Nuovo Ordine/Preventivo")
+        btn_reports = QPushButton("📊 Report Vendite")
+        btn_rollup = QPushButton("📦 Riepilogo Fornitori")
         btn_settings = QPushButton("⚙️ Impostazioni")
 
         btn_search.clicked.connect(on_search)
         btn_new_order.clicked.connect(on_new_order)
+        btn_reports.clicked.connect(on_reports)
+        btn_rollup.clicked.connect(on_supplier_rollup)
         btn_settings.clicked.connect(on_settings)
 
         layout.addWidget(btn_search)
         layout.addWidget(btn_new_order)
+        layout.addWidget(btn_reports)
+        layout.addWidget(btn_rollup)
         layout.addWidget(btn_settings)
         layout.addStretch()
 
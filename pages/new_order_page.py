@@ -1,19 +1,42 @@
-import json
 import re 
 import os 
 from datetime import datetime
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton,
     QScrollArea, QLineEdit, QFormLayout, QComboBox,
-    QDateEdit, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
-    QAbstractSpinBox, QHBoxLayout, QMessageBox, QStyleOptionSpinBox, QStyle
+    QDateEdit, QTableView, QHeaderView, QAbstractItemView,
+    QAbstractSpinBox, QHBoxLayout, QMessageBox, QStyleOptionSpinBox, QStyle,
+    QStyledItemDelegate, QCompleter
 )
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QMouseEvent, QCursor
-from PySide6.QtCore import QDate, Qt, QEvent
+from PySide6.QtCore import QDate, Qt, QEvent, QTimer, Signal, QModelIndex, QPersistentModelIndex
 
-# Importa la logica di stampa e i percorsi definiti nel progetto
-from core.print_order import generate_and_print_order
-from paths import ORDERS_DIR, QUOTES_DIR
+# Ditte fornitrici proposte nella colonna "Ditta" della tabella articoli
+SUPPLIERS = ["","BAGUTTA","BIPAPER","CLARALUNA","CUOREMATTO","DIMAR","DOLCICOSE","HERVIT","EMMEBI","ETM","FAMA","FANTIN","FOGAL","FRANCESCO","LAGUNA","MAS","NEGO","PABEN","QUADRIFOGLIO","TABOR"]
+
+# Colonne della tabella articoli
+COL_DITTA, COL_CODICE, COL_DESCRIZIONE, COL_QUANTITA, COL_PREZZO, COL_TOTALE = range(6)
+
+# Importa le impostazioni (cartelle dati aggiornate a caldo), l'indice e il catalogo
+# (la logica di stampa viene importata solo quando serve, vedi save_process)
+from core.settings import get_settings
+from core.order_index import get_order_index
+from core.catalog import get_catalog
+from core.customers import get_customer_directory
+from core.drafts import get_draft_journal
+from core.documents import write_document
+from core.change_feed import record_changes
+from core.leases import LeaseKeeper, acquire, ensure_free, release
+from core.cold_archive import is_packed, split_packed
+from core.document_cache import load_document
+from core.history import record_revision, discard_history, revisions
+from core.schema import migrate, LINE_FIELDS
+from core.data_io import get_data_io, describe_error
+from core.print_queue import get_print_queue
+from core.totals import line_total, compute_summary, format_amount
+
+# Pausa di inattività (ms) dopo la quale la bozza viene registrata
+DRAFT_IDLE_MS = 1500
 
 # ============================================================================
 # --- SEZIONE 1: WIDGET PERSONALIZZATI ---
@@ -134,21 +157,173 @@ class CheckableComboBox(QComboBox):
         else:
             self.lineEdit().setText(text_string)
 
+class SupplierDelegate(QStyledItemDelegate):
+    """
+    Editor della colonna "Ditta".
+    Un'unica istanza per tutta la tabella: la combo viene creata solo mentre
+    si modifica una cella, non più una per riga.
+    'get_suppliers' è una funzione che ritorna l'elenco aggiornato delle ditte.
+    """
+    def __init__(self, get_suppliers, parent=None):
+        super().__init__(parent)
+        self.get_suppliers = get_suppliers
+
+    def createEditor(self, parent, option, index):
+        cb = NoWheelComboBox(parent)
+        cb.addItems(self.get_suppliers())
+        # Scelta una ditta, la scrive subito nel modello e chiude l'editor
+        cb.activated.connect(lambda _: self._commit_and_close(cb))
+        # Apre subito la tendina, come faceva la vecchia combo fissa
+        QTimer.singleShot(0, cb.showPopup)
+        return cb
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.EditRole) or "")
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
+
+    def _commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor, QStyledItemDelegate.NoHint)
+
+class CatalogDelegate(QStyledItemDelegate):
+    """
+    Editor delle colonne "Codice" e "Descrizione" con suggerimenti dal catalogo.
+    Mentre si scrive propone gli articoli che iniziano con il testo digitato;
+    scegliendone uno emette product_chosen(riga, articolo) per completare la riga.
+    """
+    product_chosen = Signal(int, object)
+
+    VALUE_ROLE = Qt.UserRole + 1 # Testo inserito nella cella alla scelta
+    ENTRY_ROLE = Qt.UserRole + 2 # CatalogEntry completo
+
+    def __init__(self, field, parent=None):
+        super().__init__(parent)
+        self.field = field # "codice" o "descrizione"
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        suggestions = QStandardItemModel(editor)
+        completer = QCompleter(suggestions, editor)
+        # Il filtro lo fa già il catalogo: il completer mostra i risultati così come sono
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.setCompletionRole(self.VALUE_ROLE)
+        editor.setCompleter(completer)
+
+        row = QPersistentModelIndex(index)
+        editor.textEdited.connect(lambda text: self._update_suggestions(completer, suggestions, text))
+        completer.activated[QModelIndex].connect(
+            lambda idx: self.product_chosen.emit(row.row(), idx.data(self.ENTRY_ROLE))
+        )
+        return editor
+
+    def _update_suggestions(self, completer, suggestions, text):
+        catalog = get_catalog()
+        if self.field == "codice":
+            entries = catalog.complete_code(text)
+        else:
+            entries = catalog.complete_description(text)
+
+        suggestions.clear()
+        for entry in entries:
+            item = QStandardItem(entry.label())
+            item.setData(getattr(entry, self.field), self.VALUE_ROLE)
+            item.setData(entry, self.ENTRY_ROLE)
+            suggestions.appendRow(item)
+        if entries:
+            completer.complete()
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.EditRole) or "")
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.EditRole)
+
+class CustomerCompleter(QCompleter):
+    """
+    Suggerimenti dalla rubrica clienti per i campi Nome e Telefono.
+    Scegliendo un cliente emette customer_chosen(cliente).
+    """
+    customer_chosen = Signal(object)
+
+    VALUE_ROLE = Qt.UserRole + 1
+    CUSTOMER_ROLE = Qt.UserRole + 2
+
+    def __init__(self, line_edit, field):
+        self.suggestions = QStandardItemModel(line_edit)
+        super().__init__(self.suggestions, line_edit)
+        self.field = field # "nome" o "telefono"
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCompletionRole(self.VALUE_ROLE)
+        line_edit.setCompleter(self)
+        line_edit.textEdited.connect(self.update_suggestions)
+        self.activated[QModelIndex].connect(lambda idx: self.customer_chosen.emit(idx.data(self.CUSTOMER_ROLE)))
+
+    def update_suggestions(self, text):
+        customers = get_customer_directory().search(text) if text.strip() else []
+        self.suggestions.clear()
+        for customer in customers:
+            item = QStandardItem(customer.label())
+            item.setData(getattr(customer, self.field), self.VALUE_ROLE)
+            item.setData(customer, self.CUSTOMER_ROLE)
+            self.suggestions.appendRow(item)
+        if customers:
+            self.complete()
+
 # ============================================================================
 # --- SEZIONE 2: PAGINA PRINCIPALE ---
 # ============================================================================
 
 class NewOrderPage(QWidget):
     
-    def __init__(self, on_back):
+    def __init__(self, on_back, on_show_history=None, on_notify=None):
         super().__init__()
         self.current_file_path = None
+        # Callback della MainWindow per aprire lo storico documenti di un cliente
+        self.on_show_history = on_show_history
+        # Callback della MainWindow per gli avvisi non modali (barra di stato)
+        self.on_notify = on_notify
+        self.current_mode = "NEW"
+        self.settings = get_settings()
+        self.io = get_data_io()
+        self.saving = False
+        self.read_only = False
+        self.settings.data_dir_changed.connect(self.on_data_dir_changed)
+
+        # Documento aperto in modifica: le altre postazioni lo vedono in sola lettura
+        self.lease = LeaseKeeper(self.io, self)
+        self.lease.released.connect(self.on_lease_released)
+        self.lease.lost.connect(self.on_lease_lost)
+
+        # Bozza: registrata dopo una breve pausa nella digitazione
+        self.draft = get_draft_journal()
+        self.draft_timer = QTimer(self)
+        self.draft_timer.setSingleShot(True)
+        self.draft_timer.setInterval(DRAFT_IDLE_MS)
+        self.draft_timer.timeout.connect(self.record_draft)
+
         self.setup_ui(on_back)
+        self.connect_draft_signals()
         self.prepare_new_order()
 
     def setup_ui(self, on_back):
         """Costruisce l'interfaccia grafica usando un Layout a scorrimento."""
         main_layout = QVBoxLayout()
+
+        # Avviso "in modifica da..." (visibile solo per i documenti aperti in sola lettura)
+        self.lock_banner = QWidget()
+        self.lock_banner.setStyleSheet("background-color: #fff3cd; border: 1px solid #ffe69c; color: #664d03;")
+        banner_layout = QHBoxLayout(self.lock_banner)
+        self.lock_label = QLabel()
+        self.btn_take_over = QPushButton("🔓 Apri in Modifica")
+        self.btn_take_over.clicked.connect(lambda: self.load_order(self.current_file_path))
+        banner_layout.addWidget(self.lock_label)
+        banner_layout.addStretch()
+        banner_layout.addWidget(self.btn_take_over)
+        self.lock_banner.setVisible(False)
+        main_layout.addWidget(self.lock_banner)
+
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
         
@@ -207,6 +382,7 @@ class NewOrderPage(QWidget):
         self.acc1_tipo.addItems(["", "Contanti", "Bancomat", "Bonifico"])
         self.label_acc1_val = QLabel("Importo Acconto 1:")
         self.acc1_val = QLineEdit()
+        self.acc1_val.textChanged.connect(self.update_summary_label)
         form_layout.addRow(self.label_acc1, self.acc1_tipo)
         form_layout.addRow(self.label_acc1_val, self.acc1_val)
 
@@ -215,6 +391,7 @@ class NewOrderPage(QWidget):
         self.acc2_tipo.addItems(["", "Contanti", "Bancomat", "Bonifico"])
         self.label_acc2_val = QLabel("Importo Acconto 2:")
         self.acc2_val = QLineEdit()
+        self.acc2_val.textChanged.connect(self.update_summary_label)
         form_layout.addRow(self.label_acc2, self.acc2_tipo)
         form_layout.addRow(self.label_acc2_val, self.acc2_val)
 
@@ -225,10 +402,25 @@ class NewOrderPage(QWidget):
 
         # --- B. TABELLA ARTICOLI ---
         layout.addWidget(QLabel("<b>Dettagli Ordine</b>"))
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["Ditta", "Codice", "Descrizione", "Quantità", "Prezzo Unitario", "Totale"])
-        self.table.itemChanged.connect(self.update_totals) # Callback calcoli
+        # Modello dati + vista: le righe sono semplici QStandardItem (niente widget per riga)
+        self.table_model = QStandardItemModel(0, 6, self)
+        self.table_model.setHorizontalHeaderLabels(["Ditta", "Codice", "Descrizione", "Quantità", "Prezzo Unitario", "Totale"])
+        self.table_model.itemChanged.connect(self.update_totals) # Callback calcoli
+        self.table_model.rowsRemoved.connect(self.update_summary_label)
+
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectItems)
+        self.table.setEditTriggers(QAbstractItemView.AllEditTriggers)
+        self.supplier_delegate = SupplierDelegate(self.supplier_choices, self.table)
+        self.table.setItemDelegateForColumn(COL_DITTA, self.supplier_delegate)
+        # Suggerimenti dal catalogo prodotti su Codice e Descrizione
+        self.code_delegate = CatalogDelegate("codice", self.table)
+        self.description_delegate = CatalogDelegate("descrizione", self.table)
+        self.code_delegate.product_chosen.connect(self.fill_row_from_catalog)
+        self.description_delegate.product_chosen.connect(self.fill_row_from_catalog)
+        self.table.setItemDelegateForColumn(COL_CODICE, self.code_delegate)
+        self.table.setItemDelegateForColumn(COL_DESCRIZIONE, self.description_delegate)
         
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Interactive)
@@ -251,21 +443,48 @@ class NewOrderPage(QWidget):
         tbl_btns.addWidget(btn_add)
         tbl_btns.addWidget(btn_del)
         tbl_btns.addStretch()
+        # Riepilogo economico (stesso calcolo salvato nel documento e usato in stampa)
+        self.summary_label = QLabel()
+        tbl_btns.addWidget(self.summary_label)
         layout.addLayout(tbl_btns)
         
         # --- C. DATI CLIENTE ---
         form_cli = QFormLayout()
         form_cli.addRow(QLabel("<h2>Dati Cliente</h2>"))
         self.customer_name = QLineEdit()
-        form_cli.addRow("Nome Cliente:", self.customer_name)
+        btn_history = QPushButton("📂 Storico Cliente")
+        btn_history.clicked.connect(self.show_customer_history)
+        name_layout = QHBoxLayout()
+        name_layout.addWidget(self.customer_name)
+        name_layout.addWidget(btn_history)
+        form_cli.addRow("Nome Cliente:", name_layout)
         self.customer_number = QLineEdit()
         form_cli.addRow("Telefono Cliente:", self.customer_number)
         layout.addLayout(form_cli)
 
+        # Suggerimenti dalla rubrica clienti (per nome o per telefono)
+        self.name_completer = CustomerCompleter(self.customer_name, "nome")
+        self.number_completer = CustomerCompleter(self.customer_number, "telefono")
+        self.name_completer.customer_chosen.connect(self.fill_customer)
+        self.number_completer.customer_chosen.connect(self.fill_customer)
+
+        # Campi da bloccare quando il documento è in sola lettura
+        self.editable_widgets = [
+            self.operator_combo, self.date_picker, self.delivery_date_picker, self.ceremony_combo,
+            self.ribbon_color, self.confetti_combo, self.confetti_color_combo, self.packaging,
+            self.payment_type, self.acc1_tipo, self.acc1_val, self.acc2_tipo, self.acc2_val,
+            self.extra, btn_add, btn_del, self.customer_name, self.customer_number
+        ]
+
         # --- D. BOTTONI AZIONE ---
         btm_btns = QHBoxLayout()
         btn_menu = QPushButton("⬅️ Menu")
         btn_menu.clicked.connect(on_back)
+
+        # Storico dei salvataggi del documento aperto (visibile solo per documenti già salvati)
+        self.btn_revisions = QPushButton("🕘 Revisioni...")
+        self.btn_revisions.clicked.connect(self.show_revisions)
+        self.btn_revisions.setVisible(False)
         
         # Gruppo Ordini
         self.btn_save_ord = QPushButton("💾 Salva Ordine")
@@ -287,6 +506,7 @@ class NewOrderPage(QWidget):
         self.btn_convert.setStyleSheet("background-color: #d1e7dd; border: 1px solid #badbcc; color: #0f5132; font-weight: bold;")
 
         btm_btns.addWidget(btn_menu)
+        btm_btns.addWidget(self.btn_revisions)
         btm_btns.addStretch()
         # Aggiungo i widget al layout (la visibilità sarà gestita da update_button_states)
         btm_btns.addWidget(self.btn_save_qt)
@@ -324,6 +544,11 @@ class NewOrderPage(QWidget):
           - "ORDER": Ordine esistente. NASCONDO tutto ciò che riguarda i Preventivi.
           - "QUOTE": Preventivo esistente. NASCONDO salvataggio diretto Ordine (serve Converti).
         """
+        self.current_mode = mode
+        self.btn_revisions.setVisible(
+            mode != "NEW" and bool(self.current_file_path) and not is_packed(self.current_file_path)
+        )
+
         # 1. Nascondo tutto preventivamente per pulizia
         self.btn_save_ord.setVisible(False)
         self.btn_prt_ord.setVisible(False)
@@ -349,8 +574,46 @@ class NewOrderPage(QWidget):
             self.btn_prt_qt.setVisible(True)
             self.btn_convert.setVisible(True)
 
+    def set_read_only(self, holder=None, reason=None):
+        """
+        Sola lettura se il documento è in modifica su un'altra postazione (holder = suo nome)
+        o per un altro motivo mostrato nel banner (reason, es. documento dell'archivio annuale).
+        I campi restano leggibili e la tabella scorre, ma non si può salvare.
+        """
+        self.read_only = bool(holder or reason)
+        for widget in self.editable_widgets:
+            widget.setEnabled(not self.read_only)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers if self.read_only else QAbstractItemView.AllEditTriggers)
+        if self.read_only:
+            self.lock_label.setText(reason or f"🔒 In modifica da <b>{holder}</b>: documento in sola lettura.")
+            self.btn_take_over.setVisible(False)
+            for button in (self.btn_save_ord, self.btn_prt_ord, self.btn_save_qt, self.btn_prt_qt, self.btn_convert):
+                button.setVisible(False)
+        self.lock_banner.setVisible(self.read_only)
+
+    def on_lease_released(self, file_path):
+        """Chi modificava il documento lo ha chiuso: si può riaprire in modifica."""
+        if file_path != self.current_file_path:
+            return
+        self.lock_label.setText("🔓 Il documento è di nuovo libero: riaprilo per modificarlo.")
+        self.btn_take_over.setVisible(True)
+
+    def on_lease_lost(self, file_path, holder):
+        """Lease scaduto (es. rete assente a lungo) e documento ripreso da un'altra postazione."""
+        if file_path != self.current_file_path:
+            return
+        self.set_read_only(holder)
+        self.lease.watch(file_path)
+        QMessageBox.warning(
+            self, "Documento Aperto Altrove",
+            f"Mentre la cartella dati non rispondeva, il documento è stato aperto in modifica da {holder}.\n"
+            "Le modifiche non salvate restano visibili ma il documento ora è in sola lettura."
+        )
+
     def prepare_new_order(self):
         """RESET TOTALE del form. Usato all'avvio o dopo un salvataggio."""
+        self.lease.drop()
+        self.set_read_only(None)
         self.current_file_path = None
         
         # Reset Date
@@ -377,24 +640,233 @@ class NewOrderPage(QWidget):
         self.acc2_tipo.setCurrentIndex(0)
         
         # Reset Tabella (rigenera 6 righe vuote)
-        self.table.setRowCount(0)
+        self.table_model.setRowCount(0)
         for _ in range(6): self.add_row()
         
         self.toggle_acconto_fields(self.payment_type.currentText())
+        self.update_summary_label()
         
         # Imposta stato bottoni su NUOVO (Vedi tutto tranne converti)
         self.update_button_states("NEW")
 
+        # Modulo vuoto: la bozza precedente non serve più
+        self.reset_draft()
+
+    # ============================================================================
+    # --- BOZZA AUTOMATICA (recupero dopo arresto improvviso) ---
+    # ============================================================================
+
+    def connect_draft_signals(self):
+        """Ogni modifica al form fa ripartire il timer di inattività della bozza."""
+        schedule = lambda *args: self.draft_timer.start()
+        for line_edit in (self.ribbon_color, self.packaging, self.extra, self.acc1_val, self.acc2_val,
+                          self.customer_name, self.customer_number, self.confetti_combo.lineEdit()):
+            line_edit.textChanged.connect(schedule)
+        for combo in (self.operator_combo, self.ceremony_combo, self.confetti_color_combo,
+                      self.payment_type, self.acc1_tipo, self.acc2_tipo):
+            combo.currentTextChanged.connect(schedule)
+        for picker in (self.order_date_picker, self.date_picker, self.delivery_date_picker):
+            picker.dateChanged.connect(schedule)
+        self.table_model.dataChanged.connect(schedule)
+        self.table_model.rowsInserted.connect(schedule)
+        self.table_model.rowsRemoved.connect(schedule)
+
+    def draft_state(self):
+        """Stato del form come dict piatto (un campo per chiave), per il journal delle bozze."""
+        data = self.collect_form_data(is_quote=(self.current_mode == "QUOTE"))
+        state = {"file": self.current_file_path or "", "modo": self.current_mode}
+        for section in ("info_ordine", "dati_cliente"):
+            for key, value in data[section].items():
+                state[f"{section}.{key}"] = value
+        state["dettagli_ordine"] = data["dettagli_ordine"]
+        return state
+
+    def record_draft(self):
+        if self.read_only:
+            return # Niente da recuperare: il documento non si può modificare da qui
+        self.draft.record(self.draft_state())
+
+    def reset_draft(self):
+        """Il form coincide con un documento salvato (o è vuoto): nessuna bozza da tenere."""
+        self.draft_timer.stop()
+        self.draft.reset(self.draft_state())
+
+    def restore_draft(self, state):
+        """Ripristina nel form una bozza interrotta (vedi MainWindow.offer_draft_recovery)."""
+        data = {"info_ordine": {}, "dati_cliente": {}, "dettagli_ordine": state.get("dettagli_ordine", [])}
+        for key, value in state.items():
+            section, _, field = key.partition(".")
+            if field and section in data:
+                data[section][field] = value
+        # Una bozza ha la forma di un documento senza versione: si completano i campi mancanti
+        migrate(data)
+
+        file_path = state.get("file") or None
+        self.lease.drop()
+        self.set_read_only(None)
+        self.current_file_path = file_path if file_path and os.path.exists(file_path) else None
+        mode = state.get("modo", "NEW") if self.current_file_path else "NEW"
+        self.update_button_states(mode)
+        self.fill_form(data)
+        if self.current_file_path:
+            self.take_lease_for_draft(self.current_file_path)
+
+        # La bozza resta finché il documento non viene salvato: riparte con lo stato completo
+        self.draft_timer.stop()
+        self.draft.reset({})
+        self.record_draft()
+
+    def take_lease_for_draft(self, file_path):
+        """Bozza di un documento esistente: lo si riprende in modifica, avvisando se è già aperto altrove."""
+        def taken(holder):
+            if file_path != self.current_file_path:
+                return
+            if holder is None:
+                self.lease.hold(file_path)
+                return
+            # La bozza non va persa: resta modificabile, ma chi salva per ultimo sovrascrive
+            QMessageBox.warning(
+                self, "Documento Aperto Altrove",
+                f"Il documento della bozza è in modifica da {holder}.\n"
+                "Salvando, le sue modifiche verranno sovrascritte: accordatevi prima di salvare."
+            )
+        self.io.submit(acquire, file_path, on_done=taken, on_error=lambda e: None)
+
+    def show_revisions(self):
+        """Apre lo storico delle revisioni del documento (letto in background)."""
+        file_path = self.current_file_path
+        if not file_path:
+            return
+
+        def loaded(history):
+            if file_path != self.current_file_path:
+                return
+            if not history:
+                QMessageBox.information(
+                    self, "Storico Revisioni",
+                    "Per questo documento non ci sono ancora revisioni registrate.\n"
+                    "Lo storico parte dal prossimo salvataggio."
+                )
+                return
+            from pages.history_dialog import RevisionHistoryDialog
+            dialog = RevisionHistoryDialog(history, can_restore=not self.read_only, parent=self)
+            if dialog.exec() and dialog.chosen_state is not None:
+                self.restore_revision(dialog.chosen_state)
+
+        def failed(error):
+            QMessageBox.critical(self, "Errore", f"Impossibile leggere lo storico:\n{describe_error(error)}")
+
+        self.io.submit(revisions, file_path, on_done=loaded, on_error=failed)
+
+    def restore_revision(self, state):
+        """Riporta nel modulo una revisione passata: diventa definitiva solo salvando."""
+        data = {
+            "info_ordine": dict(state.get("info_ordine", {})),
+            "dati_cliente": dict(state.get("dati_cliente", {})),
+            "dettagli_ordine": [dict(line) for line in state.get("dettagli_ordine", [])],
+        }
+        # Revisioni di formati precedenti: si completano i campi mancanti come per le bozze
+        migrate(data)
+        self.fill_form(data)
+        self.record_draft()
+        QMessageBox.information(
+            self, "Revisione Ripristinata",
+            "La versione scelta è stata caricata nel modulo.\nSalva per renderla definitiva."
+        )
+
+    def fill_customer(self, customer):
+        """Compila nome e telefono con un cliente scelto dalla rubrica."""
+        if customer is None:
+            return
+        self.customer_name.setText(customer.nome)
+        self.customer_number.setText(customer.telefono)
+
+    def show_customer_history(self):
+        """Apre la lista documenti filtrata sul cliente indicato nel campo Nome."""
+        name = self.customer_name.text().strip()
+        if not name:
+            QMessageBox.warning(self, "Storico Cliente", "Inserire o scegliere prima un cliente.")
+            return
+        if self.on_show_history:
+            self.on_show_history(name)
+
+    def on_data_dir_changed(self, new_data_dir):
+        """
+        La cartella dati è cambiata dalle Impostazioni: un documento aperto
+        appartiene al vecchio archivio, quindi il form viene azzerato.
+        Un inserimento nuovo (mai salvato) resta invece intatto.
+        """
+        if self.current_file_path:
+            self.prepare_new_order()
+
+    def fill_form(self, data):
+        """Popola tutti i campi del form con i dati di un documento."""
+        # Il documento arriva già all'ultimo formato (core/schema.py): tutti i campi ci sono
+        info = data["info_ordine"]
+        cust = data["dati_cliente"]
+        
+        self.order_date_picker.setDate(QDate.fromString(info["data_ordine"], Qt.ISODate))
+        
+        self.date_picker.setDate(QDate.fromString(info["data_cerimonia"], Qt.ISODate))
+        
+        del_date = info["data_consegna"]
+        self.delivery_date_picker.setDate(QDate.fromString(del_date, Qt.ISODate) if del_date else QDate.currentDate())
+        
+        self.operator_combo.setCurrentText(info["operatore"])
+        self.ceremony_combo.setCurrentText(info["tipo_cerimonia"])
+        self.ribbon_color.setText(info["colore_nastri"])
+        
+        self.confetti_combo.set_checked_items_from_string(info["tipo_confetti"])
+        self.confetti_color_combo.setCurrentText(info["colore_confetti"])
+        
+        self.packaging.setText(info["confezione"])
+        self.payment_type.setCurrentText(info["pagamento"])
+        self.extra.setText(info["altro"])
+        
+        self.acc1_tipo.setCurrentText(info["acconto1_tipo"])
+        self.acc1_val.setText(info["acconto1_importo"])
+        self.acc2_tipo.setCurrentText(info["acconto2_tipo"])
+        self.acc2_val.setText(info["acconto2_importo"])
+
+        self.customer_name.setText(cust["nome_cliente"])
+        self.customer_number.setText(cust["telefono_cliente"])
+        
+        # Popolamento Tabella
+        self.table_model.setRowCount(0)
+        for item in data["dettagli_ordine"]: 
+            self.add_row_with_data(item)
+        
+        # Mantiene estetica: minimo 6 righe
+        while self.table_model.rowCount() < 6: 
+            self.add_row()
+
+        self.toggle_acconto_fields(self.payment_type.currentText())
+        self.update_summary_label()
+
     def load_order(self, file_path):
-        """Carica dati da file JSON distinguendo se Ordine o Preventivo."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+        """
+        Carica dati da file JSON distinguendo se Ordine o Preventivo.
+        La lettura avviene in background: il form resta disattivato finché il file non arriva.
+        Se un'altra postazione lo sta modificando, il documento si apre in sola lettura;
+        i documenti dell'archivio annuale sono sempre in sola lettura (nessun lease).
+        """
+        self.setEnabled(False)
+        self.lease.drop()
+        archived = is_packed(file_path)
+
+        def read():
+            if archived:
+                return load_document(file_path), None
+            data = load_document(file_path)
+            return data, acquire(file_path)
+
+        def loaded(result):
+            data, holder = result
+            self.setEnabled(True)
             self.current_file_path = file_path
             
             # Controlla se il file si trova nella cartella Preventivi
-            is_quote = (os.path.abspath(QUOTES_DIR) in os.path.abspath(file_path))
+            is_quote = (os.path.abspath(self.settings.quotes_dir) in os.path.abspath(file_path))
             
             # AGGIORNAMENTO VISIBILITÀ BOTTONI
             if is_quote:
@@ -402,90 +874,76 @@ class NewOrderPage(QWidget):
             else:
                 self.update_button_states("ORDER")
             
-            info = data.get("info_ordine", {})
-            cust = data.get("dati_cliente", {})
-            
+            self.fill_form(data)
+
             # LOGICA DATE: Se è un preventivo, metti data ordine a OGGI (rinnovo).
             if is_quote: 
                 self.order_date_picker.setDate(QDate.currentDate())
-            else: 
-                self.order_date_picker.setDate(QDate.fromString(info.get("data_ordine"), Qt.ISODate))
-            
-            self.date_picker.setDate(QDate.fromString(info.get("data_cerimonia"), Qt.ISODate))
-            
-            del_date = info.get("data_consegna")
-            self.delivery_date_picker.setDate(QDate.fromString(del_date, Qt.ISODate) if del_date else QDate.currentDate())
-            
-            self.operator_combo.setCurrentText(info.get("operatore", ""))
-            self.ceremony_combo.setCurrentText(info.get("tipo_cerimonia", ""))
-            self.ribbon_color.setText(info.get("colore_nastri", ""))
-            
-            self.confetti_combo.set_checked_items_from_string(info.get("tipo_confetti", ""))
-            self.confetti_color_combo.setCurrentText(info.get("colore_confetti", ""))
-            
-            self.packaging.setText(info.get("confezione", ""))
-            self.payment_type.setCurrentText(info.get("pagamento", ""))
-            self.extra.setText(info.get("altro", ""))
-            
-            self.acc1_tipo.setCurrentText(info.get("acconto1_tipo", ""))
-            self.acc1_val.setText(info.get("acconto1_importo", ""))
-            self.acc2_tipo.setCurrentText(info.get("acconto2_tipo", ""))
-            self.acc2_val.setText(info.get("acconto2_importo", ""))
 
-            self.customer_name.setText(cust.get("nome_cliente", ""))
-            self.customer_number.setText(cust.get("telefono_cliente", ""))
-            
-            # Popolamento Tabella
-            self.table.setRowCount(0)
-            for item in data.get("dettagli_ordine", []): 
-                self.add_row_with_data(item)
-            
-            # Mantiene estetica: minimo 6 righe
-            while self.table.rowCount() < 6: 
-                self.add_row()
-            
-            self.toggle_acconto_fields(self.payment_type.currentText())
+            if archived:
+                pack_name = os.path.basename(split_packed(file_path)[0])
+                self.set_read_only(reason=f"🗄️ Documento dell'archivio annuale (<b>{pack_name}</b>): sola lettura.")
+            elif holder:
+                self.lease.watch(file_path)
+                self.set_read_only(holder)
+            else:
+                self.lease.hold(file_path)
+                self.set_read_only(None)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Errore Caricamento", f"Impossibile leggere il file:\n{e}")
+            # Documento appena aperto: è questo il nuovo punto di partenza della bozza
+            self.reset_draft()
+
+        def failed(error):
+            self.setEnabled(True)
+            QMessageBox.critical(self, "Errore Caricamento", f"Impossibile leggere il file:\n{describe_error(error)}")
             self.prepare_new_order()
 
+        self.io.submit(read, on_done=loaded, on_error=failed)
+
     # ============================================================================
     # --- SEZIONE 4: LOGICA TABELLA (Righe, Calcoli) ---
     # ============================================================================
 
     def add_row(self):
         """Aggiunge una riga vuota, con limite massimo di 13 per layout stampa."""
-        if self.table.rowCount() >= 13:
+        if self.table_model.rowCount() >= 13:
             QMessageBox.warning(self, "Limite", "Massimo 13 articoli consentiti per layout di stampa.")
             return
-        self.add_row_with_data({})
+        self.add_row_with_data(dict(LINE_FIELDS))
 
     def add_row_with_data(self, data):
-        """Crea fisicamente la riga e i suoi widget."""
-        r = self.table.rowCount()
-        self.table.insertRow(r)
-        
-        cb = NoWheelComboBox()
-        cb.addItems(["","BAGUTTA","BIPAPER","CLARALUNA","CUOREMATTO","DIMAR","DOLCICOSE","HERVIT","EMMEBI","ETM","FAMA","FANTIN","FOGAL","FRANCESCO","LAGUNA","MAS","NEGO","PABEN","QUADRIFOGLIO","TABOR"])
-        cb.setCurrentText(data.get("ditta", ""))
-        self.table.setCellWidget(r, 0, cb)
-        
-        self.table.setItem(r, 1, QTableWidgetItem(data.get("codice", "")))
-        self.table.setItem(r, 2, QTableWidgetItem(data.get("descrizione", "")))
-        self.table.setItem(r, 3, QTableWidgetItem(str(data.get("quantita", ""))))
-        self.table.setItem(r, 4, QTableWidgetItem(str(data.get("prezzo_unitario", ""))))
-        
+        """Aggiunge la riga al modello (solo dati: l'editor "Ditta" è condiviso dal delegate)."""
         # Colonna Totale: Read Only
-        tot = QTableWidgetItem(str(data.get("prezzo_totale", "0.00")))
+        tot = QStandardItem(str(data["prezzo_totale"]))
         tot.setFlags(tot.flags() & ~Qt.ItemIsEditable)
-        self.table.setItem(r, 5, tot)
 
-        self.table.resizeRowToContents(r)
+        self.table_model.appendRow([
+            QStandardItem(data["ditta"]),
+            QStandardItem(data["codice"]),
+            QStandardItem(data["descrizione"]),
+            QStandardItem(str(data["quantita"])),
+            QStandardItem(str(data["prezzo_unitario"])),
+            tot,
+        ])
+
+    def supplier_choices(self):
+        """Ditte proposte: elenco fisso più quelle trovate nel catalogo (ordini e listini)."""
+        extra = [d for d in get_catalog().suppliers() if d not in SUPPLIERS]
+        return SUPPLIERS + extra
+
+    def fill_row_from_catalog(self, row, entry):
+        """Completa una riga con i dati di un articolo scelto dai suggerimenti."""
+        if entry is None or row < 0 or row >= self.table_model.rowCount():
+            return
+        for col, value in ((COL_DITTA, entry.ditta), (COL_CODICE, entry.codice),
+                           (COL_DESCRIZIONE, entry.descrizione), (COL_PREZZO, entry.prezzo)):
+            if value:
+                self.table_model.item(row, col).setText(value)
 
     def remove_selected_row(self):
-        if self.table.currentRow() >= 0: 
-            self.table.removeRow(self.table.currentRow())
+        row = self.table.currentIndex().row()
+        if row >= 0: 
+            self.table_model.removeRow(row)
 
     def update_totals(self, item):
         """
@@ -493,30 +951,30 @@ class NewOrderPage(QWidget):
         Scatta al cambio di valore in tabella.
         """
         # Agisce solo se modifico Qt (col 3) o Prezzo (col 4)
-        if item.column() not in [3, 4]: return
+        if item.column() not in [COL_QUANTITA, COL_PREZZO]: return
         
         r = item.row()
-        qty_item = self.table.item(r, 3)
-        price_item = self.table.item(r, 4)
-        total_item = self.table.item(r, 5)
+        qty_item = self.table_model.item(r, COL_QUANTITA)
+        price_item = self.table_model.item(r, COL_PREZZO)
+        total_item = self.table_model.item(r, COL_TOTALE)
 
         if qty_item is None or price_item is None or total_item is None:
             return
 
-        try:
-            q_text = qty_item.text().replace(',', '.')
-            p_text = price_item.text().replace(',', '.')
-            q = float(q_text or 0)
-            p = float(p_text or 0)
-        except ValueError:
-            q, p = 0.0, 0.0
-            
-        # IMPORTANTE: Blocca i segnali prima di scrivere il totale.
-        # Altrimenti scrivere il totale scatenerebbe un nuovo evento 'itemChanged'
-        # creando un loop infinito.
-        self.table.blockSignals(True)
-        total_item.setText(f"{q*p:.2f}")
-        self.table.blockSignals(False)
+        # Scrivere il totale scatena un nuovo 'itemChanged' (colonna 5), che viene
+        # scartato dal controllo sulla colonna all'inizio: nessun loop, e la vista
+        # riceve normalmente la notifica per ridisegnare la cella.
+        total_item.setText(format_amount(line_total(qty_item.text(), price_item.text())))
+        self.update_summary_label()
+
+    def update_summary_label(self):
+        """Aggiorna la riga Totale / Acconti / Da saldare sotto la tabella."""
+        summary = compute_summary(self.collect_form_data())
+        self.summary_label.setText(
+            f"<b>Totale:</b> € {summary['totale']} &nbsp;&nbsp; "
+            f"<b>Acconti:</b> € {summary['acconti']} &nbsp;&nbsp; "
+            f"<b>Da saldare:</b> € {summary['saldo']}"
+        )
 
     # ============================================================================
     # --- SEZIONE 5: LOGICA DI SALVATAGGIO E CONVERSIONE ---
@@ -547,38 +1005,61 @@ class NewOrderPage(QWidget):
         # Aggiorna data a oggi per il nuovo ordine
         self.order_date_picker.setDate(QDate.currentDate())
         
-        # Salva come ORDINE (is_quote=False)
-        data, path = self.perform_save(is_quote=False)
-        
-        if data and path and old_path and os.path.exists(old_path):
-            try:
-                os.remove(old_path)
+        def saved(data, path):
+            if not old_path:
+                return
+
+            def removed(_result):
+                get_order_index().remove_path(old_path)
                 QMessageBox.information(self, "Info", "Conversione riuscita.")
                 self.prepare_new_order()
-            except Exception as e:
-                QMessageBox.warning(self, "Attenzione", f"Ordine creato, ma impossibile eliminare vecchio preventivo: {e}")
+
+            def failed(error):
+                if isinstance(error, FileNotFoundError):
+                    removed(None)
+                    return
+                QMessageBox.warning(self, "Attenzione", f"Ordine creato, ma impossibile eliminare vecchio preventivo: {describe_error(error)}")
+
+            def remove_quote():
+                os.remove(old_path)
+                release(old_path)
+                discard_history(old_path) # Ormai copiato nello storico dell'ordine
+                record_changes(removed=[old_path])
+
+            self.io.submit(remove_quote, on_done=removed, on_error=failed)
+
+        # Salva come ORDINE (is_quote=False)
+        self.perform_save(is_quote=False, on_saved=saved)
 
     def save_process(self, is_quote, print_after):
-        """Wrapper per salvare e opzionalmente stampare."""
-        data, path = self.perform_save(is_quote)
-        
-        if not data: return
-        
+        """
+        Salva e opzionalmente stampa, senza far aspettare l'operatore: i dati vengono presi
+        dal modulo, che si svuota subito per il cliente successivo, mentre salvataggio,
+        preparazione del PDF e stampa proseguono in background una fase dopo l'altra
+        (la stampa nella coda di core/print_queue.py). Ogni fase conclusa viene segnalata
+        nella barra di stato.
+        """
         doc_type = "Preventivo" if is_quote else "Ordine"
-        QMessageBox.information(self, "Salvataggio", f"{doc_type} salvato con successo:\n{os.path.basename(path)}")
-        
-        if print_after:
-            generate_and_print_order(data, os.path.basename(path))
-        
-        self.prepare_new_order()
 
-    def perform_save(self, is_quote=False):
-        """Scrive fisicamente il file JSON su disco."""
-        if not self.customer_name.text().strip():
-            QMessageBox.warning(self, "Errore", "Inserire almeno il Nome Cliente.")
-            return None, None
+        def saved(data, path):
+            name = os.path.basename(path)
+            if print_after:
+                get_print_queue().submit(data, name)
+                self.notify(f"💾 {doc_type} salvato: {name} — stampa in preparazione...")
+            else:
+                self.notify(f"💾 {doc_type} salvato: {name}")
+
+        if self.perform_save(is_quote, on_saved=saved, detach=True):
+            self.prepare_new_order()
+
+    def notify(self, text):
+        if self.on_notify:
+            self.on_notify(text)
+        else:
+            print(text)
 
-        # 1. Raccolta dati dal form
+    def collect_form_data(self, is_quote=False):
+        """Raccoglie tutti i dati del form nella struttura del documento JSON."""
         info = {
             "data_ordine": self.order_date_picker.date().toString(Qt.ISODate),
             "operatore": self.operator_combo.currentText(),
@@ -599,14 +1080,15 @@ class NewOrderPage(QWidget):
         }
         
         details = []
-        for r in range(self.table.rowCount()):
+        m = self.table_model
+        for r in range(m.rowCount()):
             d = {
-                "ditta": self.table.cellWidget(r, 0).currentText(),
-                "codice": self.table.item(r, 1).text(),
-                "descrizione": self.table.item(r, 2).text(),
-                "quantita": self.table.item(r, 3).text(),
-                "prezzo_unitario": self.table.item(r, 4).text(),
-                "prezzo_totale": self.table.item(r, 5).text()
+                "ditta": m.item(r, COL_DITTA).text(),
+                "codice": m.item(r, COL_CODICE).text(),
+                "descrizione": m.item(r, COL_DESCRIZIONE).text(),
+                "quantita": m.item(r, COL_QUANTITA).text(),
+                "prezzo_unitario": m.item(r, COL_PREZZO).text(),
+                "prezzo_totale": m.item(r, COL_TOTALE).text()
             }
             # Salva solo righe non vuote
             if any(v for k, v in d.items() if k not in ["prezzo_totale", "quantita", "prezzo_unitario"]):
@@ -620,35 +1102,138 @@ class NewOrderPage(QWidget):
             }, 
             "dettagli_ordine": details
         }
+        return full_data
+
+    def perform_save(self, is_quote=False, on_saved=None, detach=False):
+        """
+        Scrive fisicamente il file JSON su disco (in background).
+        A salvataggio riuscito chiama on_saved(dati, percorso).
+        Con 'detach' il modulo non resta legato al documento (il chiamante lo svuota
+        subito). Fino alla fine del salvataggio il documento resta in modifica a questa
+        postazione (il lease passa al lavoro in background) e i dati restano nelle bozze
+        (DraftJournal.hold); se il salvataggio fallisce si possono riportare nel modulo.
+        I salvataggi vanno in fila unica e senza tempo massimo: due salvataggi non
+        scelgono lo stesso nome di file, e un errore vuol dire davvero "non salvato".
+        Ritorna True se il salvataggio è partito.
+        """
+        if self.saving:
+            return False # Un salvataggio è già in corso: niente doppioni
+        if not self.customer_name.text().strip():
+            QMessageBox.warning(self, "Errore", "Inserire almeno il Nome Cliente.")
+            return False
+
+        # 1. Raccolta dati dal form (nel thread dell'interfaccia)
+        full_data = self.collect_form_data(is_quote)
+        info = full_data["info_ordine"]
 
         # 2. Determinazione percorso e nome file
-        target_dir = QUOTES_DIR if is_quote else ORDERS_DIR
-        os.makedirs(target_dir, exist_ok=True)
-        
-        # Se stiamo sovrascrivendo un file esistente nella cartella corretta, usa quel percorso
-        if self.current_file_path and os.path.dirname(self.current_file_path) == os.path.abspath(target_dir):
-            path = self.current_file_path
-        else:
-            # Creazione nuovo file: Sanificazione nome cliente (via caratteri speciali)
-            safe_name = re.sub(r'[\\/*?:"<>|]', "", self.customer_name.text()).replace(" ", "_")
-            prefix = 'Preventivo' if is_quote else 'Ordine'
-            base_filename = f"{prefix}_{safe_name}_{info['data_cerimonia']}"
-            
-            path = os.path.join(target_dir, f"{base_filename}.json")
-            
-            # Gestione duplicati: aggiunge _1, _2 se il file esiste già
-            counter = 1
-            while os.path.exists(path):
-                path = os.path.join(target_dir, f"{base_filename}_{counter}.json")
-                counter += 1
-
-        try:
-            with open(path, 'w', encoding='utf-8') as f: 
-                json.dump(full_data, f, indent=4, ensure_ascii=False)
+        target_dir = self.settings.quotes_dir if is_quote else self.settings.orders_dir
+        current_path = self.current_file_path
+        safe_name = re.sub(r'[\\/*?:"<>|]', "", self.customer_name.text()).replace(" ", "_")
+        index = get_order_index()
+        # Staccato: i dati restano nelle bozze fino a salvataggio riuscito
+        draft = self.draft_state() if detach else None
+        held = self.draft.hold(draft) if detach else None
+
+        def write():
+            """Lavoro sui file (in background): ritorna il percorso e il riepilogo per l'indice."""
+            path = None
+            try:
+                path = write_file()
+                try:
+                    summary = index.read_entry(path)
+                except OSError:
+                    summary = None # Il documento è salvato: l'indice lo ritroverà alla prossima scansione
+                return path, summary
+            finally:
+                if detach:
+                    # Riuscito o no, nessuno tiene più il documento in modifica (il modulo è già passato ad altro)
+                    for doc_path in {current_path, path} - {None}:
+                        try:
+                            release(doc_path)
+                        except OSError:
+                            pass
+
+        def write_file():
+            os.makedirs(target_dir, exist_ok=True)
             
+            # Se stiamo sovrascrivendo un file esistente nella cartella corretta, usa quel percorso
+            if current_path and os.path.dirname(current_path) == os.path.abspath(target_dir):
+                path = current_path
+            else:
+                # Creazione nuovo file: Sanificazione nome cliente (via caratteri speciali)
+                prefix = 'Preventivo' if is_quote else 'Ordine'
+                base_filename = f"{prefix}_{safe_name}_{info['data_cerimonia']}"
+                
+                path = os.path.join(target_dir, f"{base_filename}.json")
+                
+                # Gestione duplicati: aggiunge _1, _2 se il file esiste già
+                counter = 1
+                while os.path.exists(path):
+                    path = os.path.join(target_dir, f"{base_filename}_{counter}.json")
+                    counter += 1
+
+            # Mai sovrascrivere un documento che un'altra postazione ha in modifica
+            ensure_free(path)
+            if path != current_path:
+                acquire(path)
+            created = not os.path.exists(path)
+            write_document(path, full_data)
+            # Solo le differenze dalla revisione precedente (un preventivo confermato prosegue il suo storico)
+            record_revision(path, full_data, previous_path=current_path, created=created)
+            record_changes(saved=[path]) # Le altre postazioni lo vedranno subito
+            return path
+
+        def written(result):
+            path, summary = result
+            if detach:
+                self.draft.release_held(held)
+                if summary is not None:
+                    index.apply({path: summary}, {})
+                if on_saved:
+                    on_saved(full_data, path)
+                return
+            self.saving = False
             self.current_file_path = path
-            return full_data, path
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Errore Critico", f"Salvataggio fallito: {e}")
-            return None, None
\ No newline at end of file
+            self.lease.hold(path)
+            # Aggiorna subito indice e catalogo con il documento appena salvato
+            if summary is not None:
+                index.apply({path: summary}, {})
+            # Documento al sicuro sul disco: la bozza non serve più
+            self.reset_draft()
+            if on_saved:
+                on_saved(full_data, path)
+
+        def failed(error):
+            if detach:
+                self.offer_unsaved_restore(draft, held, error)
+                return
+            self.saving = False
+            QMessageBox.critical(self, "Errore Critico", f"Salvataggio fallito: {describe_error(error)}")
+
+        # Staccato: il modulo si libera subito, altri salvataggi possono partire
+        self.saving = not detach
+        self.io.submit(write, on_done=written, on_error=failed, timeout=None, serial=True)
+        if detach:
+            self.lease.hand_over() # Lo rilascia il salvataggio, a lavoro finito
+        return True
+
+    def offer_unsaved_restore(self, draft, held, error):
+        """Salvataggio in background fallito quando il modulo era già stato svuotato: i dati non vanno persi."""
+        customer = draft.get("dati_cliente.nome_cliente") or "senza nome"
+        text = f"Salvataggio del documento di {customer} fallito: {describe_error(error)}"
+        busy = bool(self.customer_name.text().strip() or self.current_file_path)
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Errore Critico")
+        msg.setIcon(QMessageBox.Critical)
+        if busy:
+            text += "\n\nRiportare i suoi dati nel modulo? Quelli inseriti ora andranno persi."
+        msg.setText(text)
+        btn_restore = msg.addButton("Riporta nel Modulo", QMessageBox.YesRole)
+        msg.addButton("Ignora" if busy else "Chiudi", QMessageBox.NoRole)
+        msg.exec()
+        # In entrambi i casi i dati lasciano le bozze "in salvataggio": ripresi nel modulo o scartati
+        self.draft.release_held(held)
+        if msg.clickedButton() == btn_restore:
+            self.restore_draft(draft)
+            self.notify(f"↩️ Documento di {customer} riportato nel modulo Nuovo Ordine: salvalo di nuovo")
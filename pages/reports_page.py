@@ -0,0 +1,133 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QPushButton,
+    QHBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PySide6.QtCore import QDate, Qt
+
+from core.analytics import GROUPS, MEASURES, DATE_FIELDS, get_report_engine
+from core.data_io import refresh_index_async
+from pages.new_order_page import NoWheelDateEdit, NoWheelComboBox
+
+class ReportsPage(QWidget):
+    """
+    Pagina Report.
+    Raggruppa gli ordini per mese, tipo cerimonia, operatore, ditta o tipo
+    confetti e mostra fatturato, numero ordini o quantità nel periodo scelto.
+    """
+    def __init__(self, on_back):
+        super().__init__()
+        self.engine = get_report_engine()
+        # Colonne pronte o aggiornate (indice, righe articolo lette in background): si ricalcola
+        self.engine.updated.connect(self.on_engine_updated)
+
+        layout = QVBoxLayout()
+        title = QLabel("<h2>Report Vendite</h2>")
+        title.setObjectName("titleLabel")
+        layout.addWidget(title)
+
+        # --- FILTRI ---
+        filters = QHBoxLayout()
+
+        self.group_combo = NoWheelComboBox()
+        for key, label in GROUPS.items():
+            self.group_combo.addItem(label, key)
+        filters.addWidget(QLabel("Raggruppa per:"))
+        filters.addWidget(self.group_combo)
+
+        self.measure_combo = NoWheelComboBox()
+        for key, label in MEASURES.items():
+            self.measure_combo.addItem(label, key)
+        filters.addWidget(QLabel("Valore:"))
+        filters.addWidget(self.measure_combo)
+
+        self.date_field_combo = NoWheelComboBox()
+        for key, label in DATE_FIELDS.items():
+            self.date_field_combo.addItem(label, key)
+        filters.addWidget(QLabel("Periodo su:"))
+        filters.addWidget(self.date_field_combo)
+
+        today = QDate.currentDate()
+        self.date_from = NoWheelDateEdit()
+        self.date_from.setDate(QDate(today.year(), 1, 1))
+        self.date_to = NoWheelDateEdit()
+        self.date_to.setDate(QDate(today.year(), 12, 31))
+        filters.addWidget(QLabel("Dal:"))
+        filters.addWidget(self.date_from)
+        filters.addWidget(QLabel("Al:"))
+        filters.addWidget(self.date_to)
+        filters.addStretch()
+        layout.addLayout(filters)
+
+        # Ogni cambio di filtro ricalcola subito il report
+        for combo in (self.group_combo, self.measure_combo, self.date_field_combo):
+            combo.currentIndexChanged.connect(self.refresh_report)
+        self.date_from.dateChanged.connect(self.refresh_report)
+        self.date_to.dateChanged.connect(self.refresh_report)
+
+        # --- RISULTATI ---
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Gruppo", "Valore", "N. Ordini"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        # --- BOTTONI AZIONE ---
+        button_layout = QHBoxLayout()
+        btn_back = QPushButton("⬅️ Torna al Menu")
+        btn_back.clicked.connect(on_back)
+        button_layout.addWidget(btn_back)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        """
+        Mostra subito il report sui dati in memoria, poi aggiorna l'indice e gli
+        archivi annuali in background (solo file cambiati): le modifiche arrivano con 'updated'.
+        """
+        self.refresh_report()
+        refresh_index_async()
+        self.engine.refresh_archives()
+        super().showEvent(event)
+
+    def on_engine_updated(self):
+        if self.isVisible():
+            self.refresh_report()
+
+    def refresh_report(self):
+        group = self.group_combo.currentData()
+        measure = self.measure_combo.currentData()
+        report = self.engine.run(
+            group, measure,
+            date_field=self.date_field_combo.currentData(),
+            date_from=self.date_from.date().toPython(),
+            date_to=self.date_to.date().toPython(),
+        )
+        if report is None:
+            # Prima apertura: colonne in preparazione, il report arriva con 'updated'
+            self.status_label.setText("Preparazione dei dati in corso...")
+            return
+        rows, stats = report
+
+        self.table.setRowCount(len(rows))
+        for r, (label, value, count) in enumerate(rows):
+            value_text = f"€ {value:,.2f}" if measure == "fatturato" else f"{value:g}"
+            value_item = QTableWidgetItem(value_text)
+            value_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            count_item = QTableWidgetItem(str(count))
+            count_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(r, 0, QTableWidgetItem(label))
+            self.table.setItem(r, 1, value_item)
+            self.table.setItem(r, 2, count_item)
+
+        # Dal motore, non dalla somma delle righe: un ordine può stare in più gruppi (ditta, tipo confetti)
+        total = stats["totale"]
+        total_text = f"€ {total:,.2f}" if measure == "fatturato" else f"{total:g}"
+        self.status_label.setText(
+            f"Totale: {total_text} — {stats['ordini']} ordini nel periodo "
+            f"(calcolato in {stats['ms']:.1f} ms)"
+        )
@@ -1,16 +1,94 @@
 import os
-import json
-import re
-from datetime import datetime
+from operator import attrgetter
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton,
-    QLineEdit, QListWidget, QListWidgetItem,
-    QHBoxLayout, QMessageBox, QComboBox
+    QLineEdit, QTableView, QHeaderView, QAbstractItemView,
+    QHBoxLayout, QMessageBox, QComboBox, QProgressBar, QInputDialog
 )
-from PySide6.QtCore import Qt
-
-# Importiamo le cartelle dove cercare i file
-from paths import ORDERS_DIR, QUOTES_DIR
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QDate, QTimer
+
+# Le cartelle dove cercare i file arrivano dal servizio impostazioni,
+# i dati dei documenti dall'indice locale (rilegge solo i file cambiati)
+from core.settings import get_settings
+from core.order_index import get_order_index
+from core.prefix_index import normalize
+from core import bulk, cold_archive
+from core.document_cache import get_document_cache
+# Le operazioni sui file girano in background (la cartella dati può essere in rete)
+from core.data_io import get_data_io, refresh_index_async, describe_error, DEFAULT_TIMEOUT, SCAN_TIMEOUT
+
+# Colonne della tabella: (titolo, campo del riepilogo usato per ordinare).
+# Le chiavi sono già pronte nei riepiloghi dell'indice (date e importi
+# numerici, nome normalizzato): un clic sull'intestazione è un solo sort.
+COLUMNS = [
+    ("Cliente", "chiave_cliente"),
+    ("Cerimonia", "data_cerimonia"),
+    ("Consegna", "data_consegna"),
+    ("Data Ordine", "data_ordine"),
+    ("Operatore", "operatore"),
+    ("Tipo Cerimonia", "tipo_cerimonia"),
+    ("Totale (€)", "totale"),
+]
+COL_CLIENTE, COL_CERIMONIA, COL_CONSEGNA, COL_DATA_ORDINE, COL_OPERATORE, COL_TIPO_CERIMONIA, COL_TOTALE = range(len(COLUMNS))
+
+# Ordinamenti ricordati: a parità di valore decide il clic precedente (e così via)
+MAX_SORT_KEYS = 3
+
+# Attesa prima di leggere in anticipo il documento selezionato o sotto il mouse
+# (scorrendo la lista non parte una lettura per ogni riga attraversata)
+PREFETCH_DELAY_MS = 150
+
+# Voci del selettore: documenti attivi o archivio annuale (sola lettura)
+MODE_ORDERS, MODE_QUOTES, MODE_ARCHIVE = range(3)
+
+class DocumentTableModel(QAbstractTableModel):
+    """
+    Modello della tabella documenti su una lista (percorso, riepilogo).
+    Il testo delle celle viene calcolato solo per le righe visibili.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def path_at(self, row):
+        return self.rows[row][0]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        file_path, summary = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == COL_CLIENTE:
+                return summary.nome_cliente
+            if column in (COL_CERIMONIA, COL_CONSEGNA, COL_DATA_ORDINE):
+                return summary.display_date(COLUMNS[column][1])
+            if column == COL_TOTALE:
+                return summary.display_amount("totale")
+            return getattr(summary, COLUMNS[column][1])
+        if role == Qt.TextAlignmentRole and column == COL_TOTALE:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ToolTipRole and column == COL_CLIENTE:
+            return cold_archive.document_name(file_path)
+        if role == Qt.UserRole:
+            return file_path
+        return None
 
 class SearchPage(QWidget):
     """
@@ -20,9 +98,13 @@ class SearchPage(QWidget):
     1. Visualizzare l'elenco di Ordini o Preventivi (switch tramite menu a tendina).
     2. Filtrare l'elenco in tempo reale digitando il nome.
     3. Aprire un file per la modifica (doppio click).
-    4. Convertire un Preventivo in Ordine (tasto "Conferma").
+    4. Convertire uno o più Preventivi in Ordini (tasto "Conferma").
     5. Stampare direttamente un documento selezionato.
-    6. Eliminare definitivamente un Ordine o Preventivo.
+    6. Eliminare definitivamente o archiviare uno o più documenti
+       (in background, con barra di avanzamento).
+    7. Esportare l'archivio in CSV/ODS.
+    8. Raccogliere gli ordini di un anno passato nell'archivio annuale
+       e consultarli (sola lettura) dalla terza voce del selettore.
     """
 
     def __init__(self, on_back, on_load_order, on_print_order):
@@ -32,8 +114,32 @@ class SearchPage(QWidget):
         self.on_load_order = on_load_order
         self.on_print_order = on_print_order
         
-        # Lista interna per memorizzare i dati caricati (per il filtro)
+        # Lista interna (percorso, riepilogo) per il filtro: i riepiloghi sono quelli
+        # dell'indice, condivisi, quindi qui non si copia nulla per documento
         self.all_orders = []
+        # Documenti degli archivi annuali, dall'ultima lettura (vedi core/cold_archive.py)
+        self.cold = cold_archive.get_cold_archive()
+        self.cold_orders = []
+        self.archived_orders = [] # Ordini: documenti archiviati proposti nelle ricerche
+        # Ordinamento corrente, dal criterio più vecchio al più recente: [(colonna, verso)]
+        self.sort_keys = [(COL_CERIMONIA, Qt.AscendingOrder)]
+
+        # Se la cartella dati cambia l'indice viene ri-puntato (reset):
+        # la lista visibile va ricaricata subito
+        self.settings = get_settings()
+        self.index = get_order_index()
+        self.index.add_listener(self.on_index_changed)
+        self.io = get_data_io()
+
+        # Lettura anticipata del documento su cui l'utente si sta fermando
+        self.cache = get_document_cache()
+        self.prefetch_path = None   # In attesa del timer
+        self.prefetched = None      # Ultimo documento letto in anticipo
+        self.prefetching = False
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(PREFETCH_DELAY_MS)
+        self.prefetch_timer.timeout.connect(self.prefetch)
 
         layout = QVBoxLayout()
         title = QLabel("<h2>Lista Ordini e Preventivi</h2>")
@@ -42,7 +148,7 @@ class SearchPage(QWidget):
 
         # --- SELETTORE MODALITÀ (Ordini vs Preventivi) ---
         self.type_selector = QComboBox()
-        self.type_selector.addItems(["📂 Ordini", "📝 Preventivi"])
+        self.type_selector.addItems(["📂 Ordini", "📝 Preventivi", "🗄️ Archivio Annuale (sola lettura)"])
         # Quando cambia l'indice (0 o 1), ricarichiamo la lista corretta
         self.type_selector.currentIndexChanged.connect(self.on_type_changed) 
         layout.addWidget(self.type_selector)
@@ -54,11 +160,43 @@ class SearchPage(QWidget):
         self.search_bar.textChanged.connect(self.filter_orders)
         layout.addWidget(self.search_bar)
 
-        # --- LISTA VISUALE ---
-        self.order_list_widget = QListWidget()
+        # --- TABELLA DOCUMENTI (clic sulle intestazioni per ordinare) ---
+        self.table_model = DocumentTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setWordWrap(False)
+        header = self.table.horizontalHeader()
+        # Larghezze fisse: adattarle al contenuto vorrebbe dire misurare ogni riga
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(COL_CLIENTE, QHeaderView.Stretch)
+        for column, width in ((COL_CERIMONIA, 100), (COL_CONSEGNA, 100), (COL_DATA_ORDINE, 100),
+                              (COL_OPERATORE, 110), (COL_TIPO_CERIMONIA, 130), (COL_TOTALE, 100)):
+            self.table.setColumnWidth(column, width)
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(COL_CERIMONIA, Qt.AscendingOrder)
+        header.sortIndicatorChanged.connect(self.on_sort_changed)
         # Il doppio click su una riga apre l'editor
-        self.order_list_widget.itemDoubleClicked.connect(self.handle_double_click)
-        layout.addWidget(self.order_list_widget)
+        self.table.doubleClicked.connect(self.handle_double_click)
+        # Riga selezionata o sotto il mouse: il documento viene letto in anticipo
+        self.table.setMouseTracking(True)
+        self.table.entered.connect(self.schedule_prefetch)
+        self.table.selectionModel().currentRowChanged.connect(lambda current, _previous: self.schedule_prefetch(current))
+        layout.addWidget(self.table)
+
+        # Messaggio al posto della tabella vuota (nessun documento, nessun risultato, errori)
+        self.empty_label = QLabel()
+        self.empty_label.setVisible(False)
+        layout.addWidget(self.empty_label)
+
+        # Avanzamento delle operazioni su più documenti
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
 
         # --- BOTTONI AZIONE ---
         button_layout = QHBoxLayout()
@@ -66,21 +204,34 @@ class SearchPage(QWidget):
         btn_back = QPushButton("⬅️ Torna al Menu")
         btn_back.clicked.connect(on_back)
         
-        # Bottone "Elimina"
-        self.btn_delete = QPushButton("🗑️ Elimina Selezionato")
+        # Bottone "Elimina" (anche più documenti insieme: Ctrl/Maiusc + clic)
+        self.btn_delete = QPushButton("🗑️ Elimina Selezionati")
         self.btn_delete.setStyleSheet("background-color: #f8d7da; border: 1px solid #f5c2c7; color: #842029; font-weight: bold;")
         self.btn_delete.clicked.connect(self.delete_selected_item)
 
         # Bottone "Conferma": visibile SOLO se siamo in modalità Preventivi
-        self.btn_confirm = QPushButton("✅ Conferma Preventivo")
+        self.btn_confirm = QPushButton("✅ Conferma Preventivi")
         self.btn_confirm.clicked.connect(self.confirm_selected_quote)
         self.btn_confirm.setVisible(False) # Nascosto di default
+
+        self.btn_archive = QPushButton("🗄️ Archivia Selezionati")
+        self.btn_archive.clicked.connect(self.archive_selected_items)
+
+        # Archivio annuale: visibile solo in modalità Ordini
+        self.btn_pack_year = QPushButton("📦 Chiudi un Anno...")
+        self.btn_pack_year.clicked.connect(self.pack_year)
         
         btn_print = QPushButton("📄 Stampa Selezionato")
         btn_print.clicked.connect(self.handle_print_click)
+
+        btn_export = QPushButton("📤 Esporta...")
+        btn_export.clicked.connect(self.open_export_dialog)
         
         button_layout.addWidget(btn_back)
+        button_layout.addWidget(btn_export)
+        button_layout.addWidget(self.btn_pack_year)
         button_layout.addStretch() # Spinge i bottoni successivi a destra
+        button_layout.addWidget(self.btn_archive)
         button_layout.addWidget(self.btn_delete)
         button_layout.addWidget(self.btn_confirm)
         button_layout.addWidget(btn_print)
@@ -93,142 +244,253 @@ class SearchPage(QWidget):
     # ============================================================================
 
     def on_type_changed(self):
-        """Gestisce il cambio di selezione (Ordini/Preventivi) e aggiorna la UI."""
-        # Se l'indice è 1, siamo su "Preventivi"
-        is_quote_mode = (self.type_selector.currentIndex() == 1)
-        
-        # Mostra il tasto "Conferma" solo se stiamo guardando i preventivi
-        self.btn_confirm.setVisible(is_quote_mode)
+        """Gestisce il cambio di selezione (Ordini/Preventivi/Archivio) e aggiorna la UI."""
+        self.update_action_buttons()
         
         # Ricarica i dati dalla cartella giusta
         self.load_orders()
 
-    def handle_double_click(self, item):
-        """Gestisce l'apertura del file quando si clicca due volte sulla lista."""
-        # Recuperiamo il percorso completo nascosto nell'item (UserRole)
-        file_path = item.data(Qt.UserRole)
+    def update_action_buttons(self):
+        """"Conferma" solo sui preventivi; l'archivio annuale è in sola lettura."""
+        mode = self.type_selector.currentIndex()
+        self.btn_confirm.setVisible(mode == MODE_QUOTES)
+        self.btn_pack_year.setVisible(mode == MODE_ORDERS)
+        self.btn_delete.setVisible(mode != MODE_ARCHIVE)
+        self.btn_archive.setVisible(mode != MODE_ARCHIVE)
+
+    def selected_path(self):
+        """Percorso del documento su cui è posizionata la selezione (o None)."""
+        index = self.table.currentIndex()
+        if not index.isValid() or not self.table.selectionModel().isRowSelected(index.row(), QModelIndex()):
+            return None
+        return self.table_model.path_at(index.row())
+
+    def selected_paths(self):
+        """
+        Percorsi di tutti i documenti selezionati, nell'ordine della tabella.
+        Gli ordini degli archivi annuali (sola lettura, compaiono anche nelle ricerche
+        tra gli Ordini) restano fuori da eliminazione e archiviazione.
+        """
+        rows = sorted(index.row() for index in self.table.selectionModel().selectedRows())
+        return [path for path in map(self.table_model.path_at, rows) if not cold_archive.is_packed(path)]
+
+    def handle_double_click(self, index):
+        """Gestisce l'apertura del file quando si clicca due volte su una riga."""
+        # Percorso completo del documento della riga
+        file_path = self.table_model.path_at(index.row())
         if file_path and self.on_load_order:
             # Chiama la funzione della MainWindow per cambiare pagina e caricare i dati
             self.on_load_order(file_path)
 
+    def schedule_prefetch(self, index):
+        if not index.isValid():
+            return
+        path = self.table_model.path_at(index.row())
+        if path != self.prefetched:
+            self.prefetch_path = path
+            self.prefetch_timer.start()
+
+    def prefetch(self):
+        """Legge in background il documento indicato (uno alla volta, mai a cartella irraggiungibile)."""
+        if self.prefetching or self.prefetch_path is None or not self.io.online:
+            return
+        path, self.prefetch_path = self.prefetch_path, None
+        self.prefetched = path
+        self.prefetching = True
+
+        def finished(_result=None):
+            self.prefetching = False
+            # Nel frattempo l'utente si è spostato su un altro documento
+            if self.prefetch_path is not None:
+                self.prefetch_timer.start()
+        # Un errore qui non interessa l'utente: se ne accorgerà, se serve, aprendo il documento
+        self.io.submit(self.cache.prefetch, path, on_done=finished, on_error=finished)
+
     def handle_print_click(self):
         """Stampa l'elemento selezionato senza aprirlo."""
-        selected_item = self.order_list_widget.currentItem()
-        if not selected_item:
+        file_path = self.selected_path()
+        if not file_path:
             QMessageBox.warning(self, "Nessuna Selezione", "Seleziona un elemento da stampare.")
             return
 
-        file_path = selected_item.data(Qt.UserRole)
-        if file_path and self.on_print_order:
+        if self.on_print_order:
             self.on_print_order(file_path)
 
+    def open_export_dialog(self):
+        """Apre la finestra di esportazione dell'archivio (importata solo al primo uso)."""
+        from pages.export_dialog import ExportDialog
+        ExportDialog(self.settings.data_dir, self).exec()
+
     # ============================================================================
     # --- LOGICA CORE: ELIMINAZIONE E CONVERSIONE ---
     # ============================================================================
 
-    def delete_selected_item(self):
-        """Elimina fisicamente il file dell'ordine o preventivo selezionato."""
-        selected_item = self.order_list_widget.currentItem()
-        if not selected_item:
-            QMessageBox.warning(self, "Nessuna Selezione", "Seleziona un elemento da eliminare.")
-            return
-
-        file_path = selected_item.data(Qt.UserRole)
-        is_quote_mode = (self.type_selector.currentIndex() == 1)
-        doc_type = "preventivo" if is_quote_mode else "ordine"
+    def selected_doc_type(self):
+        return "preventivo" if self.type_selector.currentIndex() == MODE_QUOTES else "ordine"
 
-        # Finestra di conferma critica
+    def ask_confirmation(self, title, text, confirm_label, destructive=False):
+        """Finestra di conferma con tasti personalizzati; True se l'utente conferma."""
         msg = QMessageBox(self)
-        msg.setWindowTitle(f"Conferma Eliminazione {doc_type.capitalize()}")
-        msg.setText(f"Sei sicuro di voler eliminare definitivamente questo {doc_type}?\n\nQuesta azione NON può essere annullata.")
-        msg.setIcon(QMessageBox.Warning)
+        msg.setWindowTitle(title)
+        msg.setText(text)
+        msg.setIcon(QMessageBox.Warning if destructive else QMessageBox.Question)
 
-        btn_si = msg.addButton("Sì, Elimina", QMessageBox.DestructiveRole)
-        btn_no = msg.addButton("Annulla", QMessageBox.RejectRole)
+        btn_si = msg.addButton(confirm_label, QMessageBox.DestructiveRole if destructive else QMessageBox.YesRole)
+        msg.addButton("Annulla", QMessageBox.RejectRole)
 
         msg.exec()
+        return msg.clickedButton() == btn_si
+
+    def delete_selected_item(self):
+        """Elimina fisicamente i file degli ordini o preventivi selezionati."""
+        paths = self.selected_paths()
+        if not paths:
+            QMessageBox.warning(self, "Nessuna Selezione", "Seleziona uno o più elementi da eliminare.")
+            return
+
+        doc_type = self.selected_doc_type()
+        what = f"questo {doc_type}" if len(paths) == 1 else f"questi {len(paths)} {doc_type[:-1]}i"
+        if not self.ask_confirmation(
+            f"Conferma Eliminazione {doc_type.capitalize()}",
+            f"Sei sicuro di voler eliminare definitivamente {what}?\n\nQuesta azione NON può essere annullata.",
+            "Sì, Elimina", destructive=True
+        ):
+            return
 
-        if msg.clickedButton() == btn_si:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    QMessageBox.information(self, "Successo", f"{doc_type.capitalize()} eliminato correttamente.")
-                    self.load_orders() # Aggiorna la lista rimuovendo il file cancellato
-                else:
-                    QMessageBox.warning(self, "Errore", "Il file non esiste o è già stato eliminato.")
-            except Exception as e:
-                QMessageBox.critical(self, "Errore", f"Impossibile eliminare il file:\n{e}")
+        self.run_bulk("Eliminazione", bulk.delete_documents, paths,
+                      done_text=lambda n: f"{n} document{'o eliminato' if n == 1 else 'i eliminati'} correttamente.")
 
     def confirm_selected_quote(self):
         """
-        Logica per trasformare un preventivo in un ordine effettivo.
+        Logica per trasformare i preventivi selezionati in ordini effettivi.
         Include conferma con tasti personalizzati "Sì/No".
         """
-        selected_item = self.order_list_widget.currentItem()
-        if not selected_item:
-            QMessageBox.warning(self, "Attenzione", "Seleziona un preventivo da confermare.")
+        paths = self.selected_paths()
+        if not paths:
+            QMessageBox.warning(self, "Attenzione", "Seleziona uno o più preventivi da confermare.")
             return
 
-        old_path = selected_item.data(Qt.UserRole)
-        
-        # --- COSTRUZIONE MESSAGGIO CUSTOM ---
-        msg = QMessageBox(self)
-        msg.setWindowTitle("Conferma Preventivo")
-        msg.setText(f"Vuoi trasformare questo preventivo in un ORDINE effettivo?\nLa data dell'ordine verrà aggiornata ad OGGI.")
-        msg.setIcon(QMessageBox.Question)
-        
-        btn_si = msg.addButton("Sì", QMessageBox.YesRole)
-        btn_no = msg.addButton("No", QMessageBox.NoRole)
-        
-        msg.exec()
+        what = "questo preventivo" if len(paths) == 1 else f"questi {len(paths)} preventivi"
+        if not self.ask_confirmation(
+            "Conferma Preventivo",
+            f"Vuoi trasformare {what} in ORDINE effettivo?\nLa data dell'ordine verrà aggiornata ad OGGI.",
+            "Sì"
+        ):
+            return
+
+        self.run_bulk("Conferma preventivi", bulk.convert_quotes, paths, self.settings.orders_dir, self.index,
+                      done_text=lambda n: "Preventivo trasformato in Ordine!\nData aggiornata ad oggi." if n == 1
+                      else f"{n} preventivi trasformati in ordini.\nData aggiornata ad oggi.")
 
-        if msg.clickedButton() != btn_si:
+    def archive_selected_items(self):
+        """Sposta i documenti selezionati nell'archivio (fuori dalle liste, ma conservati)."""
+        paths = self.selected_paths()
+        if not paths:
+            QMessageBox.warning(self, "Nessuna Selezione", "Seleziona uno o più elementi da archiviare.")
             return
 
-        try:
-            # 1. Leggi i dati originali
-            with open(old_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+        what = "il documento selezionato" if len(paths) == 1 else f"i {len(paths)} documenti selezionati"
+        if not self.ask_confirmation(
+            "Archivia Documenti",
+            f"Spostare {what} nell'archivio?\n\n"
+            f"Non compariranno più in liste, report e suggerimenti, ma restano nella cartella '{bulk.ARCHIVE_FOLDER}' e nei backup.",
+            "Sì, Archivia"
+        ):
+            return
 
-            # 2. Modifica i metadati
-            if "info_ordine" not in data: data["info_ordine"] = {}
-            data["info_ordine"]["tipo_documento"] = "ordine"
-            data["info_ordine"]["data_ordine"] = datetime.now().date().isoformat()
+        self.run_bulk("Archiviazione", bulk.archive_documents, paths, self.settings.data_dir,
+                      done_text=lambda n: f"{n} document{'o archiviato' if n == 1 else 'i archiviati'}.")
+
+    def pack_year(self):
+        """Sposta nell'archivio annuale tutti gli ordini di un anno concluso."""
+        current_year = QDate.currentDate().year()
+        by_year = {}
+        for path, summary in self.index.documents("ordine"):
+            year = cold_archive.archive_year(summary)
+            if year is not None and year < current_year:
+                by_year.setdefault(year, []).append(path)
+        if not by_year:
+            QMessageBox.information(self, "Archivio Annuale", "Non ci sono ordini di anni passati da archiviare.")
+            return
 
-            # 3. Genera il nuovo percorso file
-            cust_name = data.get("dati_cliente", {}).get("nome_cliente", "Cliente").strip()
-            cer_date = data.get("info_ordine", {}).get("data_cerimonia", "")
-            
-            safe_cust_name = re.sub(r'[\\/*?:"<>|]', "", cust_name)
-            safe_cust_name = re.sub(r'\s+', '_', safe_cust_name).strip('_')
-
-            base_filename = f"Ordine_{safe_cust_name}_{cer_date}"
-            target_filename = base_filename + ".json"
-            target_path = os.path.join(ORDERS_DIR, target_filename)
-
-            # Gestione duplicati
-            counter = 1
-            while os.path.exists(target_path):
-                target_filename = f"{base_filename}_{counter}.json"
-                target_path = os.path.join(ORDERS_DIR, target_filename)
-                counter += 1
-
-            # 4. Scrivi il nuovo file
-            if not os.path.exists(ORDERS_DIR):
-                os.makedirs(ORDERS_DIR)
-                
-            with open(target_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
-
-            # 5. Rimuovi il vecchio file
-            os.remove(old_path)
-
-            QMessageBox.information(self, "Successo", "Preventivo trasformato in Ordine!\nData aggiornata ad oggi.")
-            
-            self.load_orders() 
+        years = sorted(by_year)
+        labels = [f"{year}  ({len(by_year[year])} {'ordine' if len(by_year[year]) == 1 else 'ordini'})" for year in years]
+        label, ok = QInputDialog.getItem(
+            self, "Archivio Annuale", "Anno da chiudere (data cerimonia):", labels, 0, False
+        )
+        if not ok:
+            return
+        year = years[labels.index(label)]
+        paths = by_year[year]
+
+        what = "l'ordine" if len(paths) == 1 else f"i {len(paths)} ordini"
+        if not self.ask_confirmation(
+            "Archivio Annuale",
+            f"Spostare {what} del {year} nell'archivio annuale?\n\n"
+            "Non compariranno più nella lista Ordini, nei report e nei suggerimenti, ma si potranno "
+            "cercare e aprire in sola lettura dalla voce \"Archivio Annuale\".",
+            "Sì, Archivia"
+        ):
+            return
 
-        except Exception as e:
-            QMessageBox.critical(self, "Errore", f"Impossibile convertire il file:\n{e}")
+        # Riscrive l'intero archivio dell'anno (con fsync finale): margine da scansione tra un avanzamento e l'altro
+        self.run_bulk("Archivio annuale", cold_archive.pack_year, paths, self.settings.data_dir, year,
+                      timeout=SCAN_TIMEOUT,
+                      done_text=lambda n: f"{n} ordin{'e' if n == 1 else 'i'} del {year} spostat{'o' if n == 1 else 'i'} nell'archivio annuale.")
+
+    def run_bulk(self, title, operation, paths, *args, done_text, timeout=DEFAULT_TIMEOUT):
+        """
+        Esegue un'operazione di core/bulk.py in background con barra di avanzamento.
+        A fine lavoro l'indice viene aggiornato una volta sola per tutti i documenti.
+        Il risultato può essere parziale (nessun annullamento): all'operatore si dice
+        quanti documenti sono riusciti e quali no.
+        timeout vale tra un avanzamento e il successivo (ogni progress lo fa ripartire).
+        """
+        self.set_busy(True, len(paths))
+
+        def finished(result):
+            self.set_busy(False)
+            # Un'unica notifica: lista, report, catalogo e rubrica si aggiornano una volta
+            removed = {path: self.index.entries[path] for path in result.removed if path in self.index.entries}
+            self.index.apply(result.changed, removed)
+
+            done = len(paths) - len(result.errors)
+            if not result.errors:
+                QMessageBox.information(self, "Successo", done_text(done))
+                return
+            details = "\n".join(f"• {os.path.basename(path)}: {error}" for path, error in result.errors[:10])
+            if len(result.errors) > 10:
+                details += f"\n… e altri {len(result.errors) - 10}"
+            QMessageBox.warning(
+                self, title,
+                f"Completati: {done} su {len(paths)}.\n"
+                "Le operazioni riuscite restano valide (non vengono annullate).\n"
+                f"Non riusciti:\n{details}"
+            )
+
+        def failed(error):
+            self.set_busy(False)
+            text = f"{title} non riuscita:\n{describe_error(error)}"
+            if not isinstance(error, bulk.DocumentsInUse):
+                # Interrotta a metà (rete, tempo scaduto): una parte dei documenti può essere già fatta
+                refresh_index_async()
+                text += "\n\nAlcuni documenti potrebbero essere già stati elaborati: controlla la lista prima di riprovare."
+            QMessageBox.critical(self, "Errore", text)
+
+        self.io.submit(operation, paths, *args, on_done=finished, on_error=failed, on_progress=self.show_progress,
+                       timeout=timeout)
+
+    def set_busy(self, busy, total=0):
+        """Durante un'operazione: barra di avanzamento visibile e bottoni bloccati."""
+        for button in (self.btn_delete, self.btn_confirm, self.btn_archive, self.btn_pack_year):
+            button.setEnabled(not busy)
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(busy)
+
+    def show_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
 
     # ============================================================================
     # --- CARICAMENTO E FILTRAGGIO DATI ---
@@ -236,98 +498,106 @@ class SearchPage(QWidget):
             
     def showEvent(self, event):
         """Metodo chiamato automaticamente ogni volta che la pagina diventa visibile."""
+        self.update_action_buttons()
         self.load_orders()
         super().showEvent(event)
 
-    def load_orders(self):
-        """Scansiona la cartella (Orders o Quotes) e carica i file in memoria."""
-        self.all_orders = []
+    def on_index_changed(self, changed, removed, reset):
+        """Documenti cambiati (o cartella dati cambiata): ridisegna la lista se visibile (altrimenti lo farà showEvent)."""
+        if self.isVisible():
+            self.populate_orders()
 
-        is_quote_mode = (self.type_selector.currentIndex() == 1)
-        target_dir = QUOTES_DIR if is_quote_mode else ORDERS_DIR
-        
-        # Aggiorna visibilità bottone conferma (ridondante ma sicuro)
-        self.btn_confirm.setVisible(is_quote_mode)
-
-        if not os.path.exists(target_dir): 
-            if is_quote_mode:
-                self.update_list_widget()
-                return
-            self.order_list_widget.clear()
-            self.order_list_widget.addItem(f"Cartella non trovata: {target_dir}")
-            return
-
-        # Scansione directory
-        for filename in os.listdir(target_dir):
-            if filename.endswith(".json"):
-                file_path = os.path.join(target_dir, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-
-                    # Estrazione dati minimi per la lista
-                    customer_name = data.get("dati_cliente", {}).get("nome_cliente", "Sconosciuto")
-                    ceremony_date_str = data.get("info_ordine", {}).get("data_cerimonia", "")
-                    
-                    try:
-                        ceremony_date = datetime.fromisoformat(ceremony_date_str)
-                    except (ValueError, TypeError):
-                        ceremony_date = datetime.min 
-
-                    # Aggiunge alla lista interna (non ancora visibile)
-                    self.all_orders.append({
-                        'filename': filename,
-                        'customer_name': customer_name,
-                        'ceremony_date': ceremony_date,
-                        'full_path': file_path
-                    })
-                except (json.JSONDecodeError, IOError):
-                    pass # Ignora file corrotti
-        
-        # Ordina per data cerimonia (dal più vecchio al più recente)
-        self.all_orders.sort(key=lambda x: x['ceremony_date'])
-        
-        # Aggiorna la lista visibile a schermo
-        self.update_list_widget()
-
-    def update_list_widget(self, orders_to_display=None):
-        """Disegna gli elementi nella QListWidget."""
-        self.order_list_widget.clear()
+    def load_orders(self):
+        """
+        Mostra subito i documenti già noti all'indice, poi controlla in background
+        i file nuovi o modificati: se ce ne sono, la lista si aggiorna da sola.
+        """
+        self.populate_orders()
+        mode = self.type_selector.currentIndex()
+        if mode != MODE_ARCHIVE:
+            refresh_index_async(on_error=self.on_refresh_failed)
+        if mode != MODE_QUOTES:
+            # Gli archivi vengono riletti solo se cambiati: di solito la risposta è immediata.
+            # Servono anche agli Ordini: la ricerca di un cliente (e lo storico) comprende gli anni chiusi
+            self.io.submit(self.cold.documents, self.settings.data_dir,
+                           on_done=self.on_cold_loaded, on_error=self.on_refresh_failed)
+
+    def on_cold_loaded(self, documents):
+        self.cold_orders = documents
+        if self.isVisible() and self.type_selector.currentIndex() != MODE_QUOTES:
+            self.populate_orders()
+
+    def on_refresh_failed(self, error):
+        if self.isVisible() and not self.all_orders:
+            self.show_message(f"Impossibile leggere la cartella dati: {describe_error(error)}")
+
+    def populate_orders(self):
+        """Carica in memoria i documenti (Ordini, Preventivi o archiviati) dall'indice, senza accedere ai file."""
+        mode = self.type_selector.currentIndex()
+        if mode == MODE_ARCHIVE:
+            self.all_orders = list(self.cold_orders)
+        else:
+            self.all_orders = self.index.documents(self.selected_doc_type())
+        # Ordini degli anni chiusi: solo tra i risultati di una ricerca, dopo quelli correnti
+        self.archived_orders = list(self.cold_orders) if mode == MODE_ORDERS else []
+
+        # Applica tutti i criteri di ordinamento, dal più vecchio al più recente
+        for column, order in self.sort_keys:
+            self._sort(self.all_orders, column, order)
+            self._sort(self.archived_orders, column, order)
         
+        # Aggiorna la tabella a schermo (mantenendo l'eventuale filtro attivo)
+        self.filter_orders()
+
+    @staticmethod
+    def _sort(rows, column, order):
+        """Ordinamento stabile su una colonna: a parità di valore resta l'ordine precedente."""
+        key = attrgetter(COLUMNS[column][1])
+        # reverse=True mantiene comunque stabile l'ordine degli elementi uguali
+        rows.sort(key=lambda row: key(row[1]), reverse=(order == Qt.DescendingOrder))
+
+    def on_sort_changed(self, column, order):
+        """Clic su un'intestazione: la colonna diventa il criterio principale, i precedenti decidono i pareggi."""
+        self.sort_keys = [k for k in self.sort_keys if k[0] != column][-(MAX_SORT_KEYS - 1):] + [(column, order)]
+        # La lista è già ordinata secondo i criteri precedenti: basta un ordinamento stabile in più
+        self._sort(self.all_orders, column, order)
+        self._sort(self.archived_orders, column, order)
+        self.filter_orders()
+
+    def update_table(self, orders_to_display=None):
+        """Mostra i documenti nella tabella (o un messaggio se non ce ne sono)."""
         # Se non passiamo una lista filtrata, usa tutto
         if orders_to_display is None:
             orders_to_display = self.all_orders
 
+        self.table_model.set_rows(orders_to_display)
         if not orders_to_display:
-            msg = "Nessun preventivo trovato." if self.type_selector.currentIndex() == 1 else "Nessun ordine trovato."
+            msg = ("Nessun ordine trovato.", "Nessun preventivo trovato.",
+                   "Nessun ordine nell'archivio annuale.")[self.type_selector.currentIndex()]
             if self.search_bar.text(): msg = "Nessun risultato per la ricerca."
-            self.order_list_widget.addItem(msg)
-            return
+            self.show_message(msg)
+        else:
+            self.empty_label.setVisible(False)
 
-        for order in orders_to_display:
-            # Formattazione Data
-            if order['ceremony_date'] == datetime.min:
-                date_str = "N.D."
-            else:
-                date_str = order['ceremony_date'].strftime('%d/%m/%Y')
-            
-            # Icona visiva nel testo (Emoji)
-            prefix = "📝" if self.type_selector.currentIndex() == 1 else "🧾"
-            display_text = f"{prefix} {order['customer_name']}  (Cerimonia: {date_str})"
-            
-            list_item = QListWidgetItem(display_text)
-            # Salviamo il percorso completo nel dato "nascosto" dell'item
-            list_item.setData(Qt.UserRole, order['full_path']) 
-            self.order_list_widget.addItem(list_item)
+    def show_message(self, text):
+        self.table_model.set_rows([])
+        self.empty_label.setText(text)
+        self.empty_label.setVisible(True)
+
+    def show_customer(self, customer_name):
+        """Prepara la lista sugli ordini di un cliente, anni chiusi compresi (usato dallo "Storico Cliente")."""
+        self.type_selector.setCurrentIndex(0)
+        self.search_bar.setText(customer_name)
 
     def filter_orders(self):
         """Filtra la lista in base al testo digitato nella barra di ricerca."""
-        search_text = self.search_bar.text().lower().strip()
+        search_text = normalize(self.search_bar.text())
         
         if not search_text:
-            self.update_list_widget(self.all_orders)
+            self.update_table(self.all_orders)
             return
             
         # List Comprehension per filtrare
-        filtered_list = [o for o in self.all_orders if search_text in o['customer_name'].lower()]
-        self.update_list_widget(filtered_list)
\ No newline at end of file
+        filtered_list = [o for rows in (self.all_orders, self.archived_orders)
+                         for o in rows if search_text in o[1].chiave_cliente]
+        self.update_table(filtered_list)
\ No newline at end of file
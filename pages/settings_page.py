@@ -1,20 +1,20 @@
-import os
-import json
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QPushButton, QLineEdit,
-    QHBoxLayout, QFileDialog, QMessageBox
+    QHBoxLayout, QFileDialog, QMessageBox, QComboBox, QCheckBox, QSpinBox, QProgressBar
 )
 
-# Importiamo get_app_dir per sapere dove si trova il config.json
-from paths import get_app_dir
+# Il servizio impostazioni tiene il config in memoria e lo salva su config.json
+from core.settings import get_settings
+from core.backup import BACKUP_INTERVALS, get_backup_engine
+from core.change_feed import HOST_NAME
+from core.order_index import DEFAULT_SCAN_WORKERS, MAX_SCAN_WORKERS, get_order_index, describe_speed
+from core.data_io import get_data_io, refresh_index_async, describe_error, SCAN_TIMEOUT
 
 class SettingsPage(QWidget):
     def __init__(self, on_back):
         super().__init__()
         self.on_back = on_back
-        
-        # Definiamo il percorso del file di configurazione
-        self.config_path = os.path.join(get_app_dir(), "config.json")
+        self.settings = get_settings()
         
         self.setup_ui()
 
@@ -44,7 +44,111 @@ class SettingsPage(QWidget):
         path_layout.addWidget(btn_browse)
         path_layout.addWidget(btn_clear)
         layout.addLayout(path_layout)
+
+        # --- POSTAZIONE ---
+        layout.addSpacing(15)
+        layout.addWidget(QLabel(
+            "<b>Postazione</b><br>"
+            "Nome mostrato alle altre postazioni quando questa ha un documento aperto in modifica."
+        ))
+        station_layout = QHBoxLayout()
+        self.station_input = QLineEdit()
+        self.station_input.setPlaceholderText(HOST_NAME)
+        station_layout.addWidget(self.station_input)
+        station_layout.addStretch()
+        layout.addLayout(station_layout)
+
+        # --- LISTINI FORNITORI ---
+        layout.addSpacing(15)
+        layout.addWidget(QLabel(
+            "<b>Listini Fornitori</b><br>"
+            "Importa un file CSV con le colonne: ditta, codice, descrizione, prezzo.<br>"
+            "Gli articoli verranno suggeriti durante la compilazione degli ordini."
+        ))
+        pricelist_layout = QHBoxLayout()
+        btn_import = QPushButton("📥 Importa Listino (CSV)...")
+        btn_import.clicked.connect(self.import_price_list)
+        pricelist_layout.addWidget(btn_import)
+        pricelist_layout.addStretch()
+        layout.addLayout(pricelist_layout)
+
+        # --- BACKUP ---
+        layout.addSpacing(15)
+        layout.addWidget(QLabel(
+            "<b>Backup</b><br>"
+            "Copie incrementali di ordini e preventivi: ogni versione di un documento viene salvata una sola volta.<br>"
+            "Se lasci vuoto, i backup vanno nella sottocartella 'backup' della cartella dati."
+        ))
+        backup_path_layout = QHBoxLayout()
+        self.backup_path_input = QLineEdit()
+        self.backup_path_input.setPlaceholderText("Cartella dati/backup...")
+        self.backup_path_input.setReadOnly(True)
+        btn_backup_browse = QPushButton("📂 Sfoglia...")
+        btn_backup_browse.clicked.connect(self.browse_backup_folder)
+        btn_backup_clear = QPushButton("❌ Ripristina Default")
+        btn_backup_clear.clicked.connect(self.backup_path_input.clear)
+        backup_path_layout.addWidget(self.backup_path_input)
+        backup_path_layout.addWidget(btn_backup_browse)
+        backup_path_layout.addWidget(btn_backup_clear)
+        layout.addLayout(backup_path_layout)
+
+        backup_layout = QHBoxLayout()
+        backup_layout.addWidget(QLabel("Backup automatico:"))
+        self.backup_interval_combo = QComboBox()
+        for hours, label in BACKUP_INTERVALS:
+            self.backup_interval_combo.addItem(label, hours)
+        backup_layout.addWidget(self.backup_interval_combo)
+        btn_backup_now = QPushButton("💾 Esegui Backup Ora")
+        btn_backup_now.clicked.connect(self.run_backup)
+        btn_restore = QPushButton("♻️ Ripristina...")
+        btn_restore.clicked.connect(self.open_restore_dialog)
+        backup_layout.addWidget(btn_backup_now)
+        backup_layout.addWidget(btn_restore)
+        backup_layout.addStretch()
+        layout.addLayout(backup_layout)
+
+        self.backup_status_label = QLabel("")
+        layout.addWidget(self.backup_status_label)
+
+        # --- FORMATO DOCUMENTI ---
+        layout.addSpacing(15)
+        layout.addWidget(QLabel(
+            "<b>Formato Documenti</b><br>"
+            "Il formato compatto riduce la dimensione dei file (utile con la cartella dati in rete).<br>"
+            "I documenti vecchi vengono aggiornati all'apertura, oppure tutti insieme con il tasto qui sotto."
+        ))
+        format_layout = QHBoxLayout()
+        self.compact_check = QCheckBox("Salva i documenti in formato compatto")
+        btn_migrate = QPushButton("🔧 Aggiorna Tutto l'Archivio")
+        btn_migrate.clicked.connect(self.migrate_archive)
+        format_layout.addWidget(self.compact_check)
+        format_layout.addWidget(btn_migrate)
+        format_layout.addStretch()
+        layout.addLayout(format_layout)
+
+        # --- LETTURA DELL'ARCHIVIO ---
+        layout.addSpacing(15)
+        layout.addWidget(QLabel(
+            "<b>Lettura dell'Archivio</b><br>"
+            "Alla prima apertura di una cartella dati (o dopo molte modifiche) i documenti vengono letti più alla volta.<br>"
+            "Con la cartella in rete conviene un valore alto; 1 = uno alla volta."
+        ))
+        workers_layout = QHBoxLayout()
+        workers_layout.addWidget(QLabel("Letture in parallelo:"))
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, MAX_SCAN_WORKERS)
+        workers_layout.addWidget(self.workers_spin)
+        # Velocità dell'ultima lettura completa: per confrontare valori diversi
+        self.scan_speed_label = QLabel("")
+        workers_layout.addWidget(self.scan_speed_label)
+        workers_layout.addStretch()
+        layout.addLayout(workers_layout)
         
+        # Avanzamento di listino, backup e aggiornamento archivio (girano in background)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
         # --- BOTTONI AZIONE ---
         btn_layout = QHBoxLayout()
         btn_back = QPushButton("⬅️ Torna al Menu")
@@ -57,6 +161,9 @@ class SettingsPage(QWidget):
         btn_layout.addWidget(btn_back)
         btn_layout.addStretch()
         btn_layout.addWidget(btn_save)
+
+        # Bloccati mentre un lavoro è in corso (anche il salvataggio: potrebbe cambiare cartella dati)
+        self.job_buttons = (btn_import, btn_backup_now, btn_restore, btn_migrate, btn_save)
         
         layout.addStretch()
         layout.addLayout(btn_layout)
@@ -68,14 +175,17 @@ class SettingsPage(QWidget):
         super().showEvent(event)
 
     def load_current_config(self):
-        """Legge il file JSON e aggiorna la barra di testo."""
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    self.path_input.setText(config.get("custom_data_path", ""))
-            except Exception as e:
-                print(f"Errore lettura config: {e}")
+        """Aggiorna la barra di testo con il percorso attuale (dalla memoria, senza rileggere il file)."""
+        self.path_input.setText(self.settings.get("custom_data_path", ""))
+        self.station_input.setText(self.settings.get("station_name", ""))
+        self.backup_path_input.setText(self.settings.get("backup_path", ""))
+        interval = self.backup_interval_combo.findData(int(self.settings.get("backup_interval_hours", 0) or 0))
+        self.backup_interval_combo.setCurrentIndex(max(interval, 0))
+        self.update_backup_status()
+        self.compact_check.setChecked(bool(self.settings.get("compact_documents", True)))
+        self.workers_spin.setValue(int(self.settings.get("index_workers", DEFAULT_SCAN_WORKERS) or DEFAULT_SCAN_WORKERS))
+        speed = get_order_index().last_speed
+        self.scan_speed_label.setText(f"Ultima lettura completa: {describe_speed(speed)}" if speed else "")
 
     def browse_folder(self):
         """Apre la finestra di dialogo per scegliere una cartella."""
@@ -85,24 +195,142 @@ class SettingsPage(QWidget):
             folder = folder.replace("\\", "/")
             self.path_input.setText(folder)
 
+    def browse_backup_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Seleziona Cartella Backup")
+        if folder:
+            self.backup_path_input.setText(folder.replace("\\", "/"))
+
     def clear_folder(self):
         """Svuota la casella di testo (ritorna ad AppData)."""
         self.path_input.clear()
 
     def save_settings(self):
-        """Salva il nuovo percorso nel file config.json."""
+        """Salva il nuovo percorso e lo applica subito (le pagine vengono avvisate dal servizio)."""
         new_path = self.path_input.text().strip()
         
-        config = {"custom_data_path": new_path}
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=4)
+            self.settings.update(
+                custom_data_path=new_path,
+                backup_path=self.backup_path_input.text().strip(),
+                backup_interval_hours=self.backup_interval_combo.currentData(),
+                compact_documents=self.compact_check.isChecked(),
+                station_name=self.station_input.text().strip(),
+                index_workers=self.workers_spin.value()
+            )
+            self.update_backup_status()
             
             QMessageBox.information(
                 self, 
                 "Impostazioni Salvate", 
-                "Le impostazioni sono state salvate con successo.\n\n"
-                "⚠️ ATTENZIONE: Chiudi e riapri il programma per applicare le modifiche."
+                "Le impostazioni sono state salvate e applicate con successo.\n\n"
+                f"Cartella dati in uso:\n{self.settings.data_dir}"
             )
         except Exception as e:
-            QMessageBox.critical(self, "Errore", f"Impossibile salvare le impostazioni:\n{e}")
\ No newline at end of file
+            QMessageBox.critical(self, "Errore", f"Impossibile salvare le impostazioni:\n{e}")
+
+    def import_price_list(self):
+        """Importa un listino fornitore CSV nel catalogo prodotti."""
+        file_path, _ = QFileDialog.getOpenFileName(self, "Seleziona Listino", "", "File CSV (*.csv)")
+        if not file_path:
+            return
+
+        def imported(count):
+            self.set_busy(False)
+            QMessageBox.information(self, "Listino Importato", f"Importati {count} articoli dal listino.")
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.critical(self, "Errore", f"Impossibile importare il listino:\n{describe_error(error)}")
+
+        from core.catalog import get_catalog
+        self.set_busy(True)
+        get_catalog().import_price_list_async(file_path, imported, failed)
+
+    # ============================================================================
+    # --- BACKUP ---
+    # ============================================================================
+
+    def update_backup_status(self):
+        """Mostra data e ora dell'ultimo backup."""
+        try:
+            last = get_backup_engine().last_snapshot_time()
+        except Exception:
+            last = None
+        text = last.strftime("%d/%m/%Y %H:%M") if last else "mai"
+        self.backup_status_label.setText(f"Ultimo backup: {text}")
+
+    def run_backup(self):
+        """Backup manuale (usa le cartelle già salvate nelle impostazioni)."""
+        def finished(result):
+            self.set_busy(False)
+            snapshot_id, new_files = result
+            self.update_backup_status()
+            if snapshot_id:
+                QMessageBox.information(self, "Backup Completato", f"Backup eseguito. Documenti nuovi o modificati salvati: {new_files}.")
+            else:
+                QMessageBox.information(self, "Backup", "Nessuna modifica dall'ultimo backup.")
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.critical(self, "Errore", f"Impossibile eseguire il backup:\n{describe_error(error)}")
+
+        self.set_busy(True)
+        # Confronto di tutti i file: margine da scansione tra un avanzamento e l'altro
+        get_data_io().submit(get_backup_engine().create_snapshot, on_done=finished, on_error=failed,
+                             on_progress=self.show_progress, timeout=SCAN_TIMEOUT)
+
+    def open_restore_dialog(self):
+        from pages.backup_dialog import RestoreDialog
+        if not get_backup_engine().snapshots():
+            QMessageBox.information(self, "Ripristino", "Non ci sono ancora backup da cui ripristinare.")
+            return
+        RestoreDialog(self).exec()
+        self.update_backup_status()
+
+    # ============================================================================
+    # --- FORMATO DOCUMENTI ---
+    # ============================================================================
+
+    def migrate_archive(self):
+        """Riscrive tutti i documenti all'ultimo formato (e nella formattazione scelta)."""
+        reply = QMessageBox.question(
+            self, "Aggiorna Archivio",
+            "Tutti i documenti verranno riscritti nel formato più recente.\n"
+            "Si consiglia di eseguire prima un backup. Continuare?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        def finished(result):
+            self.set_busy(False)
+            rewritten, total = result
+            # Rilettura dell'indice in background: liste e report si aggiornano da soli
+            refresh_index_async()
+            QMessageBox.information(self, "Archivio Aggiornato", f"Documenti aggiornati: {rewritten} su {total}.")
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.critical(self, "Errore", f"Impossibile aggiornare l'archivio:\n{describe_error(error)}")
+
+        from core.schema import migrate_archive
+        self.set_busy(True)
+        get_data_io().submit(migrate_archive, self.settings.data_dir, self.compact_check.isChecked(),
+                             on_done=finished, on_error=failed, on_progress=self.show_progress,
+                             timeout=SCAN_TIMEOUT)
+
+    # ============================================================================
+    # --- LAVORI IN BACKGROUND ---
+    # ============================================================================
+
+    def set_busy(self, busy):
+        """Durante un lavoro: barra di avanzamento visibile e bottoni dei lavori bloccati."""
+        for button in self.job_buttons:
+            button.setEnabled(not busy)
+        self.progress_bar.setRange(0, 0) # Indeterminata finché non arriva il primo avanzamento
+        self.progress_bar.setVisible(busy)
+
+    def show_progress(self, done, total):
+        # Totale 0 = non noto (es. backup): la barra resta indeterminata
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
@@ -0,0 +1,107 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
+    QFileDialog, QMessageBox
+)
+from PySide6.QtCore import QDate, Qt
+
+from core.supplier_rollup import get_supplier_rollup
+from core.data_io import refresh_index_async
+from pages.new_order_page import NoWheelDateEdit
+
+class SupplierRollupPage(QWidget):
+    """
+    Pagina Riepilogo Fornitori.
+    Somma le quantità da ordinare per ditta e codice articolo, per gli
+    ordini con consegna nel periodo scelto, ed esporta un foglio per ditta.
+    """
+    def __init__(self, on_back):
+        super().__init__()
+        self.rollup = get_supplier_rollup()
+        # Se un ordine cambia mentre la pagina è aperta, la tabella si aggiorna da sola
+        self.rollup.index.add_listener(self.on_index_changed)
+        self.rollup.index.add_lines_listener(self.on_lines_loaded)
+
+        layout = QVBoxLayout()
+        title = QLabel("<h2>Riepilogo Acquisti per Fornitore</h2>")
+        title.setObjectName("titleLabel")
+        layout.addWidget(title)
+
+        # --- PERIODO DI CONSEGNA ---
+        filters = QHBoxLayout()
+        today = QDate.currentDate()
+        self.date_from = NoWheelDateEdit()
+        self.date_from.setDate(today)
+        self.date_to = NoWheelDateEdit()
+        self.date_to.setDate(today.addDays(30))
+        self.date_from.dateChanged.connect(self.refresh_table)
+        self.date_to.dateChanged.connect(self.refresh_table)
+        filters.addWidget(QLabel("Consegne dal:"))
+        filters.addWidget(self.date_from)
+        filters.addWidget(QLabel("al:"))
+        filters.addWidget(self.date_to)
+        filters.addStretch()
+        layout.addLayout(filters)
+
+        # --- TABELLA ---
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Ditta", "Codice", "Descrizione", "Quantità"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        # --- BOTTONI AZIONE ---
+        button_layout = QHBoxLayout()
+        btn_back = QPushButton("⬅️ Torna al Menu")
+        btn_back.clicked.connect(on_back)
+        btn_export = QPushButton("📤 Esporta ODS (un foglio per ditta)")
+        btn_export.clicked.connect(self.export_ods)
+        button_layout.addWidget(btn_back)
+        button_layout.addStretch()
+        button_layout.addWidget(btn_export)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        """Mostra i dati in memoria e aggiorna l'indice in background (la tabella segue da sola)."""
+        self.refresh_table()
+        refresh_index_async()
+        super().showEvent(event)
+
+    def on_index_changed(self, changed, removed, reset):
+        if self.isVisible():
+            self.refresh_table()
+
+    def on_lines_loaded(self, loaded):
+        if self.isVisible():
+            self.refresh_table()
+
+    def period(self):
+        return self.date_from.date().toPython(), self.date_to.date().toPython()
+
+    def refresh_table(self):
+        rows = [(ditta, codice, descrizione, quantity)
+                for ditta, lines in self.rollup.query(*self.period()).items()
+                for codice, descrizione, quantity in lines]
+
+        self.table.setRowCount(len(rows))
+        for r, (ditta, codice, descrizione, quantity) in enumerate(rows):
+            qty_item = QTableWidgetItem(f"{quantity.normalize():f}")
+            qty_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.table.setItem(r, 0, QTableWidgetItem(ditta))
+            self.table.setItem(r, 1, QTableWidgetItem(codice))
+            self.table.setItem(r, 2, QTableWidgetItem(descrizione))
+            self.table.setItem(r, 3, qty_item)
+
+    def export_ods(self):
+        date_from, date_to = self.period()
+        default_name = f"Riepilogo_Fornitori_{date_from.isoformat()}_{date_to.isoformat()}.ods"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Esporta Riepilogo", default_name, "Foglio ODS (*.ods)")
+        if not file_path:
+            return
+        try:
+            count = self.rollup.export_ods(file_path, date_from, date_to)
+            QMessageBox.information(self, "Esportazione Completata", f"Esportate {count} ditte in:\n{file_path}")
+        except Exception as e:
+            QMessageBox.critical(self, "Errore", f"Impossibile esportare il riepilogo:\n{e}")
@@ -1,6 +1,7 @@
 import os
 import sys
 import json
+import tempfile
 
 def get_app_dir():
     """ 
@@ -25,14 +26,22 @@ def get_resource_dir():
     else:
         return os.path.abspath(os.path.dirname(__file__))
 
+def get_config_path():
+    """Percorso del file config.json (accanto all'eseguibile o allo script)."""
+    return os.path.join(get_app_dir(), "config.json")
+
 def load_config():
     """Carica config.json. Se non esiste, lo crea con valori di default."""
-    app_dir = get_app_dir()
-    config_path = os.path.join(app_dir, "config.json")
+    config_path = get_config_path()
     
     # Struttura di base del JSON
     default_config = {
-        "custom_data_path": ""  # Se lasciato vuoto, userà AppData
+        "custom_data_path": "",  # Se lasciato vuoto, userà AppData
+        "backup_path": "",       # Se lasciato vuoto, userà la sottocartella 'backup' dei dati
+        "backup_interval_hours": 0, # 0 = backup automatico disattivato
+        "compact_documents": True,  # Documenti JSON senza spazi/a capo (file più piccoli)
+        "station_name": "",         # Nome mostrato alle altre postazioni (vuoto = nome del computer)
+        "index_workers": 8          # File letti in parallelo alla prima scansione dell'archivio
     }
 
     # 1. Crea il file se non esiste al primo avvio
@@ -52,19 +61,27 @@ def load_config():
         print(f"ERRORE: Impossibile leggere config.json ({e}). Uso impostazioni di default.")
         return default_config
 
-def get_data_dir():
+def resolve_data_dir(config=None):
     """
-    Ottiene la directory "sicura" per i dati utente (JSON, PDF, ODS).
-    Legge dal config.json, se è vuoto usa AppData come riserva.
+    Percorso della directory "sicura" per i dati utente (JSON), senza toccare il disco.
+    Usa il config passato (o legge config.json), se è vuoto usa AppData come riserva.
     """
-    config = load_config()
+    if config is None:
+        config = load_config()
     custom_path = config.get("custom_data_path", "").strip()
 
     # Se c'è un percorso nel config usiamo quello, altrimenti il fallback originale
     if custom_path:
-        path = custom_path
-    else:
-        path = os.path.join(os.environ['LOCALAPPDATA'], 'BomboniereMery')
+        return custom_path
+    return os.path.join(os.environ['LOCALAPPDATA'], 'BomboniereMery')
+
+def get_data_dir(config=None):
+    """
+    Ottiene la directory "sicura" per i dati utente (JSON), creandola se manca.
+    Può bloccare se la cartella è in rete: l'applicazione usa resolve_data_dir e crea
+    la cartella in background (SettingsService.ensure_data_dir).
+    """
+    path = resolve_data_dir(config)
     
     # Crea la cartella (e le sottocartelle necessarie) se non esiste
     try:
@@ -80,15 +97,22 @@ def get_data_dir():
 
 # Directory per le risorse interne (dentro _internal)
 RESOURCE_DIR = get_resource_dir()
-# Directory per i dati utente (Custom o AppData)
-DATA_DIR = get_data_dir()
 
 # Percorsi assoluti dei file risorsa (cercati in _internal)
 STYLE_PATH = os.path.join(RESOURCE_DIR, "style.qss")
 TEMPLATE_PATH = os.path.join(RESOURCE_DIR, "template.ods")
 ICON_PATH = os.path.join(RESOURCE_DIR, "icon.png")
 
-# Percorsi delle cartelle dati (create all'interno di DATA_DIR)
-ORDERS_DIR = os.path.join(DATA_DIR, "orders")
-QUOTES_DIR = os.path.join(DATA_DIR, "quotes")
-OUTPUT_DIR = os.path.join(DATA_DIR, "ordini_stampati")
\ No newline at end of file
+# NOTA: le cartelle dati (orders, quotes) NON sono più fissate qui all'import:
+# si leggono da core.settings.get_settings(), che le aggiorna a caldo.
+
+# Cartella locale della postazione: mai sulla cartella condivisa.
+LOCAL_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or tempfile.gettempdir(), "BomboniereMery")
+# Cache (indici, cataloghi): ricostruibili in qualsiasi momento.
+CACHE_DIR = os.path.join(LOCAL_DIR, "cache")
+# Bozze dell'ordine in compilazione, per il recupero dopo un arresto improvviso.
+DRAFTS_DIR = os.path.join(LOCAL_DIR, "bozze")
+
+# Le stampe generate (.ods/.pdf) sono temporanee e restano sulla postazione:
+# cartella locale nei file temporanei, mai sulla cartella condivisa.
+OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "BomboniereMery", "ordini_stampati")
\ No newline at end of file
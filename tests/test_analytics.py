@@ -0,0 +1,97 @@
+import os
+import sys
+import unittest
+from datetime import date
+from collections import namedtuple
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.analytics import ColumnStore
+from core.summaries import DocumentSummary
+
+# ======================================================================
+# --- REPORT: COLONNE E TOTALI PER GIORNO ---
+# Ogni ordine aggiunto o tolto deve spostare i totali per giorno di
+# esattamente il suo contributo: dopo aver tolto tutto non resta nulla.
+# ======================================================================
+
+Stat = namedtuple("Stat", "st_mtime st_size")
+
+def summary(ordered, ceremony, total, lines=(), flavours="", operator="Ketty"):
+    s = DocumentSummary.from_header({
+        "nome_cliente": "Rossi", "operatore": operator, "tipo_cerimonia": "Battesimo",
+        "tipo_confetti": flavours, "data_ordine": ordered, "data_cerimonia": ceremony, "totale": total,
+    }, "ordine", Stat(0, 0))
+    s.righe = [(ditta, "", "", qty, price) for ditta, qty, price in lines]
+    return s
+
+def ordinal(iso_date):
+    return date.fromisoformat(iso_date).toordinal()
+
+EVERYTHING = (1, date.max.toordinal())
+
+class ColumnStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = ColumnStore()
+        self.first = summary("2025-03-10", "2025-06-01", "30.00",
+                             lines=[("Maxtris", "2", "10,00"), ("Crispo", "1", "10,00")], flavours="Mandorla, Cioccolato")
+        self.second = summary("2025-04-02", "2025-06-01", "5.50", lines=[("maxtris ", "1", "5,50")], flavours="Mandorla")
+
+    def totals(self, group, field="data_ordine", lo=EVERYTHING[0], hi=EVERYTHING[1]):
+        labels = (lambda k: k) if group == "mese" else self.store.dicts[group].labels.__getitem__
+        return {labels(k): v for k, v in self.store.period_totals(field, group, lo, hi).items()}
+
+    def test_period_totals_by_group(self):
+        self.store.append("a.json", self.first)
+        self.store.append("b.json", self.second)
+
+        self.assertEqual(self.totals("mese"), {202503: [3000, 3.0, 1], 202504: [550, 1.0, 1]})
+        # Ditta: solo le righe di quella ditta (nome normalizzato), l'ordine conta una volta per ditta
+        self.assertEqual(self.totals("ditta"), {"MAXTRIS": [2550, 3.0, 2], "CRISPO": [1000, 1.0, 1]})
+        # Tipo confetti: l'ordine conta per intero in ogni tipo scelto
+        self.assertEqual(self.totals("tipo_confetti"), {"Mandorla": [3550, 4.0, 2], "Cioccolato": [3000, 3.0, 1]})
+        self.assertEqual(self.totals("operatore"), {"Ketty": [3550, 4.0, 2]})
+        # Per data cerimonia i due ordini cadono nello stesso giorno
+        self.assertEqual(self.totals("mese", field="data_cerimonia"), {202506: [3550, 4.0, 2]})
+
+    def test_period_bounds_are_inclusive(self):
+        self.store.append("a.json", self.first)
+        self.store.append("b.json", self.second)
+        day = ordinal("2025-04-02")
+        self.assertEqual(self.totals("mese", lo=day, hi=day), {202504: [550, 1.0, 1]})
+        self.assertEqual(self.totals("mese", lo=ordinal("2025-03-11"), hi=day - 1), {})
+
+    def test_orders_without_date_are_left_out(self):
+        self.store.append("a.json", summary("", "2025-06-01", "12.00"))
+        self.assertEqual(self.totals("mese"), {})
+        self.assertEqual(self.totals("mese", field="data_cerimonia"), {202506: [1200, 0.0, 1]})
+
+    def test_remove_leaves_nothing_behind(self):
+        self.store.append("a.json", self.first)
+        self.store.append("b.json", self.second)
+        self.store.remove("a.json")
+        self.assertEqual(self.totals("ditta"), {"MAXTRIS": [550, 1.0, 1]})
+        self.assertEqual(self.store.days["data_ordine"], [ordinal("2025-04-02")])
+
+        self.store.remove("b.json")
+        self.store.remove("b.json") # Già tolto: nessun effetto
+        for field in self.store.totals:
+            self.assertEqual(self.store.days[field], [])
+            for group, by_day in self.store.totals[field].items():
+                self.assertEqual(by_day, {}, (field, group))
+        self.assertEqual((len(self.store), self.store.dead), (0, 2))
+
+    def test_update_replaces_contribution(self):
+        self.store.append("a.json", self.first)
+        changed = summary("2025-03-10", "2025-06-01", "20.00", lines=[("Crispo", "2", "10,00")])
+        self.store.update({"a.json": changed, "b.json": self.second})
+        self.assertEqual(self.totals("ditta"), {"MAXTRIS": [550, 1.0, 1], "CRISPO": [2000, 2.0, 1]})
+        self.assertEqual(self.totals("mese"), {202503: [2000, 2.0, 1], 202504: [550, 1.0, 1]})
+
+        self.store.update({"b.json": None})
+        self.assertEqual(self.totals("mese"), {202503: [2000, 2.0, 1]})
+        self.assertEqual(self.store.dead, 2) # Righe vecchie spente, non riutilizzate
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import random
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.prefix_index import PrefixIndex, normalize
+from core.catalog import ProductCatalog
+
+# ======================================================================
+# --- SUGGERIMENTI: INDICE PER PREFISSO E CATALOGO ---
+# L'indice per prefisso deve dare gli stessi risultati di una ricerca
+# lineare; il catalogo deve seguire le descrizioni rinominate senza
+# lasciare indietro chiavi che suggeriscono ancora il nome vecchio.
+# ======================================================================
+
+class PrefixIndexTest(unittest.TestCase):
+    def test_lookup_matches_linear_search(self):
+        rng = random.Random(7)
+        words = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(300)]
+        index = PrefixIndex()
+        index.rebuild([(word, i % 50) for i, word in enumerate(words)])
+        for prefix in ("", "a", "ab", "cab", "bbbb", "z"):
+            expected = []
+            for word, entry_id in sorted((w, i % 50) for i, w in enumerate(words)):
+                if word.startswith(prefix) and entry_id not in expected:
+                    expected.append(entry_id)
+            self.assertEqual(index.lookup(prefix, 1000), expected, prefix)
+            self.assertEqual(index.lookup(prefix, 5), expected[:5], prefix)
+
+    def test_add_keeps_order_and_skips_duplicates(self):
+        index = PrefixIndex()
+        for key, entry_id in (("mela", 1), ("banana", 2), ("mela", 3), ("mela", 1), ("melone", 4)):
+            index.add(key, entry_id)
+        self.assertEqual(index.keys, sorted(index.keys))
+        self.assertEqual(len(index.keys), 4)
+        self.assertEqual(index.lookup("mel", 10), [1, 3, 4])
+
+    def test_remove_only_that_pair(self):
+        index = PrefixIndex()
+        index.rebuild([("mela", 1), ("mela", 3), ("melone", 4)])
+        index.remove("mela", 3)
+        index.remove("mela", 99) # Coppia assente: nessun effetto
+        index.remove("pera", 1)
+        self.assertEqual(index.lookup("mel", 10), [1, 4])
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  Scatola   BIANCA\t"), "scatola bianca")
+        self.assertEqual(normalize(None), "")
+
+def document(day, *lines):
+    """Riepilogo minimo come lo passa l'indice: righe (ditta, codice, descrizione, quantità, prezzo)."""
+    return SimpleNamespace(data_ordine=day, righe=[(d, c, descr, "1", p) for d, c, descr, p in lines])
+
+class FakeIndex:
+    def __init__(self):
+        self.entries = {}
+        self.data_dir = "/non/esiste"
+
+    def add_listener(self, callback):
+        pass
+
+    def add_lines_listener(self, callback):
+        pass
+
+class CatalogRenameTest(unittest.TestCase):
+    def setUp(self):
+        # Niente letture in background: i documenti arrivano solo da on_index_changed
+        for target in ("core.catalog.load_lines_async", "core.catalog.get_data_io"):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.catalog = ProductCatalog(FakeIndex())
+
+    def add(self, path, summary):
+        self.catalog.on_index_changed({path: summary}, [], False)
+
+    def descriptions(self, prefix):
+        return [e.descrizione for e in self.catalog.complete_description(prefix)]
+
+    def test_newer_description_replaces_old_words(self):
+        self.add("a.json", document(100, ("Ditta", "A1", "Scatola bianca grande", "2,00")))
+        self.add("b.json", document(200, ("Ditta", "A1", "Portaconfetti rosa", "2,50")))
+
+        self.assertEqual(self.descriptions("portac"), ["Portaconfetti rosa"])
+        self.assertEqual(self.descriptions("rosa"), ["Portaconfetti rosa"])
+        for old_word in ("scatola", "bianca", "grande"):
+            self.assertEqual(self.descriptions(old_word), [], old_word)
+        entries = self.catalog.complete_code("a1")
+        self.assertEqual([(e.descrizione, e.prezzo) for e in entries], [("Portaconfetti rosa", "2,50")])
+        # Nessuna chiave rimasta indietro: indice uguale a uno ricostruito da zero
+        keys = (list(self.catalog.by_description.keys), list(self.catalog.by_description.ids))
+        self.catalog._rebuild_prefix_indexes()
+        self.assertEqual(keys, (self.catalog.by_description.keys, self.catalog.by_description.ids))
+
+    def test_older_document_does_not_rename(self):
+        self.add("b.json", document(200, ("Ditta", "A1", "Portaconfetti rosa", "2,50")))
+        self.add("a.json", document(100, ("Ditta", "A1", "Scatola bianca", "2,00")))
+        self.assertEqual(self.descriptions("scatola"), [])
+        self.assertEqual(self.descriptions("rosa"), ["Portaconfetti rosa"])
+
+    def test_same_description_is_not_duplicated(self):
+        self.add("a.json", document(100, ("Ditta", "A1", "Nastro raso", "1,00")))
+        self.add("b.json", document(200, ("Ditta", "A1", "Nastro raso", "1,20")))
+        self.assertEqual(len(self.catalog.by_description.keys), 2) # "nastro raso" e "raso"
+        self.assertEqual(self.catalog.complete_code("a1")[0].prezzo, "1,20")
+
+    def test_empty_description_keeps_the_old_one(self):
+        self.add("a.json", document(100, ("Ditta", "A1", "Nastro raso", "1,00")))
+        self.add("b.json", document(200, ("Ditta", "A1", "", "1,20")))
+        self.assertEqual(self.descriptions("raso"), ["Nastro raso"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QCoreApplication
+
+from core import change_feed
+from core.change_feed import FEED_FOLDER, ChangeFeed, record_changes
+
+# ======================================================================
+# --- REGISTRO MODIFICHE: CAMBIO DI GENERAZIONE ---
+# Oltre MAX_LOG_BYTES si passa al registro successivo: chi scrive elimina
+# quello di due generazioni prima, chi legge finisce il vecchio e prosegue
+# nel nuovo; chi è rimasto troppo indietro chiede una scansione completa.
+# ======================================================================
+
+# Registri piccoli: due righe bastano per passare alla generazione successiva
+TEST_LOG_BYTES = 200
+
+class FakeIndex:
+    """Quanto serve a ChangeFeed dell'indice: cartella, listener e lettura di un riepilogo."""
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.entries = {}
+
+    def add_listener(self, callback):
+        pass
+
+    def read_entry(self, path):
+        return os.path.basename(path)
+
+class RolloverTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.folder = os.path.join(self.data_dir, FEED_FOLDER)
+        for target, value in (("station_name", mock.Mock(return_value="Test")),
+                              ("MAX_LOG_BYTES", TEST_LOG_BYTES)):
+            patcher = mock.patch.object(change_feed, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.count = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def save(self, station="altra-postazione"):
+        """Una riga di registro scritta da un'altra postazione; ritorna la generazione in uso dopo."""
+        self.count += 1
+        path = os.path.join(self.data_dir, "orders", f"Ordine_{self.count}.json")
+        with mock.patch.object(change_feed, "STATION_ID", station):
+            record_changes(saved=[path], data_dir=self.data_dir)
+        return change_feed._current_generation(self.folder)
+
+    def logs(self):
+        return sorted(name for name in os.listdir(self.folder) if name.endswith(".jsonl"))
+
+    def make_feed(self):
+        feed = ChangeFeed(FakeIndex(self.data_dir), io=None)
+        feed.timer.stop()
+        return feed
+
+    def test_writer_rotates_and_drops_old_logs(self):
+        while self.save() == 0:
+            pass
+        self.assertEqual(self.logs(), ["registro_0.jsonl"]) # Il nuovo nasce alla prossima scrittura
+        self.save()
+        self.assertEqual(self.logs(), ["registro_0.jsonl", "registro_1.jsonl"])
+
+        # Alla generazione 2 il registro 0 non serve più a nessuno
+        while self.save() == 1:
+            pass
+        self.save()
+        self.assertEqual(self.logs(), ["registro_1.jsonl", "registro_2.jsonl"])
+
+    def test_reader_follows_into_next_generation(self):
+        self.save()
+        feed = self.make_feed()
+        position, records, _summaries, rescan = feed._read_new(self.folder, self.data_dir, (0, 0))
+        self.assertEqual(len(records), 1)
+        self.assertFalse(rescan)
+
+        while self.save() == 0:
+            pass
+        self.save() # Prima riga del registro 1 (il registro 0 c'è ancora)
+        position, records, summaries, rescan = feed._read_new(self.folder, self.data_dir, position)
+        self.assertFalse(rescan)
+        self.assertEqual([r["file"] for r in records], [f"orders/Ordine_{n}.json" for n in range(2, self.count + 1)])
+        self.assertEqual(position, (1, os.path.getsize(os.path.join(self.folder, "registro_1.jsonl"))))
+        self.assertEqual(len(summaries), self.count - 1)
+
+        # Niente di nuovo: stessa posizione, nessuna riga
+        self.assertEqual(feed._read_new(self.folder, self.data_dir, position)[:2], (position, []))
+
+    def test_own_lines_are_not_read_back(self):
+        self.save(station=change_feed.STATION_ID)
+        feed = self.make_feed()
+        _position, records, summaries, _rescan = feed._read_new(self.folder, self.data_dir, (0, 0))
+        self.assertEqual(len(records), 1)
+        self.assertEqual(summaries, {})
+
+    def test_reader_left_behind_asks_for_full_scan(self):
+        self.save()
+        while self.save() < 2:
+            pass
+        self.save()
+        position, records, _summaries, rescan = self.make_feed()._read_new(self.folder, self.data_dir, (0, 0))
+        self.assertTrue(rescan)
+        self.assertEqual(records, [])
+        self.assertEqual(position, (2, 0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import cold_archive
+from core.cold_archive import PACK_MAGIC, ColdArchive, pack_year, pack_path, split_packed, is_packed
+from core.documents import write_document, read_document
+
+# ======================================================================
+# --- ARCHIVIO ANNUALE: FORMATO DEL FILE .pack ---
+# Andata e ritorno: ordini scritti in orders/, spostati nell'archivio
+# dell'anno e riletti dall'archivio (intestazioni e contenuto completo).
+# ======================================================================
+
+def make_order(customer, ceremony, price="10.00"):
+    return {
+        "info_ordine": {"tipo_documento": "ordine", "data_ordine": "2024-01-10",
+                        "data_cerimonia": ceremony, "operatore": "Ketty", "tipo_cerimonia": "Battesimo"},
+        "dati_cliente": {"nome_cliente": customer, "telefono_cliente": "3331234567"},
+        "dettagli_ordine": [{"ditta": "Ditta", "codice": "A1", "descrizione": "Scatolina",
+                             "quantita": "2", "prezzo_unitario": price}],
+    }
+
+class PackYearTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.orders = os.path.join(self.data_dir, "orders")
+        os.makedirs(self.orders)
+        # Lettura sempre dal disco: niente riepiloghi rimasti da un test precedente
+        cold_archive._cold_archive = None
+        # Il registro delle modifiche chiede il nome della postazione alle impostazioni (config.json)
+        patcher = mock.patch("core.change_feed.station_name", return_value="Test")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_orders(self, *orders):
+        paths = []
+        for name, document in orders:
+            path = os.path.join(self.orders, name)
+            write_document(path, document, compact=True)
+            paths.append(path)
+        return paths
+
+    def test_file_layout(self):
+        paths = self.write_orders(("Ordine_Rossi.json", make_order("Rossi", "2024-05-01")),
+                                  ("Ordine_Bianchi.json", make_order("Bianchi", "2024-06-01")))
+        pack_year(paths, self.data_dir, 2024)
+
+        with open(pack_path(self.data_dir, 2024), 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[:len(PACK_MAGIC)], PACK_MAGIC)
+        offset, length, magic = struct.unpack_from("<QQ8s", data, len(data) - struct.calcsize("<QQ8s"))
+        self.assertEqual(magic, PACK_MAGIC)
+        index = json.loads(cold_archive.zlib.decompress(data[offset:offset + length]))
+        self.assertEqual(index["anno"], 2024)
+        self.assertEqual([entry[0] for entry in index["documenti"]], ["Ordine_Rossi.json", "Ordine_Bianchi.json"])
+        # Ogni tratto indicato dall'indice è il file originale compresso, uno dopo l'altro
+        end = len(PACK_MAGIC)
+        for name, doc_offset, doc_length, header in index["documenti"]:
+            self.assertEqual(doc_offset, end)
+            content = json.loads(cold_archive.zlib.decompress(data[doc_offset:doc_offset + doc_length]))
+            self.assertEqual(content["dati_cliente"]["nome_cliente"], header["nome_cliente"])
+            end = doc_offset + doc_length
+        self.assertEqual(end, offset)
+
+    def test_round_trip(self):
+        originals = {
+            "Ordine_Rossi.json": make_order("Rossi", "2024-05-01", "1.50"),
+            "Ordine_Verdi.json": make_order("Verdi", "2024-09-12", "3.20"),
+        }
+        paths = self.write_orders(*originals.items())
+        expected = {os.path.basename(path): read_document(path) for path in paths}
+        steps = []
+
+        result = pack_year(paths, self.data_dir, 2024, progress=lambda done, total: steps.append((done, total)))
+
+        self.assertEqual(sorted(result.removed), sorted(paths))
+        self.assertEqual(result.errors, [])
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertEqual(steps[-1][0], steps[-1][1])
+
+        docs = ColdArchive().documents(self.data_dir)
+        self.assertEqual(len(docs), 2)
+        for path, summary in docs:
+            self.assertTrue(is_packed(path))
+            pack, name = split_packed(path)
+            self.assertEqual(pack, pack_path(self.data_dir, 2024))
+            self.assertEqual(summary.nome_cliente, originals[name]["dati_cliente"]["nome_cliente"])
+            self.assertEqual(cold_archive.read_any(path), expected[name])
+
+    def test_append_to_existing_pack(self):
+        first = self.write_orders(("Ordine_Rossi.json", make_order("Rossi", "2024-05-01")))
+        pack_year(first, self.data_dir, 2024)
+        # Stesso nome di file: il secondo prende un suffisso, il primo resta leggibile
+        second = self.write_orders(("Ordine_Rossi.json", make_order("Rossi bis", "2024-07-01")),
+                                   ("Ordine_Neri.json", make_order("Neri", "2024-08-01")))
+        steps = []
+        pack_year(second, self.data_dir, 2024, progress=lambda done, total: steps.append((done, total)))
+
+        docs = dict(ColdArchive().documents(self.data_dir))
+        names = sorted(split_packed(path)[1] for path in docs)
+        self.assertEqual(names, ["Ordine_Neri.json", "Ordine_Rossi.json", "Ordine_Rossi_1.json"])
+        customers = {split_packed(path)[1]: cold_archive.read_any(path)["dati_cliente"]["nome_cliente"] for path in docs}
+        self.assertEqual(customers["Ordine_Rossi.json"], "Rossi")
+        self.assertEqual(customers["Ordine_Rossi_1.json"], "Rossi bis")
+        # Avanzamento anche durante la copia dei documenti già archiviati
+        self.assertEqual(steps[0], (1, 4))
+        self.assertEqual(steps[-1], (4, 4))
+        self.assertFalse([name for name in os.listdir(os.path.dirname(pack_path(self.data_dir, 2024)))
+                          if name.endswith(".tmp")])
+
+    def test_missing_document(self):
+        paths = self.write_orders(("Ordine_Rossi.json", make_order("Rossi", "2024-05-01")))
+        pack = pack_path(self.data_dir, 2024)
+        pack_year(paths, self.data_dir, 2024)
+        with self.assertRaises(FileNotFoundError):
+            cold_archive.read_any(pack + "|Ordine_Assente.json")
+
+    def test_invalid_pack(self):
+        os.makedirs(os.path.dirname(pack_path(self.data_dir, 2023)))
+        broken = pack_path(self.data_dir, 2023)
+        with open(broken, 'wb') as f:
+            f.write(PACK_MAGIC + b"non un archivio" + b"\0" * 32)
+        archive = ColdArchive()
+        # Un archivio rovinato si salta nell'elenco, ma la lettura diretta dà errore
+        self.assertEqual(archive.documents(self.data_dir), [])
+        with self.assertRaises(ValueError):
+            archive.read(broken + "|Ordine.json")
+
+    def test_truncated_pack(self):
+        paths = self.write_orders(("Ordine_Rossi.json", make_order("Rossi", "2024-05-01")))
+        pack_year(paths, self.data_dir, 2024)
+        pack = pack_path(self.data_dir, 2024)
+        with open(pack, 'r+b') as f:
+            f.truncate(os.path.getsize(pack) - 4)
+        with self.assertRaises(ValueError):
+            ColdArchive().read(pack + "|Ordine_Rossi.json")
+
+if __name__ == "__main__":
+    unittest.main()
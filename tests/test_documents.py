@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.documents import (
+    HEADER_KEY, HEADER_FIRST_READ, HEADER_READ_LIMIT, write_document, read_header, read_document
+)
+from core.schema import SCHEMA_KEY, SCHEMA_VERSION
+
+# ======================================================================
+# --- INTESTAZIONE IN PRIMA RIGA ---
+# Andata e ritorno: quello che write_document mette in prima riga deve
+# tornare uguale da read_header (senza leggere il resto del file), e il
+# file deve restare un JSON valido per read_document.
+# ======================================================================
+
+def make_document(customer="Rossi", doc_type="ordine"):
+    return {
+        "info_ordine": {"tipo_documento": doc_type, "data_ordine": "2025-01-10", "data_cerimonia": "2025-06-01",
+                        "data_consegna": "2025-05-30", "operatore": "Ketty", "tipo_cerimonia": "Battesimo",
+                        "tipo_confetti": "Mandorla", "acconto1_importo": "5,00"},
+        "dati_cliente": {"nome_cliente": customer, "telefono_cliente": "3331234567"},
+        "dettagli_ordine": [{"ditta": "Ditta", "codice": "A1", "descrizione": "Scatolina",
+                             "quantita": "2", "prezzo_unitario": "10,50"}],
+    }
+
+class HeaderRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "Ordine_Rossi.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_header_fields(self):
+        for compact in (True, False):
+            path = os.path.join(self.folder, f"Ordine_{compact}.json")
+            write_document(path, make_document(), compact=compact)
+            self.assertEqual(read_header(path), {
+                "revisione": 1, "tipo_documento": "ordine", "nome_cliente": "Rossi",
+                "telefono_cliente": "3331234567", "data_ordine": "2025-01-10", "data_cerimonia": "2025-06-01",
+                "data_consegna": "2025-05-30", "operatore": "Ketty", "tipo_cerimonia": "Battesimo",
+                "tipo_confetti": "Mandorla", "totale": "21.00", "acconti": "5.00", "saldo": "16.00",
+            }, compact)
+
+    def test_file_stays_valid_json(self):
+        document = make_document()
+        write_document(self.path, document, compact=False)
+        with open(self.path, encoding='utf-8') as f:
+            first_line = f.readline()
+            data = json.loads(first_line + f.read())
+        self.assertTrue(first_line.startswith('{"' + HEADER_KEY + '":'))
+        self.assertEqual(data[HEADER_KEY], document[HEADER_KEY])
+        self.assertEqual(data[SCHEMA_KEY], SCHEMA_VERSION)
+        self.assertEqual(read_document(self.path)["dettagli_ordine"], document["dettagli_ordine"])
+
+    def test_revision_grows_with_each_save(self):
+        document = make_document()
+        for revision in (1, 2, 3):
+            write_document(self.path, document, compact=True)
+            self.assertEqual(read_header(self.path)["revisione"], revision)
+            self.assertEqual(document[HEADER_KEY]["revisione"], revision)
+
+    def test_text_that_needs_escaping(self):
+        # Virgolette, a capo e caratteri non ASCII: la prima riga deve restare una riga sola
+        name = 'Rossi "Mary"\nPàola 😀'
+        write_document(self.path, make_document(customer=name), compact=True)
+        self.assertEqual(read_header(self.path)["nome_cliente"], name)
+
+    def test_long_header_is_read_in_more_blocks(self):
+        name = "R" * (HEADER_FIRST_READ * 2)
+        write_document(self.path, make_document(customer=name), compact=True)
+        self.assertEqual(read_header(self.path)["nome_cliente"], name)
+
+    def test_header_over_limit_falls_back(self):
+        write_document(self.path, make_document(customer="R" * HEADER_READ_LIMIT), compact=True)
+        self.assertIsNone(read_header(self.path))
+        self.assertEqual(read_document(self.path)["dati_cliente"]["nome_cliente"], "R" * HEADER_READ_LIMIT)
+
+    def test_previous_format_has_no_header(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(make_document(), f, indent=4)
+        self.assertIsNone(read_header(self.path))
+        # Riscritto: l'intestazione compare e la revisione parte da 1
+        write_document(self.path, read_document(self.path), compact=True)
+        self.assertEqual(read_header(self.path)["revisione"], 1)
+
+    def test_damaged_first_line(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"' + HEADER_KEY + '":{"nome_cliente":"Ros\n')
+        self.assertIsNone(read_header(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import sys
+import copy
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.history import diff, apply_delta, tracked_state, record_revision, revisions, read_history, describe_changes
+from core.documents import write_document
+
+# ======================================================================
+# --- STORICO DELLE REVISIONI: DIFFERENZE ---
+# Andata e ritorno: applicare a uno stato le sue differenze dal successivo
+# deve dare esattamente il successivo, anche dopo il passaggio per il
+# registro (JSON). Sul disco: ogni revisione si ricostruisce dal registro.
+# ======================================================================
+
+def line(descrizione, quantita="1", prezzo="10,00", **extra):
+    return {"ditta": "Ditta", "codice": "", "descrizione": descrizione,
+            "quantita": quantita, "prezzo_unitario": prezzo, **extra}
+
+def state(customer="Rossi", phone="333", lines=(), **info):
+    return {
+        "dati_cliente": {"nome_cliente": customer, "telefono_cliente": phone},
+        "info_ordine": {"tipo_documento": "ordine", "data_ordine": "2025-01-10", **info},
+        "dettagli_ordine": [dict(l) for l in lines],
+    }
+
+# Una serie di revisioni che tocca ogni caso: campi cambiati, aggiunti e tolti, righe in più e in meno
+SEQUENCE = [
+    {},
+    state(lines=[line("Scatolina")]),
+    state(phone="444", lines=[line("Scatolina", "2"), line("Nastro")], colore_nastri="Rosa"),
+    state(phone="444", lines=[line("Nastro"), line("Scatolina", "2"), line("Bigliettini", "50", "0,20")]),
+    state(customer="Rossi Mario", lines=[line("Nastro")], colore_nastri="Rosa"),
+    state(customer="Rossi Mario", lines=[]),
+]
+
+class DiffTest(unittest.TestCase):
+    def test_round_trip(self):
+        for before, after in zip(SEQUENCE, SEQUENCE[1:]):
+            self.assertEqual(apply_delta(before, diff(before, after)), tracked_state(after))
+
+    def test_round_trip_through_json(self):
+        # Nel registro gli indici delle righe diventano stringhe: devono funzionare lo stesso
+        current = {}
+        for after in SEQUENCE[1:]:
+            delta = json.loads(json.dumps(diff(current, after)))
+            current = apply_delta(current, delta)
+            self.assertEqual(current, tracked_state(after))
+
+    def test_only_changes_are_recorded(self):
+        self.assertEqual(diff(SEQUENCE[2], copy.deepcopy(SEQUENCE[2])), {})
+        delta = diff(SEQUENCE[1], SEQUENCE[2])
+        self.assertEqual(delta["dati_cliente"], {"+": {"telefono_cliente": "444"}})
+        self.assertEqual(delta["info_ordine"], {"+": {"colore_nastri": "Rosa"}})
+        self.assertEqual(delta["dettagli_ordine"]["n"], 2)
+        self.assertEqual(set(delta["dettagli_ordine"]["righe"]), {"0", "1"})
+        self.assertEqual(delta["dettagli_ordine"]["righe"]["0"], {"+": {"quantita": "2"}})
+
+    def test_removed_fields(self):
+        delta = diff(SEQUENCE[2], SEQUENCE[3])
+        self.assertEqual(delta["info_ordine"], {"-": ["colore_nastri"]})
+        self.assertNotIn("colore_nastri", apply_delta(SEQUENCE[2], delta)["info_ordine"])
+
+    def test_shorter_list_only_changes_count(self):
+        before = state(lines=[line("A"), line("B"), line("C")])
+        after = state(lines=[line("A")])
+        self.assertEqual(diff(before, after), {"dettagli_ordine": {"n": 1, "righe": {}}})
+
+    def test_apply_does_not_touch_input(self):
+        before = copy.deepcopy(SEQUENCE[2])
+        apply_delta(before, diff(before, SEQUENCE[3]))
+        self.assertEqual(before, SEQUENCE[2])
+
+    def test_description(self):
+        changes = describe_changes(tracked_state(SEQUENCE[1]), tracked_state(SEQUENCE[2]))
+        self.assertIn("Telefono: «333» → «444»", changes)
+        self.assertIn("Riga 1 quantità: «1» → «2»", changes)
+        self.assertIn("Riga 2 aggiunta: Nastro (1 × 10,00)", changes)
+
+class RecordRevisionTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.data_dir, "orders"))
+        os.makedirs(os.path.join(self.data_dir, "quotes"))
+        self.path = os.path.join(self.data_dir, "orders", "Ordine_Rossi.json")
+        # Il nome della postazione viene dalle impostazioni (config.json)
+        patcher = mock.patch("core.history.station_name", return_value="Test")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def save(self, path, document, **kwargs):
+        created = not os.path.exists(path)
+        write_document(path, document, compact=True)
+        record_revision(path, document, created=created, **kwargs)
+
+    def test_every_revision_is_rebuilt(self):
+        saved = []
+        for document in SEQUENCE[1:]:
+            document = copy.deepcopy(document)
+            self.save(self.path, document)
+            saved.append(tracked_state(document))
+        history = revisions(self.path)
+        self.assertEqual([rebuilt for _record, rebuilt in history], saved)
+        self.assertEqual([record["revisione"] for record, _rebuilt in history], [1, 2, 3, 4, 5])
+        self.assertEqual(history[0][0]["postazione"], "Test")
+
+    def test_save_without_changes_adds_nothing(self):
+        document = copy.deepcopy(SEQUENCE[1])
+        self.save(self.path, document)
+        self.save(self.path, document)
+        self.assertEqual(len(read_history(self.path)), 1)
+
+    def test_new_document_does_not_inherit_old_history(self):
+        self.save(self.path, copy.deepcopy(SEQUENCE[1]))
+        self.save(self.path, copy.deepcopy(SEQUENCE[2]))
+        os.remove(self.path) # Eliminato senza ripulire lo storico: un omonimo nuovo riparte da capo
+        document = copy.deepcopy(SEQUENCE[4])
+        self.save(self.path, document)
+        self.assertEqual([rebuilt for _record, rebuilt in revisions(self.path)], [tracked_state(document)])
+
+    def test_confirmed_quote_continues_its_history(self):
+        quote = os.path.join(self.data_dir, "quotes", "Preventivo_Rossi.json")
+        self.save(quote, state(lines=[line("Scatolina")], tipo_documento="preventivo"))
+        order = state(lines=[line("Scatolina")])
+        self.save(self.path, order, previous_path=quote)
+        history = revisions(self.path)
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[1][0]["modifiche"], {"info_ordine": {"+": {"tipo_documento": "ordine"}}})
+        self.assertEqual(len(read_history(quote)), 1) # L'originale non viene toccato
+
+if __name__ == "__main__":
+    unittest.main()
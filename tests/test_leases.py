@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QCoreApplication
+
+from core.leases import (
+    LEASE_TTL, LeaseHeld, LeaseKeeper, lease_path, read_lease, holder_of, acquire, renew, release
+)
+from core.change_feed import STATION_ID
+
+# ======================================================================
+# --- DOCUMENTI IN MODIFICA (LEASE) ---
+# Un lease vale finché non scade (poi il documento torna libero da solo),
+# lo rilascia solo chi lo ha preso, e chi lo passa a un salvataggio in
+# background smette di rinnovarlo senza cancellarlo.
+# ======================================================================
+
+class FakeIO:
+    """Esegue subito quello che DataIO manderebbe in background."""
+    online = True
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, func, *args, on_done=None, on_error=None, **kwargs):
+        self.calls.append((func, args))
+        try:
+            result = func(*args)
+        except Exception as e:
+            if on_error:
+                on_error(e)
+        else:
+            if on_done:
+                on_done(result)
+
+class LeaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.doc = os.path.join(self.folder, "Ordine_Rossi.json")
+        # Il nome della postazione viene dalle impostazioni (config.json)
+        patcher = mock.patch("core.leases.station_name", return_value="Banco")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def write_other(self, expires_in, name="Laboratorio"):
+        """Lease di un'altra postazione che scade tra expires_in secondi."""
+        with open(lease_path(self.doc), 'w', encoding='utf-8') as f:
+            json.dump({"postazione": "altra-postazione", "nome": name, "scade": time.time() + expires_in}, f)
+
+class LeaseTest(LeaseTestCase):
+    def test_acquire_and_release(self):
+        self.assertIsNone(acquire(self.doc))
+        lease = read_lease(self.doc)
+        self.assertEqual((lease["postazione"], lease["nome"]), (STATION_ID, "Banco"))
+        self.assertIsNone(holder_of(self.doc)) # Il nostro lease non ci blocca
+        self.assertIsNone(acquire(self.doc))   # Riaprirlo rinnova e basta
+        release(self.doc)
+        self.assertFalse(os.path.exists(lease_path(self.doc)))
+
+    def test_held_by_another_station(self):
+        self.write_other(LEASE_TTL)
+        self.assertEqual(holder_of(self.doc), "Laboratorio")
+        self.assertEqual(acquire(self.doc), "Laboratorio")
+        with self.assertRaises(LeaseHeld) as raised:
+            renew(self.doc)
+        self.assertEqual(raised.exception.holder, "Laboratorio")
+
+    def test_expired_lease_frees_the_document(self):
+        self.write_other(-1)
+        self.assertIsNone(read_lease(self.doc))
+        self.assertIsNone(holder_of(self.doc))
+        self.assertIsNone(acquire(self.doc))
+        self.assertEqual(read_lease(self.doc)["postazione"], STATION_ID)
+
+    def test_lease_expires_after_ttl(self):
+        acquire(self.doc)
+        now = time.time()
+        with mock.patch("core.leases.time.time", return_value=now + LEASE_TTL - 1):
+            self.assertIsNotNone(read_lease(self.doc))
+        with mock.patch("core.leases.time.time", return_value=now + LEASE_TTL + 1):
+            self.assertIsNone(read_lease(self.doc))
+
+    def test_renew_moves_expiry_forward(self):
+        acquire(self.doc)
+        first = read_lease(self.doc)["scade"]
+        with mock.patch("core.leases.time.time", return_value=time.time() + 60):
+            renew(self.doc)
+        self.assertGreater(read_lease(self.doc)["scade"], first)
+
+    def test_release_only_by_owner(self):
+        self.write_other(LEASE_TTL)
+        release(self.doc)
+        self.assertEqual(holder_of(self.doc), "Laboratorio")
+
+    def test_damaged_lease_is_ignored(self):
+        with open(lease_path(self.doc), 'w', encoding='utf-8') as f:
+            f.write('{"postazione": "altra')
+        self.assertIsNone(holder_of(self.doc))
+        release(self.doc) # Nessun errore
+
+class LeaseKeeperTest(LeaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.io = FakeIO()
+        self.keeper = LeaseKeeper(self.io)
+        self.addCleanup(self.keeper.deleteLater)
+
+    def test_hand_over_keeps_the_lease(self):
+        acquire(self.doc)
+        self.keeper.hold(self.doc)
+        self.assertTrue(self.keeper.heartbeat.isActive())
+
+        self.assertEqual(self.keeper.hand_over(), self.doc)
+        self.assertIsNone(self.keeper.held)
+        self.assertFalse(self.keeper.heartbeat.isActive())
+        self.assertEqual(read_lease(self.doc)["postazione"], STATION_ID)
+        # Più nulla da rilasciare: né drop né la chiusura del programma lo toccano
+        self.keeper.drop()
+        self.keeper.release_now()
+        self.assertEqual(self.io.calls, [])
+        self.assertTrue(os.path.exists(lease_path(self.doc)))
+
+    def test_drop_releases(self):
+        acquire(self.doc)
+        self.keeper.hold(self.doc)
+        self.keeper.drop()
+        self.assertFalse(os.path.exists(lease_path(self.doc)))
+        self.assertFalse(self.keeper.heartbeat.isActive())
+
+    def test_lost_lease(self):
+        acquire(self.doc)
+        self.keeper.hold(self.doc)
+        self.write_other(LEASE_TTL)
+        lost = []
+        self.keeper.lost.connect(lambda doc, holder: lost.append((doc, holder)))
+        self.keeper.renew()
+        self.assertEqual(lost, [(self.doc, "Laboratorio")])
+        self.assertIsNone(self.keeper.held)
+        self.assertFalse(self.keeper.heartbeat.isActive())
+
+    def test_watched_document_released(self):
+        self.write_other(LEASE_TTL)
+        self.keeper.watch(self.doc)
+        released = []
+        self.keeper.released.connect(released.append)
+        self.keeper.check_watched()
+        self.assertEqual(released, [])
+
+        os.remove(lease_path(self.doc))
+        self.keeper.check_watched()
+        self.assertEqual(released, [self.doc])
+        self.assertFalse(self.keeper.watch_timer.isActive())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.schema import SCHEMA_KEY, SCHEMA_VERSION, INFO_FIELDS, CUSTOMER_FIELDS, LINE_FIELDS, migrate, migrate_archive
+from core.documents import read_header, is_compact_text
+
+# ======================================================================
+# --- VERSIONE DEL FORMATO: CATENA DI MIGRAZIONI ---
+# Un documento di qualunque versione precedente arriva all'ultima
+# passando per tutte le migrazioni, una alla volta; uno già aggiornato
+# (o di una versione futura) non viene toccato.
+# ======================================================================
+
+def old_document():
+    """Documento dei primi tempi: nessuna versione, campi aggiunti dopo mancanti."""
+    return {
+        "info_ordine": {"tipo_documento": "ordine", "data_ordine": "2023-02-01", "acconto1_importo": "5"},
+        "dati_cliente": {"nome_cliente": "Rossi"},
+        "dettagli_ordine": [{"ditta": "Ditta", "quantita": "2", "prezzo_unitario": "10,50"}],
+    }
+
+class MigrateTest(unittest.TestCase):
+    def test_unversioned_document_reaches_last_version(self):
+        document = old_document()
+        self.assertTrue(migrate(document))
+        self.assertEqual(document[SCHEMA_KEY], SCHEMA_VERSION)
+
+        # Versione 0 -> 1: tutti i campi presenti, quelli già scritti non cambiano
+        self.assertEqual(set(document["info_ordine"]), set(INFO_FIELDS))
+        self.assertEqual(set(document["dati_cliente"]), set(CUSTOMER_FIELDS))
+        self.assertEqual(set(document["dettagli_ordine"][0]), set(LINE_FIELDS))
+        self.assertEqual(document["info_ordine"]["data_ordine"], "2023-02-01")
+        self.assertEqual(document["info_ordine"]["data_consegna"], "")
+        # Versione 1 -> 2: riepilogo calcolato
+        self.assertEqual(document["riepilogo"], {"totale": "21.00", "acconti": "5.00", "saldo": "16.00"})
+
+    def test_chain_starts_from_stored_version(self):
+        # Versione 1: i campi ci sono già, manca solo il riepilogo
+        document = old_document()
+        migrate(document)
+        del document["riepilogo"]
+        document[SCHEMA_KEY] = 1
+        with mock.patch.dict("core.schema._MIGRATIONS", {0: mock.Mock(side_effect=AssertionError)}):
+            self.assertTrue(migrate(document))
+        self.assertEqual(document[SCHEMA_KEY], SCHEMA_VERSION)
+        self.assertIn("riepilogo", document)
+
+    def test_every_step_runs_once_in_order(self):
+        calls = []
+        steps = {v: (lambda doc, v=v: calls.append(v)) for v in range(SCHEMA_VERSION)}
+        with mock.patch.dict("core.schema._MIGRATIONS", steps):
+            migrate({})
+            migrate({SCHEMA_KEY: 1})
+        self.assertEqual(calls, list(range(SCHEMA_VERSION)) + list(range(1, SCHEMA_VERSION)))
+
+    def test_current_and_newer_documents_are_left_alone(self):
+        document = old_document()
+        migrate(document)
+        snapshot = json.dumps(document, sort_keys=True)
+        self.assertFalse(migrate(document))
+        self.assertEqual(json.dumps(document, sort_keys=True), snapshot)
+
+        newer = {SCHEMA_KEY: SCHEMA_VERSION + 1, "info_ordine": {}}
+        self.assertFalse(migrate(newer))
+        self.assertEqual(newer, {SCHEMA_KEY: SCHEMA_VERSION + 1, "info_ordine": {}})
+
+class MigrateArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        # Registro modifiche e storico chiedono il nome della postazione alle impostazioni (config.json)
+        for target in ("core.change_feed.station_name", "core.history.station_name"):
+            patcher = mock.patch(target, return_value="Test")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_old(self, subfolder, name):
+        folder = os.path.join(self.data_dir, subfolder)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(old_document(), f, indent=4)
+        return path
+
+    def test_rewrites_only_what_is_outdated(self):
+        order = self.write_old("orders", "Ordine_Rossi.json")
+        quote = self.write_old("quotes", "Preventivo_Rossi.json")
+        with open(os.path.join(self.data_dir, "orders", "note.txt"), 'w') as f:
+            f.write("non è un documento")
+
+        self.assertEqual(migrate_archive(self.data_dir, compact=True), (2, 2))
+        for path in (order, quote):
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            self.assertTrue(is_compact_text(text))
+            self.assertEqual(json.loads(text)[SCHEMA_KEY], SCHEMA_VERSION)
+            self.assertEqual(read_header(path)["totale"], "21.00")
+
+        # Già aggiornati: nulla da fare; cambiando formattazione si riscrivono
+        self.assertEqual(migrate_archive(self.data_dir, compact=True), (0, 2))
+        self.assertEqual(migrate_archive(self.data_dir, compact=False), (2, 2))
+        self.assertEqual(read_header(order)["revisione"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sys
+import random
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.supplier_rollup import SupplierRollup
+
+# ======================================================================
+# --- RIEPILOGO ACQUISTI PER FORNITORE ---
+# Aggiungere e togliere un documento devono essere simmetrici: dopo
+# qualunque sequenza di modifiche la vista deve essere identica a una
+# ricostruita da zero con i soli documenti rimasti.
+# ======================================================================
+
+DAY = date(2025, 5, 30).toordinal()
+
+def order(day, *lines, tipo="ordine", cerimonia=None):
+    """Riepilogo minimo come lo passa l'indice: righe (ditta, codice, descrizione, quantità, prezzo)."""
+    return SimpleNamespace(tipo=tipo, data_consegna=day, data_cerimonia=cerimonia,
+                           righe=[(d, c, "Articolo " + c, q, "1,00") for d, c, q in lines])
+
+class FakeIndex:
+    def __init__(self, docs=()):
+        self.docs = dict(docs)
+
+    def documents(self, tipo):
+        return [(path, s) for path, s in self.docs.items() if s.tipo == tipo]
+
+    def add_listener(self, callback):
+        pass
+
+    def add_lines_listener(self, callback):
+        pass
+
+def state(rollup):
+    return rollup.contributions, rollup.by_day, rollup.days
+
+class SupplierRollupTest(unittest.TestCase):
+    def setUp(self):
+        # Niente letture in background: le righe sono già nei riepiloghi
+        patcher = mock.patch("core.supplier_rollup.load_lines_async")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.index = FakeIndex()
+        self.rollup = SupplierRollup(self.index)
+
+    def change(self, changed=(), removed=()):
+        changed = dict(changed)
+        for path in removed:
+            self.index.docs.pop(path, None)
+        self.index.docs.update(changed)
+        self.rollup.on_index_changed(changed, list(removed), False)
+
+    def assert_matches_rebuild(self):
+        self.assertEqual(state(self.rollup), state(SupplierRollup(FakeIndex(self.index.docs))))
+
+    def test_add_then_remove_leaves_nothing(self):
+        self.change({"a.json": order(DAY, ("Ditta", "A1", "3"), ("ditta ", "A1", "2"), ("Altra", "", "1,5"))})
+        self.assertEqual(self.rollup.by_day[DAY][("DITTA", "A1")], [5, 2])
+        self.change(removed=["a.json"])
+        self.assertEqual(state(self.rollup), ({}, {}, []))
+
+    def test_edit_replaces_the_old_contribution(self):
+        self.change({"a.json": order(DAY, ("Ditta", "A1", "3"))})
+        self.change({"b.json": order(DAY, ("Ditta", "A1", "4"))})
+        self.change({"a.json": order(DAY + 1, ("Ditta", "A1", "1"), ("Ditta", "B2", "2"))})
+        self.assertEqual(self.rollup.by_day[DAY], {("DITTA", "A1"): [4, 1]})
+        self.assertEqual(self.rollup.days, [DAY, DAY + 1])
+        self.assert_matches_rebuild()
+
+    def test_order_that_becomes_a_quote_is_removed(self):
+        self.change({"a.json": order(DAY, ("Ditta", "A1", "3"))})
+        self.change({"a.json": order(DAY, ("Ditta", "A1", "3"), tipo="preventivo")})
+        self.assertEqual(state(self.rollup), ({}, {}, []))
+
+    def test_documents_without_day_or_quantities(self):
+        self.change({
+            "a.json": order(None, ("Ditta", "A1", "3")),
+            "b.json": order(DAY, ("Ditta", "A1", "0"), ("Ditta", "A2", "")),
+            "c.json": order(None, ("Ditta", "A1", "2"), cerimonia=DAY + 2),
+        })
+        self.assertEqual(set(self.rollup.contributions), {"c.json"})
+        self.assertEqual(self.rollup.days, [DAY + 2])
+        self.change(removed=["a.json", "b.json", "c.json"])
+        self.assertEqual(state(self.rollup), ({}, {}, []))
+
+    def test_total_passing_through_zero(self):
+        # Un reso (quantità negativa) che annulla un altro ordine: la chiave resta finché qualcuno contribuisce
+        self.change({"a.json": order(DAY, ("Ditta", "A1", "2"))})
+        self.change({"b.json": order(DAY, ("Ditta", "A1", "-2"), ("Ditta", "A1", "5"))})
+        self.change(removed=["a.json"])
+        self.assertEqual(self.rollup.by_day[DAY], {("DITTA", "A1"): [3, 2]})
+        self.change(removed=["b.json"])
+        self.assertEqual(state(self.rollup), ({}, {}, []))
+
+    def test_random_changes_match_rebuild(self):
+        rng = random.Random(35)
+        paths = [f"Ordine_{i}.json" for i in range(15)]
+        for _step in range(400):
+            path = rng.choice(paths)
+            if rng.random() < 0.3:
+                self.change(removed=[path])
+            else:
+                lines = [(rng.choice(("Ditta", "Altra")), rng.choice(("A1", "B2", "")),
+                          str(rng.randint(-2, 5))) for _ in range(rng.randint(0, 4))]
+                self.change({path: order(DAY + rng.randint(0, 5), *lines)})
+            self.assert_matches_rebuild()
+
+    def test_query_period(self):
+        self.change({
+            "a.json": order(DAY, ("Ditta", "A1", "3")),
+            "b.json": order(DAY + 1, ("Ditta", "A1", "2"), ("Altra", "Z9", "1")),
+            "c.json": order(DAY + 5, ("Ditta", "A1", "10")),
+        })
+        start = date.fromordinal(DAY)
+        self.assertEqual(self.rollup.query(start, date.fromordinal(DAY + 1)), {
+            "ALTRA": [("Z9", "Articolo Z9", 1)],
+            "DITTA": [("A1", "Articolo A1", 5)],
+        })
+        self.change(removed=["b.json"])
+        self.assertEqual(self.rollup.query(start, date.fromordinal(DAY + 1)), {"DITTA": [("A1", "Articolo A1", 3)]})
+
+if __name__ == "__main__":
+    unittest.main()
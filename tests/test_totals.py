@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+from decimal import Decimal
+
+# Eseguibile dalla cartella del progetto: python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.totals import parse_amount, line_total, compute_summary, ensure_summary, SUMMARY_KEY
+
+# ======================================================================
+# --- CALCOLO TOTALI ---
+# Importi scritti a mano (virgola, punto delle migliaia, simbolo dell'euro)
+# e arrotondamento al centesimo per eccesso sul mezzo centesimo.
+# ======================================================================
+
+def document(*lines, deposits=("", "")):
+    return {
+        "info_ordine": {"acconto1_importo": deposits[0], "acconto2_importo": deposits[1]},
+        "dettagli_ordine": [{"quantita": qty, "prezzo_unitario": price} for qty, price in lines],
+    }
+
+class ParseAmountTest(unittest.TestCase):
+    def test_written_forms(self):
+        cases = {
+            "10.50": "10.50", "10,50": "10.50", "1.234,50": "1234.50", "€ 12": "12",
+            " 3 ": "3", "1.000.000,01": "1000000.01", "-2,5": "-2.5",
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_amount(text), Decimal(expected), text)
+
+    def test_invalid_is_zero(self):
+        for value in ("", None, "abc", "1,2,3", "nan", "inf", "12 euro"):
+            self.assertEqual(parse_amount(value), Decimal("0.00"), value)
+
+    def test_numbers(self):
+        self.assertEqual(parse_amount(7), Decimal("7"))
+        self.assertEqual(parse_amount(Decimal("1.25")), Decimal("1.25"))
+
+class LineTotalTest(unittest.TestCase):
+    def test_half_cent_rounds_up(self):
+        self.assertEqual(line_total("3", "0,335"), Decimal("1.01"))   # 1.005
+        self.assertEqual(line_total("1", "2,345"), Decimal("2.35"))
+        self.assertEqual(line_total("1", "2,344"), Decimal("2.34"))
+
+    def test_no_float_errors(self):
+        # Con i float 0.1 * 3 = 0.30000000000000004
+        self.assertEqual(line_total("3", "0,10"), Decimal("0.30"))
+        self.assertEqual(line_total("1,5", "1.234,50"), Decimal("1851.75"))
+
+    def test_missing_values(self):
+        self.assertEqual(line_total("", "10,00"), Decimal("0.00"))
+        self.assertEqual(line_total("2", None), Decimal("0.00"))
+
+class SummaryTest(unittest.TestCase):
+    def test_total_deposits_balance(self):
+        summary = compute_summary(document(("2", "10,50"), ("3", "0,335"), deposits=("5", "1,25")))
+        self.assertEqual(summary, {"totale": "22.01", "acconti": "6.25", "saldo": "15.76"})
+
+    def test_rounding_is_per_line(self):
+        # Ogni riga si arrotonda da sola: tre righe da 0,005 fanno 3 × 0,01 = 0,03 (non 0,015 -> 0,02)
+        summary = compute_summary(document(("1", "0,005"), ("1", "0,005"), ("1", "0,005")))
+        self.assertEqual(summary["totale"], "0.03")
+
+    def test_empty_document(self):
+        self.assertEqual(compute_summary({}), {"totale": "0.00", "acconti": "0.00", "saldo": "0.00"})
+
+    def test_deposit_larger_than_total(self):
+        self.assertEqual(compute_summary(document(("1", "10"), deposits=("12", "")))["saldo"], "-2.00")
+
+    def test_ensure_keeps_stored_summary(self):
+        doc = document(("1", "10"))
+        stored = {"totale": "99.00", "acconti": "0.00", "saldo": "99.00"}
+        doc[SUMMARY_KEY] = stored
+        self.assertIs(ensure_summary(doc), stored)
+
+        doc[SUMMARY_KEY] = {"totale": "99.00"} # Incompleto: ricalcolato
+        self.assertEqual(ensure_summary(doc)["totale"], "10.00")
+
+if __name__ == "__main__":
+    unittest.main()